@@ -1,133 +1,207 @@
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3']=sys.modules.pop('pysqlite3')
+import json
+import uuid
+import altair as alt
 import streamlit as st
 import pandas as pd
-from agents.eda_agent import eda_agent
-from agents.dashboard_agent import dashboard_agent
-from agents.preprocessing_agent import preprocessing_agent
-from agents.model_suggestion_agent import model_suggestion_agent
-from crewai import Task, Crew
+from jobs import default_queue
+from tools.ingestion import ingest_upload, preview_frame
+from tools.result_cache import default_cache
+from registry import loaded_agents
+from tools.context import call_log
+from tools.instrumentation import Trace
+from tools.workspace import uploads_dir
 import os
 
 st.set_page_config(page_title="CrewAI Data Pipeline", layout="wide")
 st.title("🧠 CrewAI Multi-Agent Data Pipeline")
 
-if "results" not in st.session_state:
-    st.session_state.results = {}
+# Agent runs go to the background job queue; the user id in the URL lets a
+# reloaded page (or a bookmark) reattach to its jobs and their results
+if "user" not in st.query_params:
+    st.query_params["user"] = uuid.uuid4().hex[:8]
+user = st.query_params["user"]
+queue = default_queue()
+queue.start()
+
+
+def show_trace(job):
+    """Timeline of a run's spans (one lane per thread and nesting level) plus the Chrome trace file."""
+    path = job.result.get("trace")
+    if not path or not os.path.exists(path):
+        return
+    trace = Trace.load(path)
+    spans = pd.DataFrame(trace.rows())
+    if spans.empty:
+        return
+    spans["lane"] = spans["thread"] + " · " + spans["depth"].astype(str)
+    chart = alt.Chart(spans).mark_bar().encode(
+        x=alt.X("start_s", title="seconds since start"), x2="end_s",
+        y=alt.Y("lane", sort=None, title=None), color="category",
+        tooltip=[column for column in spans.columns if column != "lane"],
+    )
+    st.subheader("🔥 Run Trace")
+    st.altair_chart(chart, width="stretch")
+    st.dataframe(spans.nlargest(10, "duration_s")[["name", "category", "thread", "duration_s"]].round(3),
+                 hide_index=True)
+    st.download_button("⬇️ Download Trace (chrome://tracing, ui.perfetto.dev)",
+                       data=json.dumps(trace.to_chrome(), default=str), file_name=os.path.basename(path),
+                       mime="application/json", key=f"{job.id}-trace")
+
+
+def download_file(job, label, path, file_name, mime):
+    path = os.path.join(job.result["workspace"], path)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            st.download_button(label, data=f, file_name=file_name, mime=mime, key=f"{job.id}-{file_name}")
+        return True
+    return False
+
+
+def show_full_pipeline(job):
+    result = job.result
+    timings = pd.DataFrame(
+        [{"stage": name, "start (s)": start, "end (s)": end, "duration (s)": end - start}
+         for name, (start, end) in sorted(result["timings"].items(), key=lambda item: item[1][0])]
+    )
+    st.subheader("⏱️ Pipeline Timing")
+    st.dataframe(timings.round(2), hide_index=True)
+    serial = sum(end - start for start, end in result["timings"].values())
+    st.caption(f"Wall clock {result['wall_time']:.1f}s vs. {serial:.1f}s if run one after another")
+    for name, error in result["errors"].items():
+        st.error(f"❌ Stage '{name}' failed: {error}")
+    if result["skipped"]:
+        st.warning(f"⚠️ Skipped because a dependency failed: {', '.join(result['skipped'])}")
+    if not result["errors"] and not result["skipped"]:
+        st.success("✅ Full pipeline completed")
+    for name, text_result in result["results"].items():
+        st.text_area(f"{name} output", value=text_result, height=200, key=f"{job.id}-{name}")
+
+
+def show_eda(job):
+    text_result = job.result["results"]["eda"]
+    st.success("✅ EDA Agent Completed")
+    st.subheader("📄 EDA Report Preview")
+    st.text_area("EDA Report", value=text_result, height=400, key=f"{job.id}-eda")
+    st.download_button("⬇️ Download EDA Report", data=text_result, file_name="eda_report.txt", key=f"{job.id}-report")
+
+
+def show_dashboard(job):
+    st.success("✅ Dashboard Agent Completed")
+    # Compact dashboards keep their images beside the page, so they are downloaded as a zip
+    if not (download_file(job, "⬇️ Download Visual Insights Dashboard (zip)",
+                          os.path.join("dashboard_output", "insights_dashboard.zip"),
+                          "insights_dashboard.zip", "application/zip")
+            or download_file(job, "⬇️ Download Visual Insights Dashboard",
+                             os.path.join("dashboard_output", "insights_dashboard.html"),
+                             "insights_dashboard.html", "text/html")):
+        st.warning("⚠️ Dashboard HTML file not found.")
+
+
+def show_preprocessing(job):
+    text_result = job.result["results"]["preprocessing"]
+    st.success("✅ Preprocessing Agent Completed")
+    st.subheader("📄 Preprocessing Summary")
+    st.text_area("Preprocessed Output", value=text_result, height=300, key=f"{job.id}-preprocessing")
+
+    # Download buttons for saved files
+    download_file(job, "⬇️ Download Processed CSV", "processed_output/processed_data.csv",
+                  "preprocessed_data.csv", "text/csv")
+    download_file(job, "⬇️ Download Processed Data (sparse NPZ)", "processed_output/processed_data.npz",
+                  "processed_data.npz", "application/octet-stream")
+    download_file(job, "⬇️ Download Preprocessing Strategy", "processed_output/preprocessing_strategy.txt",
+                  "preprocessing_strategy.txt", "text/plain")
+
+
+def show_model_suggestion(job):
+    text_result = job.result["results"]["model_suggestion"]
+    st.success("✅ Model Suggestion Agent Completed")
+    st.subheader("🤖 Model Suggestions")
+    st.text_area("Model Recommendations", value=text_result, height=300, key=f"{job.id}-model_suggestion")
+    st.download_button("⬇️ Download Model Suggestions", data=text_result, file_name="model_suggestions.txt",
+                       key=f"{job.id}-suggestions")
+
+
+RESULT_VIEWS = {
+    "full_pipeline": show_full_pipeline,
+    "eda": show_eda,
+    "dashboard": show_dashboard,
+    "preprocessing": show_preprocessing,
+    "model_suggestion": show_model_suggestion,
+}
+
+
+@st.fragment(run_every=2)
+def active_jobs():
+    """Progress of queued and running jobs, refreshed in place; a full rerun shows each result once it lands."""
+    jobs = [job for job in queue.jobs(user) if job.active]
+    active_ids = {job.id for job in jobs}
+    finished = st.session_state.get("active_jobs", set()) - active_ids
+    st.session_state.active_jobs = active_ids
+    if finished:
+        st.rerun()
+    for job in jobs:
+        st.progress(job.progress, text=f"⏳ {job.kind}: {job.message} ({job.status}, {job.elapsed:.0f}s)")
+        if not job.cancel_requested and st.button("✖️ Cancel", key=f"{job.id}-cancel"):
+            queue.cancel(job.id)
+
 
 uploaded_file = st.file_uploader("📂 Upload your CSV file", type=["csv"], key="csv_uploader_main")
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+    # Parse the CSV once into a memory-mappable Arrow file that every tool reads;
+    # reruns on the same upload reuse it without parsing again
+    dataset_path = ingest_upload(uploaded_file.name, uploaded_file.getvalue(), data_dir=uploads_dir(user))
     st.success(f"✅ Uploaded: {uploaded_file.name}")
-    st.dataframe(df.head())
+    st.dataframe(preview_frame(dataset_path))
 
-    os.makedirs("data", exist_ok=True)
-    csv_path = os.path.join("data", uploaded_file.name)
-    df.to_csv(csv_path, index=False)
+    dataset_keywords = st.text_input("Enter dataset keywords for Kaggle/GitHub search", value="obesity prediction")
 
-    def get_result_text(result):
-        try:
-            return str(result.output)
-        except AttributeError:
-            return str(result)
+    # EDA and dashboard run side by side, then preprocessing, then model suggestion
+    if st.button("🚀 Run Full Pipeline"):
+        queue.submit(user, "full_pipeline", dataset_path=dataset_path, dataset_keywords=dataset_keywords)
 
     if st.button("Run EDA Agent"):
-        csv_data = df.to_csv(index=False)
-        task = Task(
-            description=f"Perform EDA on the following CSV data:\n{csv_data}",
-            agent=eda_agent,
-            expected_output="A detailed EDA report saved to eda_report.txt."
-        )
-        crew = Crew(agents=[eda_agent], tasks=[task], verbose=True)
-        result = crew.kickoff()
-        st.session_state.results["eda"] = result
-        with open("eda_report.txt", "w", encoding="utf-8") as f:
-            f.write(get_result_text(result))
-        st.success("✅ EDA Agent Completed")
-        st.subheader("📄 EDA Report Preview")
-        st.text_area("EDA Report", value=get_result_text(result), height=400)
-        st.download_button("⬇️ Download EDA Report", data=get_result_text(result), file_name="eda_report.txt")
+        queue.submit(user, "eda", dataset_path=dataset_path)
 
     if st.button("Run Dashboard Agent"):
-        task = Task(
-            description=f"Generate visualizations for uploaded data at path: {csv_path}",
-            agent=dashboard_agent,
-            expected_output="Textual summary of insights and an HTML dashboard file."
-        )
-        crew = Crew(agents=[dashboard_agent], tasks=[task], verbose=True)
-        result = crew.kickoff()
-        text_result = get_result_text(result)
-
-        st.session_state.results["dashboard"] = text_result
-        st.success("✅ Dashboard Agent Completed")
-
-        html_path = os.path.join("dashboard_output", "insights_dashboard.html")
-        if os.path.exists(html_path):
-            with open(html_path, "rb") as f:
-                st.download_button(
-                    "⬇️ Download Visual Insights Dashboard",
-                    data=f,
-                    file_name="insights_dashboard.html",
-                    mime="text/html"
-                )
-        else:
-            st.warning("⚠️ Dashboard HTML file not found.")
+        queue.submit(user, "dashboard", dataset_path=dataset_path)
 
     if st.button("Run Preprocessing Agent"):
-        task = Task(
-            description=f"Run preprocessing on data at this path: {csv_path}",
-            agent=preprocessing_agent,
-            expected_output="Return preprocessing summary and preview of processed data."
-        )
-        crew = Crew(agents=[preprocessing_agent], tasks=[task], verbose=True)
-        result = crew.kickoff()
-        text_result = get_result_text(result)
-
-        st.session_state.results["preprocessing"] = text_result
-        st.success("✅ Preprocessing Agent Completed")
-        st.subheader("📄 Preprocessing Summary")
-        st.text_area("Preprocessed Output", value=text_result, height=300)
-
-        # Download buttons for saved files
-        processed_csv = "processed_output/processed_data.csv"
-        strategy_txt = "processed_output/preprocessing_strategy.txt"
-
-
-        if os.path.exists(processed_csv):
-            with open(processed_csv, "rb") as f:
-                st.download_button(
-                    "⬇️ Download Processed CSV",
-                    data=f,
-                    file_name="preprocessed_data.csv",
-                    mime="text/csv"
-                )
-        if os.path.exists(strategy_txt):
-            with open(strategy_txt, "rb") as f:
-                st.download_button(
-                    "⬇️ Download Preprocessing Strategy",
-                    data=f,
-                    file_name="preprocessing_strategy.txt",
-                    mime="text/plain"
-                )
-
-
-
-    dataset_keywords = st.text_input("Enter dataset keywords for Kaggle/GitHub search", value="obesity prediction")
+        queue.submit(user, "preprocessing", dataset_path=dataset_path)
 
     if st.button("Run Model Suggestion Agent"):
-        task = Task(
-            description=f"Suggest ML models for {dataset_keywords} based on EDA, visuals, and online references.",
-            agent=model_suggestion_agent,
-            expected_output="Model recommendations with explanations from local and external sources."
-        )
-        crew = Crew(agents=[model_suggestion_agent], tasks=[task], verbose=True)
-        result = crew.kickoff()
-        text_result = get_result_text(result)
-
-        st.session_state.results["model_suggestion"] = text_result
-        st.success("✅ Model Suggestion Agent Completed")
-        st.subheader("🤖 Model Suggestions")
-        st.text_area("Model Recommendations", value=text_result, height=300)
-        st.download_button("⬇️ Download Model Suggestions", data=text_result, file_name="model_suggestions.txt")
+        # The dataset only picks the workspace holding the earlier agents' outputs
+        queue.submit(user, "model_suggestion", dataset_path=dataset_path, dataset_keywords=dataset_keywords)
+
+st.subheader("📋 Jobs")
+st.caption(f"Jobs run in the background and stay listed for this link (user `{user}`), across reloads.")
+active_jobs()
+finished = [job for job in queue.jobs(user) if not job.active]
+latest = next((job.id for job in finished if job.status == "done"), None)
+for job in finished:
+    icon = {"done": "✅", "failed": "❌", "cancelled": "✖️"}[job.status]
+    with st.expander(f"{icon} {job.kind} · {job.status} in {job.elapsed:.0f}s", expanded=job.id == latest):
+        if job.status == "failed":
+            st.error(f"❌ {job.error}")
+        elif job.status == "done":
+            RESULT_VIEWS[job.kind](job)
+            show_trace(job)
+
+# Drawn last so the counts include the tool runs of this rerun
+cache_stats = default_cache().stats()
+st.sidebar.subheader("🗄️ Tool Result Cache")
+st.sidebar.metric("Hits", cache_stats["hits"])
+st.sidebar.metric("Misses", cache_stats["misses"])
+st.sidebar.caption(f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 2**20:.1f} MB on disk")
+# Agents are built on their first run and kept across reruns
+st.sidebar.caption(f"🤖 Agents loaded: {', '.join(loaded_agents()) or 'none yet'}")
+
+# Prompt size of every agent call this session: locally counted context vs. provider-reported prompt tokens
+calls = call_log()
+if calls:
+    st.sidebar.subheader("📏 Prompt Size per Call")
+    st.sidebar.dataframe(pd.DataFrame(calls)[["agent", "context_tokens", "context_bytes", "budget", "prompt_tokens"]],
+                         hide_index=True)
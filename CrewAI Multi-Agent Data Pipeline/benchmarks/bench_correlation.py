@@ -0,0 +1,64 @@
+"""Pairwise association time on wide tables: top-k engine vs. a full pandas correlation matrix.
+
+Run from the project folder:
+
+    python benchmarks/bench_correlation.py --columns 200 1000 2500 --rows 20000
+    python benchmarks/bench_correlation.py --columns 2500 --rows 1000000 --skip-pandas
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.correlation import find_associations
+from tools.instrumentation import peak_rss_mb
+
+
+def synthetic_frames(rows, columns, chunksize=100_000, seed=0):
+    """Chunks of a table where every tenth numeric column follows its neighbour and every fifth column is categorical."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        n = min(chunksize, rows - start)
+        values = rng.normal(size=(n, columns)).astype("float32")
+        values[:, 1::10] = values[:, 0::10][:, :values[:, 1::10].shape[1]] + 0.2 * values[:, 1::10]
+        values[rng.random(values.shape) < 0.02] = np.nan
+        frame = pd.DataFrame(values, columns=[f"c{i}" for i in range(columns)])
+        for i in range(4, columns, 5):
+            frame[f"c{i}"] = np.where(values[:, i - 1] > 0, "high", "low")
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, nargs="+", default=[200, 1000, 2500])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--skip-pandas", action="store_true", help="don't build the full matrix for comparison")
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'pairs':>10} {'engine s':>9} {'sampled':>9} {'found':>6} {'pandas s':>9} {'peak MB':>8}")
+    for columns in args.columns:
+        names = [f"c{i}" for i in range(columns)]
+        categorical = names[4::5]
+        numeric = [name for name in names if name not in set(categorical)]
+        start = time.perf_counter()
+        result = find_associations(synthetic_frames(args.rows, columns), args.rows, numeric, categorical)
+        engine = time.perf_counter() - start
+
+        full = "-"
+        if not args.skip_pandas:
+            frame = pd.concat(synthetic_frames(args.rows, columns), ignore_index=True)[numeric]
+            start = time.perf_counter()
+            frame.corr()
+            full = f"{time.perf_counter() - start:.2f}"
+            del frame
+        print(f"{columns:>8} {columns * (columns - 1) // 2:>10} {engine:>9.2f} {result.rows:>9} "
+              f"{len(result.pairs):>6} {full:>9} {peak_rss_mb():>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Dashboard build time and output size, embedded vs. compact, as the column count grows.
+
+Run from the project folder:
+
+    python benchmarks/bench_dashboard_output.py --columns 10 40 160 --rows 5000
+    python benchmarks/bench_dashboard_output.py --columns 400 --rows 5000 --page-columns 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_dashboard_render import synthetic_csv
+from tools.dashboard_pages import ARCHIVE_NAME, HTML_NAME
+from tools.data_dashboard_tool import DataDashboardTool
+
+MODES = ("embedded", "compact")
+
+
+def _size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 2 ** 20
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files) / 2 ** 20
+
+
+def time_run(csv_path, mode, workers, page_columns):
+    # No result cache, no saved lineage state and no earlier output
+    shutil.rmtree(".cache", ignore_errors=True)
+    shutil.rmtree("dashboard_output", ignore_errors=True)
+    start = time.perf_counter()
+    DataDashboardTool(output_mode=mode, render_workers=workers, page_columns=page_columns, use_cache=False)._run(csv_path)
+    wall = time.perf_counter() - start
+    archive = os.path.join("dashboard_output", ARCHIVE_NAME)
+    return {
+        "wall": wall,
+        "html": _size_mb(os.path.join("dashboard_output", HTML_NAME)),
+        # What a user downloads: the zip when there is one, else the page itself
+        "download": _size_mb(archive if os.path.exists(archive) else os.path.join("dashboard_output", HTML_NAME)),
+        "total": _size_mb("dashboard_output"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--page-columns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'mode':>9} {'build s':>8} {'html MB':>8} {'download MB':>12} {'on disk MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for columns in args.columns:
+            csv_path = os.path.join(tmp, f"synthetic_{columns}.csv")
+            synthetic_csv(csv_path, args.rows, columns)
+            for mode in MODES:
+                result = time_run(csv_path, mode, args.workers, args.page_columns)
+                print(f"{columns:>8} {mode:>9} {result['wall']:>8.2f} {result['html']:>8.2f} "
+                      f"{result['download']:>12.2f} {result['total']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
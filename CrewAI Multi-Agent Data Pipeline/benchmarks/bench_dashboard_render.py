@@ -0,0 +1,62 @@
+"""Dashboard render time, serial vs. process pool, as the column count grows.
+
+Run from the project folder:
+
+    python benchmarks/bench_dashboard_render.py --columns 10 40 160 --rows 5000
+    python benchmarks/bench_dashboard_render.py --columns 10 --rows 5000000 --mode binned
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.data_dashboard_tool import DataDashboardTool
+
+
+def synthetic_csv(path, rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 4 == 3:
+            data[f"cat_{i}"] = rng.choice(["a", "b", "c", "d"], rows)
+        else:
+            data[f"num_{i}"] = rng.lognormal(size=rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def time_run(csv_path, workers, mode):
+    # No result cache and no saved lineage state, so every run renders everything
+    shutil.rmtree(".cache", ignore_errors=True)
+    start = time.perf_counter()
+    DataDashboardTool(render_workers=workers, render_mode=mode, use_cache=False)._run(csv_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mode", choices=["raw", "binned", "auto"], default="raw")
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'serial s':>10} {f'{args.workers} procs s':>12} {'speed-up':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for columns in args.columns:
+            csv_path = os.path.join(tmp, f"synthetic_{columns}.csv")
+            synthetic_csv(csv_path, args.rows, columns)
+            serial = time_run(csv_path, 1, args.mode)
+            pooled = time_run(csv_path, args.workers, args.mode)
+            print(f"{columns:>8} {serial:>10.2f} {pooled:>12.2f} {serial / pooled:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
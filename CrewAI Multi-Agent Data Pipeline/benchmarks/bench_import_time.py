@@ -0,0 +1,74 @@
+"""Cold import time of the app: eager agent construction vs. the lazy registry.
+
+Each scenario runs in a fresh interpreter, so nothing is shared through
+`sys.modules` or the OS page cache of an earlier scenario's run. Agents
+are built with the stub LLM backend, so no API key is needed.
+
+Run from the project folder:
+
+    python benchmarks/bench_import_time.py --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("crewai", "sklearn", "seaborn", "matplotlib", "scipy")
+
+
+def app_imports(path=os.path.join(PROJECT_DIR, "app.py")):
+    """What app.py runs before drawing the first widget: its imports, read from the file so they stay in sync."""
+    lines = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("st."):
+                break
+            lines.append(line)
+    return "".join(lines)
+
+
+APP_IMPORTS = app_imports()
+
+SCENARIOS = {
+    # The old app.py: all four agent modules (and their tools) imported up front
+    "eager (all agents at startup)": APP_IMPORTS + "import registry\n"
+                                     "for name in registry.AGENT_MODULES: registry.get_agent(name)\n",
+    "lazy startup": APP_IMPORTS,
+    "lazy + first EDA run": APP_IMPORTS + "import registry; registry.get_agent('eda')\n",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<scenario>", "exec"))
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "heavy": [m for m in sys.argv[2].split(",") if m in sys.modules]}))
+"""
+
+
+def run_scenario(code):
+    env = dict(os.environ, PIPELINE_LLM_BACKEND="stub")
+    out = subprocess.run([sys.executable, "-c", PROBE, code, ",".join(HEAVY_MODULES)],
+                         cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scenario':>30} {'median':>9} {'min':>9}  heavy modules loaded")
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code) for _ in range(args.repeat)]
+        seconds = [run["seconds"] for run in runs]
+        heavy = ", ".join(runs[-1]["heavy"]) or "-"
+        print(f"{name:>30} {statistics.median(seconds):8.2f}s {min(seconds):8.2f}s  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
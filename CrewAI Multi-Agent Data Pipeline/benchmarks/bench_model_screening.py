@@ -0,0 +1,55 @@
+"""Model screening time and ranking: successive halving vs. cross-validating every candidate on all rows.
+
+Run from the project folder:
+
+    python benchmarks/bench_model_screening.py --rows 20000 100000 --features 50
+    python benchmarks/bench_model_screening.py --rows 50000 --task regression --budget 30 --skip-full
+"""
+import argparse
+import os
+import sys
+import time
+
+from sklearn.datasets import make_classification, make_regression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.model_screening import CANDIDATES, MAX_ROWS, screen_models
+
+
+def synthetic_task(task, rows, features, seed=0):
+    if task == "classification":
+        return make_classification(rows, features, n_informative=features // 3, n_classes=3, weights=[0.6, 0.3, 0.1],
+                                   flip_y=0.05, random_state=seed)
+    return make_regression(rows, features, n_informative=features // 3, noise=10.0, random_state=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--task", choices=sorted(CANDIDATES), default="classification")
+    parser.add_argument("--budget", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--skip-full", action="store_true", help="don't cross-validate every candidate on all rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'mode':>8} {'wall s':>8} {'rows used':>10} {'best':>32} {'score':>7}")
+    for rows in args.rows:
+        X, y = synthetic_task(args.task, rows, args.features)
+        X = X.astype("float32")
+        modes = [("halving", {"budget": args.budget})]
+        if not args.skip_full:
+            # Every candidate on every row, one round: the exhaustive baseline
+            modes.append(("full", {"budget": float("inf"), "min_rows": MAX_ROWS, "eta": 1}))
+        for mode, options in modes:
+            start = time.perf_counter()
+            screening = screen_models(X, y, args.task, workers=args.workers, **options)
+            wall = time.perf_counter() - start
+            best = screening.best
+            print(f"{rows:>8} {mode:>8} {wall:>8.2f} {best.rows if best else 0:>10} "
+                  f"{best.name if best else '-':>32} {best.score if best else float('nan'):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
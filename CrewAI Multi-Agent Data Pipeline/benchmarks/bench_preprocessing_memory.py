@@ -0,0 +1,126 @@
+"""Memory of the original dense preprocessing vs. the pipeline's dense and compact outputs.
+
+Run from the project folder:
+
+    python benchmarks/bench_preprocessing_memory.py --rows 200000 --cities 2000
+    python benchmarks/bench_preprocessing_memory.py --csv data/PatientInfo.csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, RobustScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.compact_output import save_compact
+from tools.preprocessing_pipeline import PreprocessingPipeline
+
+
+def synthetic_frame(rows, cities, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "patient_id": np.arange(rows, dtype="int64") + 1_000_000_000,
+        "age": rng.integers(0, 90, rows),
+        "contact_number": rng.poisson(5, rows).astype("float64"),
+        "sex": rng.choice(["male", "female"], rows),
+        "City": rng.choice([f"city_{i}" for i in range(cities)], rows),
+        "CALC": rng.choice(["no", "Sometimes", "Frequently", "Always"], rows),
+    })
+
+
+def baseline_transform(df):
+    """The tool's original path: fill, scale, then one dense ColumnTransformer.fit_transform into a DataFrame."""
+    df = df.copy()
+    num_cols = df.select_dtypes(include=["float64", "int64"]).columns
+    cat_cols = df.select_dtypes(include="object").columns
+    df[num_cols] = df[num_cols].apply(lambda x: x.fillna(x.median()))
+    df[cat_cols] = df[cat_cols].apply(lambda x: x.fillna(x.mode()[0]))
+    df[num_cols] = RobustScaler().fit_transform(df[num_cols])
+
+    ordinal_mapping = {col: ["no", "Sometimes", "Frequently", "Always"] for col in ("CALC", "CAEC")}
+    ordinal_cols = [col for col in ordinal_mapping if col in df.columns]
+    for col in ordinal_cols:
+        df[col] = pd.Categorical(df[col], categories=ordinal_mapping[col], ordered=True)
+    nominal_cols = list(set(cat_cols) - set(ordinal_cols))
+    transformers = []
+    if ordinal_cols:
+        transformers.append(("ord", OrdinalEncoder(), ordinal_cols))
+    if nominal_cols:
+        transformers.append(("nom", OneHotEncoder(sparse_output=False, handle_unknown="ignore"), nominal_cols))
+    if not transformers:
+        return df
+    preprocessor = ColumnTransformer(transformers, remainder="passthrough")
+    processed = preprocessor.fit_transform(df)
+    columns = list(ordinal_cols)
+    if nominal_cols:
+        columns.extend(preprocessor.named_transformers_["nom"].get_feature_names_out(nominal_cols))
+    columns.extend(col for col in df.columns if col not in ordinal_cols + nominal_cols)
+    return pd.DataFrame(processed, columns=columns)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def timed(fn):
+    # tracemalloc slows writers down a lot, so file output is timed untraced
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def mb(n_bytes):
+    return f"{n_bytes / 2**20:9.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", help="benchmark a real file instead of synthetic data")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cities", type=int, default=2000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else synthetic_frame(args.rows, args.cities)
+    pipeline = PreprocessingPipeline.fit(df)
+    print(f"{len(df)} rows, {len(pipeline.output_columns)} output columns")
+
+    baseline, baseline_time, baseline_peak = measure(lambda: baseline_transform(df))
+    dense, dense_time, dense_peak = measure(lambda: pipeline.transform(df))
+    (compact, one_hot, names), compact_time, compact_peak = measure(lambda: pipeline.transform_compact(df))
+    compact_bytes = compact.memory_usage(deep=True).sum() + one_hot.data.nbytes + one_hot.indices.nbytes + one_hot.indptr.nbytes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_path = os.path.join(tmp, "baseline.csv")
+        csv_path = os.path.join(tmp, "processed_data.csv")
+        npz_path = os.path.join(tmp, "processed_data.npz")
+        baseline_csv_time = timed(lambda: baseline.to_csv(baseline_path, index=False))
+        csv_time = timed(lambda: dense.to_csv(csv_path, index=False))
+        npz_time = timed(lambda: save_compact(npz_path, compact, one_hot, names))
+        baseline_size = os.path.getsize(baseline_path)
+        csv_size, npz_size = os.path.getsize(csv_path), os.path.getsize(npz_path)
+
+    # The baseline fits while it transforms, as the tool used to; the pipeline was fitted above
+    print(f"{'':>10} {'result':>12} {'peak':>12} {'transform':>10} {'file':>12} {'write':>8}")
+    print(f"{'baseline':>10} {mb(baseline.memory_usage(deep=True).sum())} {mb(baseline_peak)} {baseline_time:>9.2f}s "
+          f"{mb(baseline_size)} {baseline_csv_time:>7.2f}s")
+    print(f"{'dense':>10} {mb(dense.memory_usage(deep=True).sum())} {mb(dense_peak)} {dense_time:>9.2f}s "
+          f"{mb(csv_size)} {csv_time:>7.2f}s")
+    print(f"{'compact':>10} {mb(compact_bytes)} {mb(compact_peak)} {compact_time:>9.2f}s "
+          f"{mb(npz_size)} {npz_time:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
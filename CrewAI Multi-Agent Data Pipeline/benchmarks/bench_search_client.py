@@ -0,0 +1,54 @@
+"""Search latency against a local SerpAPI stub: serial vs. concurrent vs. cached.
+
+Run from the project folder:
+
+    python benchmarks/bench_search_client.py --latency 0.3 --queries 4
+    python benchmarks/bench_search_client.py --fail-every 2   # exercise retries
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.search_client import SearchClient
+from tools.serpapi_stub import stub_server, url
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="stub response time in seconds")
+    parser.add_argument("--queries", type=int, default=2)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with HTTP 503")
+    args = parser.parse_args()
+
+    server, counter = stub_server(args.latency, args.fail_every)
+    base_url = url(server)
+    queries = [f"site:kaggle.com obesity prediction model {i}" for i in range(args.queries)]
+    try:
+        serial = SearchClient(base_url=base_url, api_key="stub", backoff=0.05)
+        _, serial_time = timed(lambda: [serial.search(query) for query in queries])
+
+        client = SearchClient(base_url=base_url, api_key="stub", backoff=0.05)
+        results, cold_time = timed(lambda: client.search_many(queries))
+        # Same keywords, different spacing/case: served from the TTL cache
+        _, warm_time = timed(lambda: client.search_many([f"  {query.upper()} " for query in queries]))
+    finally:
+        server.shutdown()
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(f"{args.queries} queries, stub latency {args.latency:.2f}s, {counter['requests']} stub requests")
+    print(f"{'serial':>12} {serial_time:8.3f}s")
+    print(f"{'concurrent':>12} {cold_time:8.3f}s")
+    print(f"{'cached':>12} {warm_time:8.3f}s  ({client.cache_hits} cache hits, {failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
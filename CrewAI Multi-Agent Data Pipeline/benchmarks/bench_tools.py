@@ -0,0 +1,296 @@
+"""Per-tool wall time, peak RSS, output size and phase breakdown on the bundled and synthetic datasets.
+
+Each (tool, dataset) case runs in a fresh interpreter and working directory
+with the result cache off and no saved lineage state. Every case is a cold
+run, and its peak RSS is its own. Results are appended to a JSON history in
+`.cache/benchmarks/history.json`, outside the source tree, and each case is
+compared with its previous entry there.
+
+Run from the project folder:
+
+    python benchmarks/bench_tools.py                                   # bundled data/*.csv
+    python benchmarks/bench_tools.py --synthetic 1e6x20 1e5x1000 --tools eda dashboard
+    python benchmarks/bench_tools.py --synthetic 1e7x1000 --skip-bundled --fail-on-regression
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from tools.ingestion import ARROW_SUFFIX, BATCH_ROWS, ingest_csv
+
+TOOLS = ("eda", "dashboard", "preprocessing", "model_rules")
+# Benchmark state stays under the git-ignored .cache/, never in benchmarks/
+HISTORY_PATH = os.path.join(PROJECT_DIR, ".cache", "benchmarks", "history.json")
+# Ingested bundled files and generated synthetic tables, reused across runs
+DATA_DIR = os.path.join(PROJECT_DIR, ".cache", "bench_data")
+
+# A case regressed when its wall time, its memory above the import baseline or
+# the size of the files it wrote grew by more than this fraction of its
+# previous run, and by more than the noise floors below
+REGRESSION_THRESHOLD = 0.2
+MIN_SLOWDOWN = 0.05
+MIN_GROWTH_MB = 16
+MIN_OUTPUT_GROWTH_MB = 1
+
+
+# --- datasets -------------------------------------------------------------------
+
+def parse_shape(spec):
+    """"1e6x20" -> (1000000, 20)."""
+    rows, cols = spec.lower().split("x")
+    return int(float(rows)), int(float(cols))
+
+
+def _synthetic_batch(rng, rows, cols):
+    columns = {}
+    for i in range(cols - 1):
+        kind = i % 10
+        if kind < 6:
+            values = rng.lognormal(size=rows) if kind % 2 else rng.normal(50, 10, rows)
+            values[rng.random(rows) < 0.01] = np.nan
+            columns[f"num_{i}"] = values
+        elif kind < 8:
+            columns[f"int_{i}"] = rng.integers(0, 100, rows)
+        elif kind == 8:
+            columns[f"cat_{i}"] = np.array(["red", "green", "blue", "black", "white"])[rng.integers(0, 5, rows)]
+        else:
+            columns[f"code_{i}"] = np.char.add("c", rng.integers(0, 10_000, rows).astype(str))
+    columns["target"] = rng.integers(0, 3, rows)
+    return pa.RecordBatch.from_pydict(columns)
+
+
+def synthetic_dataset(rows, cols, seed=0, data_dir=DATA_DIR):
+    """Arrow IPC table of mixed numeric/categorical columns, written batch by batch and reused."""
+    path = os.path.join(data_dir, f"synthetic_{rows}x{cols}_{seed}{ARROW_SUFFIX}")
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    writer = None
+    with pa.OSFile(tmp_path, "wb") as sink:
+        for index, start in enumerate(range(0, rows, BATCH_ROWS)):
+            rng = np.random.default_rng([seed, index])
+            batch = _synthetic_batch(rng, min(BATCH_ROWS, rows - start), cols)
+            writer = writer or pa.ipc.new_file(sink, batch.schema)
+            writer.write_batch(batch)
+        writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def bundled_datasets(data_dir=DATA_DIR):
+    """The CSV files shipped in data/, ingested to Arrow as the app does on upload."""
+    paths = []
+    for csv_path in sorted(glob.glob(os.path.join(PROJECT_DIR, "data", "*.csv"))):
+        arrow_path = os.path.join(data_dir, os.path.splitext(os.path.basename(csv_path))[0] + ARROW_SUFFIX)
+        if not os.path.exists(arrow_path) or os.path.getmtime(arrow_path) < os.path.getmtime(csv_path):
+            ingest_csv(csv_path, arrow_path)
+        paths.append(arrow_path)
+    return paths
+
+
+def table_shape(path):
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return rows, len(reader.schema.names)
+
+
+# --- one case, in a worker process ------------------------------------------------
+
+def run_case(tool, dataset):
+    from tools.instrumentation import peak_rss_mb, record_phases
+
+    if tool == "eda":
+        from tools.explore_csv_tool import ExploreCSVDataTool
+        run = lambda: ExploreCSVDataTool(use_cache=False)._run(dataset)
+    elif tool == "dashboard":
+        from tools.data_dashboard_tool import DataDashboardTool
+        run = lambda: DataDashboardTool(use_cache=False)._run(dataset)
+    elif tool == "preprocessing":
+        from tools.smart_preprocessing_tool import SmartPreprocessingTool
+        run = lambda: SmartPreprocessingTool(use_cache=False)._run(dataset)
+    elif tool == "model_rules":
+        from tools.data_dashboard_tool import DataDashboardTool
+        from tools.explore_csv_tool import ExploreCSVDataTool
+        from tools.model_suggestion_tool import ModelSuggestionTool
+        # The rules read the insight records, so EDA and the dashboard run first (untimed)
+        ExploreCSVDataTool(use_cache=False)._run(dataset)
+        DataDashboardTool(use_cache=False)._run(dataset)
+        run = ModelSuggestionTool(use_cache=False, screen_models=False)._report
+    else:
+        raise ValueError(f"Unknown tool '{tool}'; expected one of {TOOLS}")
+
+    baseline = peak_rss_mb()
+    with record_phases() as recorder:
+        start = time.perf_counter()
+        run()
+        wall = time.perf_counter() - start
+    return {
+        "wall_s": wall,
+        "output_mb": _output_bytes(".") / 2 ** 20,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+        "children_peak_rss_mb": peak_rss_mb(children=True),
+        "phases": recorder.phases,
+    }
+
+
+def _output_bytes(directory):
+    """Size of the files a case wrote to its working directory (reports, dashboards, processed data)."""
+    total = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if name != ".cache"]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def run_isolated(tool, dataset):
+    """`run_case` in a fresh interpreter, working directory, cache and lineage store."""
+    with tempfile.TemporaryDirectory(prefix="bench-tools-") as workdir:
+        env = dict(os.environ,
+                   PIPELINE_CACHE_DIR=os.path.join(workdir, ".cache", "results"),
+                   PIPELINE_LINEAGE_DIR=os.path.join(workdir, ".cache", "lineage"),
+                   PYTHONPATH=PROJECT_DIR)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", tool, dataset],
+                             cwd=workdir, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["exit code %d" % out.returncode])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# --- history ----------------------------------------------------------------------
+
+def load_history(path=HISTORY_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(history, path=HISTORY_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _case_key(result):
+    return result["tool"], result["dataset"], result["rows"], result["cols"]
+
+
+def previous_results(history):
+    """Latest successful result per case across earlier runs."""
+    latest = {}
+    for run in history:
+        for result in run["results"]:
+            if "error" not in result:
+                latest[_case_key(result)] = result
+    return latest
+
+
+def _working_set(result):
+    if result.get("peak_rss_mb") is None or result.get("baseline_rss_mb") is None:
+        return None
+    return result["peak_rss_mb"] - result["baseline_rss_mb"]
+
+
+def regressions(result, previous, threshold=REGRESSION_THRESHOLD):
+    found = []
+    if result["wall_s"] > previous["wall_s"] * (1 + threshold) and result["wall_s"] - previous["wall_s"] > MIN_SLOWDOWN:
+        found.append(f"wall {previous['wall_s']:.2f}s -> {result['wall_s']:.2f}s")
+    now, before = _working_set(result), _working_set(previous)
+    if now is not None and before is not None and now > before * (1 + threshold) and now - before > MIN_GROWTH_MB:
+        found.append(f"memory above baseline {before:.0f} -> {now:.0f} MiB")
+    now, before = result.get("output_mb"), previous.get("output_mb")
+    if now is not None and before is not None and now > before * (1 + threshold) and now - before > MIN_OUTPUT_GROWTH_MB:
+        found.append(f"output {before:.1f} -> {now:.1f} MiB")
+    return found
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _top_phases(phases, n=3):
+    top = sorted(((name, seconds) for name, seconds in phases.items() if "/" not in name),
+                 key=lambda item: item[1], reverse=True)[:n]
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=list(TOOLS))
+    parser.add_argument("--synthetic", nargs="*", default=[], metavar="ROWSxCOLS",
+                        help="synthetic tables to add, e.g. 1e6x20 1e7x1000")
+    parser.add_argument("--skip-bundled", action="store_true", help="only run the synthetic tables")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    parser.add_argument("--worker", nargs=2, metavar=("TOOL", "DATASET"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(*args.worker)))
+        return
+
+    datasets = [] if args.skip_bundled else bundled_datasets()
+    datasets += [synthetic_dataset(*parse_shape(spec)) for spec in args.synthetic]
+    history = load_history(args.history)
+    previous = previous_results(history)
+
+    results, regressed = [], []
+    print(f"{'tool':>14} {'dataset':>28} {'rows x cols':>16} {'wall':>9} {'peak RSS':>10} {'output':>10}  top phases")
+    for dataset in datasets:
+        rows, cols = table_shape(dataset)
+        for tool in args.tools:
+            result = {"tool": tool, "dataset": os.path.basename(dataset), "rows": rows, "cols": cols}
+            result.update(run_isolated(tool, dataset))
+            results.append(result)
+            shape = f"{rows} x {cols}"
+            if "error" in result:
+                print(f"{tool:>14} {result['dataset']:>28} {shape:>16}  failed: {result['error']}")
+                continue
+            line = (f"{tool:>14} {result['dataset']:>28} {shape:>16} {result['wall_s']:8.2f}s "
+                    f"{result['peak_rss_mb'] or 0:7.0f} MiB {result['output_mb']:6.1f} MiB  {_top_phases(result['phases'])}")
+            found = regressions(result, previous[_case_key(result)], args.threshold) if _case_key(result) in previous else []
+            if found:
+                regressed.append((result, found))
+                line += "  ⚠️ " + "; ".join(found)
+            print(line)
+
+    history.append({
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "results": results,
+    })
+    save_history(history, args.history)
+    print(f"\n{len(results)} cases recorded in {os.path.relpath(args.history)}; {len(regressed)} regressed.")
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Background job queue for agent runs, with SQLite as the broker.
+
+Run standalone workers (for an app started with PIPELINE_JOB_WORKERS=0):
+
+    python jobs.py --workers 2
+"""
+import argparse
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from tools import workspace
+from tools.instrumentation import trace_run
+
+# Agent runs are queued in a SQLite file and picked up by worker threads, so a
+# multi-minute run never blocks a Streamlit script run, and its progress and
+# result outlive the page: any rerun (or a reload with the same user) reattaches.
+# Jobs write their files into the workspace of their user and dataset
+# (tools/workspace.py): single-agent jobs pick up what earlier ones saved,
+# and jobs of other users or datasets run side by side. Jobs sharing a
+# workspace never run at the same time.
+JOBS_DB = os.environ.get("PIPELINE_JOBS_DB", os.path.join(".cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("PIPELINE_JOB_WORKERS", 2))
+# Jobs of one user that may run at the same time; the rest wait in the queue
+JOBS_PER_USER = int(os.environ.get("PIPELINE_JOBS_PER_USER", 1))
+# Idle workers look for new jobs this often (jobs submitted in-process wake them at once)
+POLL_SECONDS = 1.0
+# Finished jobs older than this are deleted when the queue starts
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created);
+CREATE INDEX IF NOT EXISTS jobs_by_user ON jobs (user, created);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation was requested."""
+
+
+@dataclass
+class Job:
+    id: str
+    user: str
+    kind: str
+    params: dict
+    status: str
+    progress: float
+    message: str
+    result: Optional[dict]
+    error: Optional[str]
+    cancel_requested: bool
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def workspace_id(self):
+        return _workspace_id(self.id, self.user, self.params)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row["id"], user=row["user"], kind=row["kind"], params=json.loads(row["params"]),
+            status=row["status"], progress=row["progress"], message=row["message"],
+            result=json.loads(row["result"]) if row["result"] else None, error=row["error"],
+            cancel_requested=bool(row["cancel_requested"]), created=row["created"],
+            started=row["started"], finished=row["finished"],
+        )
+
+
+def _workspace_id(job_id, user, params):
+    # Jobs without a dataset (older model-suggestion jobs) keep a workspace of their own
+    if params.get("dataset_path"):
+        return workspace.dataset_run_id(user, params["dataset_path"])
+    return job_id
+
+
+# --- job kinds ----------------------------------------------------------------
+# Each takes the job's params and a `progress(fraction, message)` reporter and
+# returns a JSON-serialisable dict with at least a "results" mapping.
+
+def _full_pipeline(params, progress):
+    from pipeline import full_pipeline_stages, run_dag
+
+    stages = full_pipeline_stages(params["dataset_path"], params["dataset_keywords"])
+    finished = []
+
+    def on_stage(name, status):
+        if status != "started":
+            finished.append(name)
+        progress(len(finished) / len(stages), f"{name} {status}")
+
+    run = run_dag(stages, progress=on_stage)
+    return {
+        "results": run.results,
+        "errors": {name: f"{type(exc).__name__}: {exc}" for name, exc in run.errors.items()},
+        "skipped": run.skipped,
+        "timings": run.timings,
+        "wall_time": run.wall_time,
+    }
+
+
+def _single_agent(name, run_name, param):
+    def run(params, progress):
+        import pipeline
+
+        progress(0.0, f"{name} running")
+        return {"results": {name: getattr(pipeline, run_name)(params[param])}}
+    return run
+
+
+JOB_KINDS = {
+    "full_pipeline": _full_pipeline,
+    "eda": _single_agent("eda", "run_eda", "dataset_path"),
+    "dashboard": _single_agent("dashboard", "run_dashboard", "dataset_path"),
+    "preprocessing": _single_agent("preprocessing", "run_preprocessing", "dataset_path"),
+    "model_suggestion": _single_agent("model_suggestion", "run_model_suggestion", "dataset_keywords"),
+}
+
+
+# --- queue --------------------------------------------------------------------
+
+class JobQueue:
+    """Submit, poll and cancel agent runs; `start()` adds worker threads to this process.
+
+    Workers claim the oldest queued job whose user is under the per-user
+    cap and whose dataset has no running job of that user (the two would
+    share a workspace). Cancelling a queued job removes it at once; a running job stops at
+    its next progress report (between pipeline stages), since an agent call
+    in flight cannot be interrupted.
+    """
+
+    def __init__(self, path=JOBS_DB, per_user=JOBS_PER_USER):
+        self.path = path
+        self.per_user = per_user
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = []
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Closing(db)
+
+    # --- client side ---
+
+    def submit(self, user, kind, **params):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'; expected one of {sorted(JOB_KINDS)}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as db:
+            db.execute("INSERT INTO jobs (id, user, kind, params, status, message, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (job_id, user, kind, json.dumps(params), QUEUED, "queued", time.time()))
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def jobs(self, user, limit=10):
+        """The user's most recent jobs, newest first."""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs WHERE user = ? ORDER BY created DESC LIMIT ?", (user, limit)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def cancel(self, job_id):
+        with self._connect() as db:
+            dropped = db.execute("UPDATE jobs SET status = ?, message = ?, finished = ? WHERE id = ? AND status = ?",
+                                 (CANCELLED, "cancelled before it started", time.time(), job_id, QUEUED)).rowcount
+            if not dropped:
+                db.execute("UPDATE jobs SET cancel_requested = 1, message = ? WHERE id = ? AND status = ?",
+                           ("cancelling after the running step", job_id, RUNNING))
+
+    # --- worker side ---
+
+    def _claim(self):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs AS j WHERE status = ? AND "
+                    "(SELECT COUNT(*) FROM jobs AS r WHERE r.user = j.user AND r.status = ?) < ? AND "
+                    "NOT EXISTS (SELECT 1 FROM jobs AS r WHERE r.user = j.user AND r.status = ? AND "
+                    "json_extract(r.params, '$.dataset_path') = json_extract(j.params, '$.dataset_path')) "
+                    "ORDER BY created LIMIT 1", (QUEUED, RUNNING, self.per_user, RUNNING)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = ?, message = ?, started = ?, worker = ? WHERE id = ?",
+                               (RUNNING, "starting", time.time(), self.worker_id, row["id"]))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return Job.from_row(row) if row else None
+
+    def _progress(self, job_id, fraction, message):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND cancel_requested = 0",
+                       (min(max(fraction, 0.0), 1.0), message, job_id))
+            cancelled = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        if cancelled:
+            raise JobCancelled(job_id)
+
+    def _finish(self, job_id, status, message, result=None, error=None):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, message = ?, result = ?, error = ?, finished = ?, "
+                       "progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ?",
+                       (status, message, json.dumps(result, default=str) if result is not None else None,
+                        error, time.time(), status, job_id))
+
+    def run_job(self, job):
+        """Run a claimed job in this thread, in its user's workspace for the dataset, and record its outcome."""
+        run = workspace.create_run(job.workspace_id)
+        try:
+            with workspace.use_workspace(run), trace_run(job.kind) as trace:
+                result = JOB_KINDS[job.kind](job.params, lambda fraction, message: self._progress(job.id, fraction, message))
+            result["workspace"] = run.root
+            result["trace"] = trace.save(run.root)
+        except JobCancelled:
+            self._finish(job.id, CANCELLED, "cancelled")
+        except Exception as exc:
+            self._finish(job.id, FAILED, "failed", error=f"{type(exc).__name__}: {exc}")
+        else:
+            self._finish(job.id, DONE, "done", result=result)
+        self.cleanup()
+
+    def _work(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self.run_job(job)
+
+    def recover(self):
+        """Fail jobs left running by a process of this host that has exited, and prune old jobs."""
+        host = socket.gethostname()
+        with self._connect() as db:
+            for row in db.execute("SELECT id, worker FROM jobs WHERE status = ?", (RUNNING,)).fetchall():
+                worker_host, _, pid = (row["worker"] or "").rpartition(":")
+                if worker_host == host and pid.isdigit() and not _process_alive(int(pid)):
+                    self._finish(row["id"], FAILED, "interrupted", error="The worker running this job exited.")
+            db.execute("DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished < ?",
+                       (*ACTIVE, time.time() - JOB_RETENTION_SECONDS))
+        self.cleanup()
+
+    def cleanup(self):
+        """Apply the workspace retention policy to run and upload directories, sparing active jobs."""
+        with self._connect() as db:
+            active = db.execute("SELECT id, user, params FROM jobs WHERE status IN (?, ?)", ACTIVE).fetchall()
+        workspace.cleanup(workspace.WORKSPACE_ROOT,
+                          keep={_workspace_id(row["id"], row["user"], json.loads(row["params"])) for row in active})
+        workspace.cleanup(workspace.UPLOADS_ROOT, keep={os.path.basename(workspace.uploads_dir(row["user"])) for row in active})
+
+    def start(self, workers=JOB_WORKERS):
+        """Start worker threads in this process, once; later calls are no-ops."""
+        with self._lock:
+            if self._threads or workers <= 0:
+                return
+            self.recover()
+            for i in range(workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+
+class _Closing:
+    """`with` block that closes the connection (sqlite3's own only ends a transaction)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, *exc):
+        self.db.close()
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def default_queue():
+    return JobQueue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    args = parser.parse_args()
+    default_queue().start(max(args.workers, 1))
+    print(f"{max(args.workers, 1)} job workers on {os.path.abspath(default_queue().path)}; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
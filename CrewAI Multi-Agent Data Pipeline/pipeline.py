@@ -0,0 +1,191 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from registry import get_llm, lease_agent
+from tools.context import agent_facts, build_context, log_call
+from tools.instrumentation import phase
+from tools.workspace import output_path
+
+
+def get_result_text(result):
+    try:
+        return str(result.output)
+    except AttributeError:
+        return str(result)
+
+
+def run_agent(name, description, expected_output, dataset_path=None):
+    """Run one registered agent on a single task and return its text output.
+
+    The task description is packed with the facts earlier stages saved,
+    within the agent's token budget, and the prompt size is logged.
+    """
+    # crewai is imported on the first run, not when the app starts
+    from crewai import Task, Crew
+
+    model = get_llm().model
+    context = build_context(name, description, agent_facts(name, dataset_path), model)
+    with lease_agent(name) as agent, phase(f"crew:{name}", "agent", prompt_tokens=context.tokens):
+        task = Task(description=context.text, agent=agent, expected_output=expected_output)
+        result = Crew(agents=[agent], tasks=[task], verbose=True).kickoff()
+    usage = getattr(result, "token_usage", None)
+    log_call(name, model, context, getattr(usage, "prompt_tokens", None), getattr(usage, "successful_requests", None))
+    return get_result_text(result)
+
+
+# --- single-agent stages ----------------------------------------------------
+# Agents still hand results to each other through files (eda_report.txt,
+# dashboard_output/, processed_output/ in the run's workspace), so the stage
+# order below matters.
+
+def run_eda(dataset_path):
+    # Only the path and schema go into the prompt; the tool profiles the file itself
+    text = run_agent(
+        "eda",
+        description=f"Perform EDA on the dataset file at path: {dataset_path}",
+        expected_output="A detailed EDA report saved to eda_report.txt.",
+        dataset_path=dataset_path
+    )
+    with open(output_path("eda_report.txt"), "w", encoding="utf-8") as f:
+        f.write(text)
+    return text
+
+
+def run_dashboard(dataset_path):
+    return run_agent(
+        "dashboard",
+        description=f"Generate visualizations for uploaded data at path: {dataset_path}",
+        expected_output="Textual summary of insights and an HTML dashboard file.",
+        dataset_path=dataset_path
+    )
+
+
+def run_preprocessing(dataset_path):
+    return run_agent(
+        "preprocessing",
+        description=f"Run preprocessing on data at this path: {dataset_path}",
+        expected_output="Return preprocessing summary and preview of processed data.",
+        dataset_path=dataset_path
+    )
+
+
+def run_model_suggestion(dataset_keywords):
+    return run_agent(
+        "model_suggestion",
+        description=f"Suggest ML models for {dataset_keywords} based on EDA, visuals, and online references.",
+        expected_output="Model recommendations with explanations from local and external sources."
+    )
+
+
+# --- DAG scheduler ------------------------------------------------------------
+
+class Stage:
+    """A named unit of work that may start once all of `depends_on` succeeded."""
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+class PipelineRun:
+    """Outcome of `run_dag`: per-stage results, errors and timings."""
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+        self.timings = {}
+        self.wall_time = 0.0
+
+    @property
+    def ok(self):
+        return not self.errors and not self.skipped
+
+    def stage_seconds(self):
+        return {name: end - start for name, (start, end) in self.timings.items()}
+
+
+def _check_dag(stages):
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = set(stage.depends_on) - names
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(unknown)}")
+    remaining = {stage.name: set(stage.depends_on) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Pipeline has a dependency cycle among: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def run_dag(stages, max_workers=None, progress=None):
+    """Run stages on a thread pool as soon as their dependencies finish.
+
+    Independent stages overlap, so wall time tracks the longest dependency
+    path rather than the sum of all stages. A failed stage's dependents are
+    skipped; unrelated branches keep running.
+
+    `progress(stage_name, status)` is called from the scheduling thread as
+    each stage starts, succeeds, fails or is skipped; if it raises, no
+    further stage is started and the exception propagates once the running
+    ones finish.
+    """
+    report = progress or (lambda name, status: None)
+    _check_dag(stages)
+    run = PipelineRun()
+    pending = {stage.name: stage for stage in stages}
+    origin = time.perf_counter()
+
+    def timed(stage):
+        start = time.perf_counter() - origin
+        try:
+            with phase(stage.name, "stage"):
+                return stage.run()
+        finally:
+            run.timings[stage.name] = (start, time.perf_counter() - origin)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in run.errors or dep in run.skipped for dep in stage.depends_on):
+                    run.skipped.append(name)
+                    del pending[name]
+                    report(name, "skipped")
+                elif all(dep in run.results for dep in stage.depends_on):
+                    report(name, "started")
+                    # Each stage runs in a copy of this context, so an active trace follows it
+                    running[pool.submit(contextvars.copy_context().run, timed, stage)] = name
+                    del pending[name]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    run.results[name] = future.result()
+                except Exception as exc:
+                    run.errors[name] = exc
+                    report(name, "failed")
+                else:
+                    report(name, "done")
+    run.skipped.extend(pending)
+    run.wall_time = time.perf_counter() - origin
+    return run
+
+
+def full_pipeline_stages(dataset_path, dataset_keywords):
+    """EDA and dashboard in parallel, then preprocessing, then model suggestion."""
+    return [
+        Stage("eda", lambda: run_eda(dataset_path)),
+        Stage("dashboard", lambda: run_dashboard(dataset_path)),
+        Stage("preprocessing", lambda: run_preprocessing(dataset_path), depends_on=["eda"]),
+        Stage("model_suggestion", lambda: run_model_suggestion(dataset_keywords),
+              depends_on=["eda", "dashboard", "preprocessing"]),
+    ]
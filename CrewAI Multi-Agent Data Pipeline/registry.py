@@ -0,0 +1,101 @@
+import contextlib
+import functools
+import importlib
+import os
+import threading
+
+# Agents, their tools and the LLM client are built on first use and then kept
+# for the life of the process (the same lifetime as `st.cache_resource`), so
+# Streamlit reruns never rebuild them and an EDA-only session never imports
+# the plotting or scikit-learn stacks of the other agents.
+
+GEMINI_MODEL = "gemini/gemini-2.0-flash"
+LLM_TEMPERATURE = 0.7
+
+# "gemini" calls the hosted model; "stub" answers locally, for offline runs and benchmarks
+LLM_BACKEND = os.environ.get("PIPELINE_LLM_BACKEND", "gemini")
+STUB_LATENCY = float(os.environ.get("PIPELINE_STUB_LATENCY", 0.0))
+# PIPELINE_LLM_CACHE=0 sends every request to the backend
+LLM_CACHE_ENABLED = os.environ.get("PIPELINE_LLM_CACHE", "1") != "0"
+
+# Agent name -> module exposing `build_agent(llm)`
+AGENT_MODULES = {
+    "eda": "agents.eda_agent",
+    "dashboard": "agents.dashboard_agent",
+    "preprocessing": "agents.preprocessing_agent",
+    "model_suggestion": "agents.model_suggestion_agent",
+}
+
+# Pipeline stages run on threads; one lock keeps two stages from building the same object twice
+_lock = threading.RLock()
+_built = set()
+# Agents not running a task right now. A crewai agent cannot run two tasks at
+# once, so concurrent runs that need the same agent each lease an instance.
+_idle = {}
+
+
+def _built_once(build):
+    cached = functools.lru_cache(maxsize=None)(build)
+
+    @functools.wraps(build)
+    def get(*args):
+        with _lock:
+            return cached(*args)
+
+    get.cache_info = cached.cache_info
+    get.cache_clear = cached.cache_clear
+    return get
+
+
+@_built_once
+def get_llm():
+    """The LLM client shared by every agent, behind the response cache unless it is disabled."""
+    from tools.llm_cache import CachedLLM, StubLLM
+
+    if LLM_BACKEND == "stub":
+        llm = StubLLM(model="stub", latency=STUB_LATENCY)
+    elif LLM_BACKEND == "gemini":
+        from crewai import LLM
+
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY is not set; export your Gemini API key, "
+                               "or set PIPELINE_LLM_BACKEND=stub to run without an LLM")
+        llm = LLM(model=GEMINI_MODEL, temperature=LLM_TEMPERATURE, api_key=api_key)
+    else:
+        raise ValueError(f"Unknown PIPELINE_LLM_BACKEND '{LLM_BACKEND}'; expected 'gemini' or 'stub'")
+    return CachedLLM.wrap(llm) if LLM_CACHE_ENABLED else llm
+
+
+@_built_once
+def get_agent(name):
+    """The agent registered under `name`, importing its module and tool on the first call."""
+    if name not in AGENT_MODULES:
+        raise KeyError(f"Unknown agent '{name}'; expected one of {sorted(AGENT_MODULES)}")
+    agent = importlib.import_module(AGENT_MODULES[name]).build_agent(get_llm())
+    _built.add(name)
+    return agent
+
+
+@contextlib.contextmanager
+def lease_agent(name):
+    """An agent registered under `name`, for the duration of one task.
+
+    The shared `get_agent` instance is handed out first; when every instance
+    is busy a new one is built (on the shared LLM) and kept for later runs.
+    """
+    with _lock:
+        idle = _idle.setdefault(name, [get_agent(name)])
+        agent = idle.pop() if idle else None
+    if agent is None:
+        agent = importlib.import_module(AGENT_MODULES[name]).build_agent(get_llm())
+    try:
+        yield agent
+    finally:
+        with _lock:
+            _idle[name].append(agent)
+
+
+def loaded_agents():
+    """Names of the agents built so far in this process."""
+    return [name for name in AGENT_MODULES if name in _built]
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the app's modules the way the app does, from the project folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, so outputs, .cache/ and the shared result cache stay out of the tree."""
+    monkeypatch.chdir(tmp_path)
+    from tools.result_cache import default_cache
+    default_cache.cache_clear()
+    yield tmp_path
+    default_cache.cache_clear()
+
+
+def make_frame(rows=300, seed=0):
+    """Small mixed table: numeric, ordinal (CALC), nominal and identifier columns, a class target last."""
+    rng = np.random.default_rng(seed)
+    age = rng.normal(30, 8, rows)
+    age[rng.random(rows) < 0.05] = np.nan
+    weight = age * 1.5 + rng.normal(0, 5, rows)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "Age": age,
+        "Weight": weight,
+        "CALC": rng.choice(["no", "Sometimes", "Frequently"], rows),
+        "Gender": rng.choice(["Male", "Female"], rows),
+        "label": np.where(weight > 45, "high", "low"),
+    })
+
+
+@pytest.fixture
+def small_csv(workdir):
+    path = os.path.join(workdir, "small.csv")
+    make_frame().to_csv(path, index=False)
+    return path
@@ -0,0 +1,34 @@
+import pytest
+
+import registry
+from tools.search_client import SearchClient, SearchError
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def use(name):
+        monkeypatch.setattr(registry, "LLM_BACKEND", name)
+        registry.get_llm.cache_clear()
+    yield use
+    registry.get_llm.cache_clear()
+
+
+def test_gemini_backend_needs_a_key_from_the_environment(backend, monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    backend("gemini")
+    with pytest.raises(RuntimeError, match="GEMINI_API_KEY is not set"):
+        registry.get_llm()
+
+
+def test_stub_backend_runs_without_a_key(backend, monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    backend("stub")
+    assert registry.get_llm().model == "stub"
+
+
+def test_search_without_a_key_fails_before_sending_a_request(monkeypatch):
+    monkeypatch.delenv("SERPAPI_API_KEY", raising=False)
+    client = SearchClient()
+    [result] = client.search_many(["titanic"])
+    assert isinstance(result, SearchError) and "SERPAPI_API_KEY is not set" in str(result)
+    assert client.requests_sent == 0
@@ -0,0 +1,65 @@
+import pytest
+
+from tools.context import Fact, build_context, count_tokens, pack, token_budget, truncate_tokens
+
+
+def lines(name, n):
+    return "\n".join(f"{name} line {i}: " + "x" * 40 for i in range(n))
+
+
+@pytest.fixture
+def facts():
+    return [
+        Fact("profile", lines("profile", 20), 40),
+        Fact("task", "Suggest models for the obesity dataset.", 100, required=True),
+        Fact("target", "Likely target: label (classification).", 80),
+        Fact("empty", "", 90),
+        Fact("report", lines("report", 40), 20),
+        Fact("missing", lines("missing", 3), 60),
+        Fact("skew", "Skewed numeric columns: Age (+1.2).", 55),
+    ]
+
+
+def test_packed_context_stays_within_the_budget(facts):
+    for budget in range(20, 600):
+        context = pack(facts, budget)
+        assert context.tokens == count_tokens(context.text) <= budget, budget
+        assert context.budget == budget
+
+
+def test_highest_ranked_facts_are_kept_when_truncating(facts):
+    context = pack(facts, 200)
+
+    assert context.included[:4] == ["task", "target", "missing", "skew"]
+    assert context.truncated == ["profile"] and context.dropped == ["report"]
+    # Ranked order in the output, the truncated fact cut at a line break
+    text = context.text
+    assert text.index("Suggest models") < text.index("Likely target") < text.index("missing line 2") < text.index("profile line 0")
+    assert text.endswith("…") and "report line" not in text
+
+
+def test_everything_fits_a_large_budget(facts):
+    context = pack(facts, 10_000)
+    assert context.included == ["task", "target", "missing", "skew", "profile", "report"]
+    assert not context.truncated and not context.dropped
+
+
+def test_required_facts_are_kept_whole_even_over_budget():
+    task = lines("task", 10)
+    context = pack([Fact("task", task, 100, required=True), Fact("target", "Likely target: label.", 80)], 20)
+    assert context.text == task and context.dropped == ["target"]
+
+
+def test_truncation_respects_the_budget():
+    text = lines("report", 50)
+    for budget in (5, 30, 120):
+        cut = truncate_tokens(text, budget)
+        assert count_tokens(cut) <= budget and cut.endswith("…")
+        assert text.startswith(cut[:-1])
+    assert truncate_tokens("short", 10) == "short"
+
+
+def test_agent_contexts_use_the_agent_budget(facts):
+    context = build_context("eda", "Explore the dataset.", [fact for fact in facts if not fact.required])
+    assert context.budget == token_budget("eda") and context.tokens <= context.budget
+    assert context.text.startswith("Explore the dataset.")
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_frame
+from tools import lineage
+from tools.correlation import (correlation_pairs, correlation_ratio_pairs, cramers_v_pairs, encode_categories,
+                               find_associations, sample_rows)
+from tools.explore_csv_tool import ExploreCSVDataTool
+from tools.lineage import profile_dataset
+from tools.profiling import CovarianceAccumulator, RowSample
+
+
+def _frame(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    df = pd.DataFrame({
+        "x": x,
+        "y": 2 * x + rng.normal(0, 0.5, rows),
+        "z": np.exp(x) + rng.normal(0, 0.1, rows),
+        "noise": rng.normal(size=rows),
+    })
+    df["group"] = np.where(x > 0.5, "high", np.where(x < -0.5, "low", "mid"))
+    df["echo"] = df["group"].where(rng.random(rows) < 0.8, "mid")
+    df["coin"] = rng.choice(["heads", "tails"], rows)
+    return df
+
+
+def _by_pair(pairs):
+    return {frozenset((pair.left, pair.right)): pair.value for pair in pairs}
+
+
+def _reference_cramers_v(a, b):
+    """Bias-corrected Cramér's V (Bergsma) from a pandas crosstab."""
+    table = pd.crosstab(a, b).to_numpy().astype(float)
+    n = table.sum()
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / n
+    phi2 = ((table - expected) ** 2 / expected).sum() / n
+    r, k = table.shape
+    phi2 = max(phi2 - (k - 1) * (r - 1) / (n - 1), 0.0)
+    r_corr, k_corr = r - (r - 1) ** 2 / (n - 1), k - (k - 1) ** 2 / (n - 1)
+    return np.sqrt(phi2 / min(k_corr - 1, r_corr - 1))
+
+
+def _reference_eta(groups, values):
+    """Correlation ratio adjusted for the number of groups, from a pandas groupby."""
+    total = ((values - values.mean()) ** 2).sum()
+    between = values.groupby(groups).agg(lambda v: len(v) * (v.mean() - values.mean()) ** 2).sum()
+    n, k = len(values), groups.nunique()
+    return np.sqrt(max(1 - (1 - between / total) * (n - 1) / (n - k), 0.0))
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_correlation_pairs_match_pandas(method):
+    df = _frame()[["x", "y", "z", "noise"]]
+    pairs = _by_pair(correlation_pairs(df.to_numpy(), df.columns, method, threshold=0, top_k=100, block=2))
+
+    expected = df.corr(method=method)
+    assert len(pairs) == 6
+    for (a, b), r in [((a, b), expected.loc[a, b]) for i, a in enumerate(df.columns) for b in df.columns[i + 1:]]:
+        assert pairs[frozenset((a, b))] == pytest.approx(r, abs=1e-5)
+
+
+def test_pearson_pairs_are_pairwise_complete():
+    df = _frame()[["x", "y", "z"]]
+    df.loc[::7, "x"] = np.nan
+    df.loc[::5, "z"] = np.nan
+    pairs = _by_pair(correlation_pairs(df.to_numpy(), df.columns, threshold=0, top_k=100))
+
+    expected = df.corr()
+    assert pairs[frozenset(("x", "z"))] == pytest.approx(expected.loc["x", "z"], abs=1e-5)
+    assert pairs[frozenset(("y", "z"))] == pytest.approx(expected.loc["y", "z"], abs=1e-5)
+
+
+def test_cramers_v_and_correlation_ratio_match_references():
+    df = _frame()
+    categorical = ["group", "echo", "coin"]
+    codes, levels = encode_categories(df[categorical])
+
+    v = _by_pair(cramers_v_pairs(codes, levels, categorical, threshold=0, top_k=100))
+    for a, b in [("group", "echo"), ("group", "coin"), ("echo", "coin")]:
+        assert v.get(frozenset((a, b)), 0.0) == pytest.approx(_reference_cramers_v(df[a], df[b]), abs=1e-5)
+
+    values = df[["x", "noise"]].to_numpy()
+    eta = _by_pair(correlation_ratio_pairs(codes, levels, categorical, values, ["x", "noise"], threshold=0, top_k=100))
+    for group, col in [("group", "x"), ("coin", "x"), ("echo", "noise")]:
+        assert eta.get(frozenset((group, col)), 0.0) == pytest.approx(_reference_eta(df[group], df[col]), abs=1e-4)
+
+
+def test_tables_over_the_memory_budget_are_sampled():
+    df = _frame(20_000)
+    numeric, categorical = ["x", "y", "z", "noise"], ["group", "echo"]
+    chunks = [df.iloc[i:i + 3000] for i in range(0, len(df), 3000)]
+    rows = sample_rows(len(df), len(numeric), len(categorical), max_bytes=1, workers=1)
+
+    result = find_associations(iter(chunks), len(df), numeric, categorical, max_bytes=1, workers=1)
+    assert rows == 1000 and result.sampled and result.total_rows == 20_000
+    assert abs(result.rows - rows) < 200
+    # The sample still finds the strong pairs
+    assert {frozenset((p.left, p.right)) for p in result.by_method("pearson")} >= {frozenset(("x", "y"))}
+    assert {p.method for p in result.pairs} >= {"spearman", "cramers_v", "correlation_ratio"}
+
+
+def test_merged_co_moments_match_pandas():
+    df = _frame()[["x", "y", "z", "noise"]]
+    df.loc[::7, "x"] = np.nan
+    df.loc[::3, "noise"] = np.nan
+    parts = []
+    for start in range(0, len(df), 120):
+        part = CovarianceAccumulator(df.columns)
+        part.update(df.iloc[start:start + 120].to_numpy())
+        parts.append(part)
+    total = CovarianceAccumulator(df.columns)
+    for part in reversed(parts):
+        total.merge(part)
+
+    np.testing.assert_allclose(total.correlation().to_numpy(), df.corr().to_numpy(), atol=1e-10)
+
+
+def test_row_samples_merge_into_the_sample_of_the_union():
+    df = _frame(1000)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    whole = RowSample(100)
+    whole.update(df, hashes)
+    merged = RowSample(100)
+    for start in range(0, len(df), 300):
+        part = RowSample(100)
+        part.update(df.iloc[start:start + 300], hashes[start:start + 300])
+        merged.merge(part)
+
+    assert sorted(merged.hashes) == sorted(whole.hashes) == sorted(np.sort(hashes)[:100])
+
+
+def test_eda_reads_the_file_once_and_correlates_every_row(small_csv, monkeypatch):
+    passes = []
+    iter_frames = lineage.iter_frames
+    monkeypatch.setattr(lineage, "iter_frames", lambda *args, **kwargs: passes.append(args) or iter_frames(*args, **kwargs))
+
+    report = ExploreCSVDataTool(chunksize=100)._run(small_csv)
+    assert len(passes) == 1
+    r = make_frame()[["Age", "Weight"]].corr().loc["Age", "Weight"]
+    assert f"Age ~ Weight ({r:+.2f})" in report
+
+
+def test_appended_rows_update_the_saved_co_moments(small_csv, tmp_path):
+    directory = str(tmp_path / "lineage")
+    profile_dataset(small_csv, 100, directory)
+    grown = pd.concat([make_frame(), make_frame(150, seed=4)], ignore_index=True)
+    grown.to_csv(small_csv, index=False)
+
+    update = profile_dataset(small_csv, 100, directory)
+    assert update.reused_blocks == 3
+    expected = grown.select_dtypes("number").corr()
+    np.testing.assert_allclose(update.profiler.correlation().to_numpy(), expected.to_numpy(), atol=1e-10)
@@ -0,0 +1,63 @@
+import re
+import zipfile
+
+import pytest
+
+from tools.dashboard_pages import page_html, prune_assets, write_archive, write_asset
+
+
+def sections(n):
+    return [(f"col{i}", "numeric", [f"plot{i}.png"], [f"<p>col{i}</p>"]) for i in range(n)]
+
+
+def pages(page):
+    """`(number, hidden, [columns])` for each page div of a dashboard page."""
+    found = re.findall(r'<div class="page" id="page-(\d+)"( hidden)?>(.*?)</div>', page)
+    return [(int(number), bool(hidden), re.findall(r"<p>(col\d+)</p>", body)) for number, hidden, body in found]
+
+
+@pytest.mark.parametrize("n, page_columns, sizes", [
+    (45, 20, [20, 20, 5]),
+    (20, 20, [20]),
+    (21, 20, [20, 1]),
+    (7, 3, [3, 3, 1]),
+])
+def test_sections_are_split_into_pages_in_order(n, page_columns, sizes):
+    page = page_html(sections(n), page_columns=page_columns)
+    found = pages(page)
+
+    assert [number for number, _, _ in found] == list(range(1, len(sizes) + 1))
+    assert [len(columns) for _, _, columns in found] == sizes
+    assert [column for _, _, columns in found for column in columns] == [f"col{i}" for i in range(n)]
+    # Only the first page is shown until another is picked from the nav
+    assert [hidden for _, hidden, _ in found] == [False] + [True] * (len(sizes) - 1)
+    assert re.findall(r'<a href="#page-(\d+)">', page) == [str(number) for number in range(1, len(sizes) + 1)]
+    assert page.count('loading="lazy"') == n
+
+
+def test_no_sections_give_one_empty_page():
+    found = pages(page_html([]))
+    assert found == [(1, False, [])]
+
+
+def test_assets_are_written_once_by_content(tmp_path):
+    first = write_asset(b"png bytes", str(tmp_path), "png")
+    assert write_asset(b"png bytes", str(tmp_path), "png") == first
+    other = write_asset(b"other bytes", str(tmp_path), "png")
+    assert other != first
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([first, other])
+
+    prune_assets(str(tmp_path), keep={other})
+    assert [path.name for path in tmp_path.iterdir()] == [other]
+
+
+def test_archive_holds_the_page_and_its_assets(tmp_path):
+    (tmp_path / "assets").mkdir()
+    name = write_asset(b"png bytes", str(tmp_path / "assets"), "png")
+    (tmp_path / "index.html").write_text(page_html(sections(2)))
+
+    archive_path = write_archive(str(tmp_path), ["index.html", f"assets/{name}"])
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.read(f"assets/{name}") == b"png bytes"
+        assert archive.getinfo(f"assets/{name}").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("index.html").compress_type == zipfile.ZIP_DEFLATED
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from conftest import make_frame
+from tools.data_dashboard_tool import DataDashboardTool
+from tools.insights import DASHBOARD_INSIGHTS_PATH, load_insights
+from tools.result_cache import default_cache
+
+
+def _dashboard(path):
+    return DataDashboardTool(render_workers=1)._run(path)
+
+
+def test_cache_hit_does_not_replay_the_reuse_note(small_csv):
+    _dashboard(small_csv)
+    shifted = make_frame()
+    shifted["Age"] += 20
+    shifted.to_csv(small_csv, index=False)
+
+    assert "Redrew the plots of 1 of 6 columns" in _dashboard(small_csv)
+    hits = default_cache().stats()["hits"]
+    assert "Redrew" not in _dashboard(small_csv)
+    assert default_cache().stats()["hits"] == hits + 1
+
+
+def test_cache_hit_points_the_record_at_the_new_path(small_csv, workdir):
+    _dashboard(small_csv)
+    copy = os.path.join(workdir, "renamed.csv")
+    shutil.copyfile(small_csv, copy)
+    _dashboard(copy)
+
+    assert default_cache().stats()["hits"] == 1
+    assert load_insights(DASHBOARD_INSIGHTS_PATH).source == copy
+
+
+def test_another_file_with_the_same_header_reuses_nothing(small_csv, workdir):
+    _dashboard(small_csv)
+    other = os.path.join(workdir, "other.csv")
+    make_frame(200, seed=7).to_csv(other, index=False)
+
+    assert "Redrew" not in _dashboard(other)
+    record = load_insights(DASHBOARD_INSIGHTS_PATH)
+    assert (record.rows, record.columns["Age"].count) == (200, 200 - make_frame(200, seed=7)["Age"].isna().sum())
+
+
+def test_columns_that_did_not_move_get_current_statistics(small_csv):
+    _dashboard(small_csv)
+    grown = pd.concat([make_frame(), make_frame(30, seed=5)], ignore_index=True)
+    grown.to_csv(small_csv, index=False)
+
+    assert "Redrew the plots of" in _dashboard(small_csv)
+    record = load_insights(DASHBOARD_INSIGHTS_PATH)
+    assert record.rows == 330
+    for col in ("Age", "Weight"):
+        expected = grown[col].dropna()
+        assert record.columns[col].count == len(expected)
+        assert record.columns[col].mean == pytest.approx(expected.mean())
+    assert record.columns["Gender"].count == 330
@@ -0,0 +1,32 @@
+import pipeline
+from conftest import make_frame
+from tools.explore_csv_tool import ExploreCSVDataTool
+
+
+def test_report_size_does_not_grow_with_rows_or_cell_length(workdir):
+    df = make_frame(2000)
+    df["notes"] = ["free text " * 30 + str(i % 3) for i in range(len(df))]
+    path = str(workdir / "wide.csv")
+    df.to_csv(path, index=False)
+
+    report = ExploreCSVDataTool(use_cache=False)._run(path)
+    assert "2000 rows, 7 columns" in report
+    assert "free text " * 4 not in report and "…" in report
+
+    truncated = ExploreCSVDataTool(max_report_chars=1000, use_cache=False)._run(path)
+    assert len(truncated) <= 1100 and truncated.endswith("Report truncated to keep the prompt size bounded.")
+
+
+def test_inline_csv_text_is_still_accepted(workdir):
+    report = ExploreCSVDataTool()._run(make_frame(50).to_csv(index=False))
+    assert "50 rows, 6 columns" in report
+
+
+def test_eda_prompt_carries_the_path_not_the_data(small_csv, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, "run_agent", lambda name, **task: calls.append(task) or "report")
+    pipeline.run_eda(small_csv)
+
+    [task] = calls
+    assert small_csv in task["description"]
+    assert "Gender" not in task["description"] and len(task["description"]) < 200
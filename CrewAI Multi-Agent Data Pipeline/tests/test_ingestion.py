@@ -0,0 +1,68 @@
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import make_frame
+from tools import ingestion
+from tools.ingestion import ingest_upload, iter_frames, preview_frame, read_columns, read_frame
+
+
+def csv_bytes(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Counts CSV parses done by ingest_csv."""
+    calls = []
+    parse = ingestion.ingest_csv
+    monkeypatch.setattr(ingestion, "ingest_csv", lambda *args: calls.append(args) or parse(*args))
+    return calls
+
+
+def test_upload_round_trip_matches_read_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, "BATCH_ROWS", 64)
+    content = csv_bytes(make_frame(500))
+    arrow_path = ingest_upload("obesity.csv", content, data_dir=str(tmp_path))
+    expected = pd.read_csv(io.BytesIO(content))
+
+    assert arrow_path == str(tmp_path / "obesity.arrow")
+    assert read_columns(arrow_path) == list(expected.columns)
+    pd.testing.assert_frame_equal(read_frame(arrow_path), expected)
+    pd.testing.assert_frame_equal(read_frame(arrow_path, columns=["Age", "label"]), expected[["Age", "label"]])
+    pd.testing.assert_frame_equal(preview_frame(arrow_path), expected.head())
+
+    # Chunks span several record batches and still add up to the whole table
+    chunks = list(iter_frames(arrow_path, chunksize=100))
+    assert [len(chunk) for chunk in chunks] == [100] * 5
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_mixed_type_columns_are_kept_as_text(tmp_path):
+    content = b"code,value\n1,a\nx,b\n,c\n"
+    arrow_path = ingest_upload("mixed.csv", content, data_dir=str(tmp_path))
+    frame = read_frame(arrow_path)
+    assert frame["code"].tolist()[:2] == ["1", "x"] and pd.isna(frame["code"][2])
+
+
+def test_unchanged_upload_is_not_parsed_again(tmp_path, parses):
+    content = csv_bytes(make_frame())
+    ingest_upload("obesity.csv", content, data_dir=str(tmp_path))
+    ingest_upload("obesity.csv", content, data_dir=str(tmp_path))
+    assert len(parses) == 1
+
+
+def test_modified_upload_replaces_the_cached_arrow_file(tmp_path, parses):
+    ingest_upload("obesity.csv", csv_bytes(make_frame()), data_dir=str(tmp_path))
+    changed = csv_bytes(make_frame(350, seed=1))
+    arrow_path = ingest_upload("obesity.csv", changed, data_dir=str(tmp_path))
+
+    assert len(parses) == 2
+    pd.testing.assert_frame_equal(read_frame(arrow_path), pd.read_csv(io.BytesIO(changed)))
+
+
+def test_csv_paths_are_read_directly(small_csv):
+    expected = pd.read_csv(small_csv)
+    pd.testing.assert_frame_equal(read_frame(small_csv), expected)
+    assert sum(len(chunk) for chunk in iter_frames(small_csv, chunksize=64)) == len(expected)
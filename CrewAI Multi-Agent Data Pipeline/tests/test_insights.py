@@ -0,0 +1,37 @@
+from tools.context import agent_facts
+from tools.data_dashboard_tool import DataDashboardTool
+from tools.explore_csv_tool import ExploreCSVDataTool
+from tools.insights import DASHBOARD_INSIGHTS_PATH, EDA_INSIGHTS_PATH, load_insights, merge_records
+from tools.model_suggestion_tool import ModelSuggestionTool
+from tools.workspace import Workspace, output_path, use_workspace
+
+NO_RECORDS = "No EDA or dashboard insights found"
+
+
+def test_records_written_in_a_workspace_reach_its_readers(small_csv, tmp_path):
+    with use_workspace(Workspace(str(tmp_path / "run"))):
+        ExploreCSVDataTool()._run(small_csv)
+        DataDashboardTool(render_workers=1)._run(small_csv)
+        eda, dashboard = load_insights(output_path(EDA_INSIGHTS_PATH)), load_insights(output_path(DASHBOARD_INSIGHTS_PATH))
+        report = ModelSuggestionTool(screen_models=False)._report()
+        facts = {fact.name: fact.text for fact in agent_facts("model_suggestion", small_csv)}
+
+    assert eda.source == dashboard.source == small_csv
+    merged = merge_records(eda, dashboard)
+    assert merged.produced_by == "eda+dashboard"
+    assert (merged.target, merged.target_type) == ("label", "classification")
+    assert NO_RECORDS not in report and "Categorical target `label`" in report
+    assert "label" in facts["target"] and "Missing values: Age" in facts["missing"]
+
+    # Another workspace has no records of its own
+    with use_workspace(Workspace(str(tmp_path / "other"))):
+        assert NO_RECORDS in ModelSuggestionTool(screen_models=False)._report()
+
+
+def test_records_of_another_upload_are_not_merged(small_csv):
+    ExploreCSVDataTool()._run(small_csv)
+    eda = load_insights(EDA_INSIGHTS_PATH)
+    stale = load_insights(EDA_INSIGHTS_PATH)
+    stale.source, stale.produced_by, stale.columns = "old.csv", "dashboard", {}
+
+    assert merge_records(eda, stale).produced_by == "eda"
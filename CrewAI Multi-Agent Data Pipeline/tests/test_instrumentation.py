@@ -0,0 +1,77 @@
+import contextvars
+import json
+import threading
+import time
+
+from tools.instrumentation import Trace, phase, record_phases, trace_run
+
+
+def render():
+    with phase("dashboard", "stage") as span:
+        time.sleep(0.01)
+        span.add(plots=3)
+
+
+def traced_run(directory):
+    with trace_run("pipeline") as trace:
+        with phase("eda", "stage"):
+            with phase("parse csv", "io") as span:
+                time.sleep(0.01)
+                span.add(rows=1000, bytes=2 ** 20)
+            with phase("profile"):
+                time.sleep(0.01)
+        # A worker thread started from the run's context records into the same trace
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(render,), name="render")
+        worker.start()
+        worker.join()
+    return trace, trace.save(str(directory))
+
+
+def test_chrome_trace_has_complete_events_nested_in_their_parents(tmp_path):
+    trace, path = traced_run(tmp_path)
+    assert path.startswith(str(tmp_path)) and path.endswith("_pipeline.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    assert data["otherData"]["run"] == "pipeline"
+    threads = {event["tid"]: event["args"]["name"] for event in data["traceEvents"] if event["ph"] == "M"}
+    events = {event["name"]: event for event in data["traceEvents"] if event["ph"] == "X"}
+    assert set(events) == {"pipeline", "eda", "parse csv", "profile", "dashboard"}
+    for event in events.values():
+        assert event["ts"] >= 0 and event["dur"] > 0 and event["tid"] in threads
+
+    def contains(parent, child):
+        outer, inner = events[parent], events[child]
+        return (outer["tid"] == inner["tid"] and outer["ts"] <= inner["ts"]
+                and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"])
+
+    assert contains("pipeline", "eda") and contains("eda", "parse csv") and contains("eda", "profile")
+    assert events["parse csv"]["ts"] + events["parse csv"]["dur"] <= events["profile"]["ts"]
+    # Durations are in microseconds
+    assert 10_000 <= events["parse csv"]["dur"] < 1_000_000
+    assert events["parse csv"]["cat"] == "io" and events["parse csv"]["args"]["rows"] == 1000
+    assert events["parse csv"]["args"]["rows_per_s"] > 0 and "rss_delta_mb" in events["parse csv"]["args"]
+    assert threads[events["dashboard"]["tid"]] == "render" != threads[events["eda"]["tid"]]
+    assert events["dashboard"]["args"]["plots"] == 3
+
+
+def test_saved_traces_load_with_the_same_nesting(tmp_path):
+    trace, path = traced_run(tmp_path)
+    depths = {row["name"]: (row["thread"], row["depth"]) for row in Trace.load(path).rows()}
+    assert depths == {row["name"]: (row["thread"], row["depth"]) for row in trace.rows()}
+    assert depths["pipeline"][1] == 0 and depths["eda"][1] == 1 and depths["parse csv"][1] == 2
+    assert depths["dashboard"] == ("render", 0)
+
+
+def test_phases_are_only_timed_while_recording():
+    with phase("idle") as span:
+        span.add(rows=1)
+    assert span.args == {}
+
+    with record_phases() as recorder:
+        for _ in range(2):
+            with phase("eda"):
+                with phase("bin"):
+                    time.sleep(0.005)
+    assert set(recorder.phases) == {"eda", "eda/bin"}
+    assert recorder.phases["eda"] >= recorder.phases["eda/bin"] >= 0.01
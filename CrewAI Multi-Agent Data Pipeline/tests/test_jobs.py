@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+import jobs
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue
+from tools.workspace import output_path
+
+
+@pytest.fixture
+def queue(workdir, monkeypatch):
+    def succeed(params, progress):
+        progress(0.5, "half way")
+        with open(output_path("out.txt"), "w", encoding="utf-8") as f:
+            f.write(params["text"])
+        return {"results": {"test": params["text"]}}
+
+    def fail(params, progress):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "succeed", succeed)
+    monkeypatch.setitem(jobs.JOB_KINDS, "fail", fail)
+    return JobQueue(path=os.path.join(workdir, "jobs.sqlite3"))
+
+
+def test_job_runs_from_queued_to_done(queue):
+    job_id = queue.submit("alice", "succeed", text="hello")
+    assert queue.get(job_id).status == QUEUED
+
+    job = queue._claim()
+    assert job.id == job_id and queue.get(job_id).status == RUNNING
+    queue.run_job(job)
+
+    job = queue.get(job_id)
+    assert (job.status, job.progress, job.message) == (DONE, 1.0, "done")
+    assert job.result["results"] == {"test": "hello"}
+    with open(os.path.join(job.result["workspace"], "out.txt"), encoding="utf-8") as f:
+        assert f.read() == "hello"
+    # The trace is saved with the run's outputs, as the README says
+    assert os.path.dirname(job.result["trace"]) == job.result["workspace"]
+    assert os.path.exists(job.result["trace"])
+    assert job.started <= job.finished
+
+
+def test_failing_job_records_its_error(queue):
+    job_id = queue.submit("alice", "fail")
+    queue.run_job(queue._claim())
+    job = queue.get(job_id)
+    assert (job.status, job.error, job.result) == (FAILED, "RuntimeError: boom", None)
+
+
+def test_unknown_kind_is_rejected(queue):
+    with pytest.raises(ValueError, match="Unknown job kind"):
+        queue.submit("alice", "nope")
+
+
+def test_cancelling_a_queued_job_drops_it(queue):
+    job_id = queue.submit("alice", "succeed", text="x")
+    queue.cancel(job_id)
+    assert queue.get(job_id).status == CANCELLED
+    assert queue._claim() is None
+
+
+def test_cancelling_a_running_job_stops_it_at_the_next_progress_report(queue):
+    job_id = queue.submit("alice", "succeed", text="x")
+    job = queue._claim()
+    queue.cancel(job_id)
+    assert queue.get(job_id).cancel_requested
+    queue.run_job(job)
+    assert queue.get(job_id).status == CANCELLED
+
+
+def test_jobs_of_one_user_wait_for_the_running_one(queue):
+    first = queue.submit("alice", "succeed", text="1")
+    second = queue.submit("alice", "succeed", text="2")
+    other = queue.submit("bob", "succeed", text="3")
+
+    assert queue._claim().id == first
+    # Alice is at her cap of one running job, so Bob's later job goes first
+    assert queue._claim().id == other
+    assert queue._claim() is None
+    queue.run_job(queue.get(first))
+    assert queue._claim().id == second
+
+
+def test_recover_fails_jobs_of_exited_workers(queue):
+    job_id = queue.submit("alice", "succeed", text="x")
+    queue._claim()
+    with queue._connect() as db:
+        db.execute("UPDATE jobs SET worker = ? WHERE id = ?", (f"{queue.worker_id.rsplit(':', 1)[0]}:999999", job_id))
+    queue.recover()
+    job = queue.get(job_id)
+    assert (job.status, job.message) == (FAILED, "interrupted")
+
+
+def test_jobs_on_one_dataset_run_one_at_a_time(workdir, queue):
+    queue.per_user = 2
+    first = queue.submit("alice", "succeed", text="1", dataset_path="a.csv")
+    queue.submit("alice", "succeed", text="2", dataset_path="a.csv")
+    other = queue.submit("alice", "succeed", text="3", dataset_path="b.csv")
+
+    assert queue._claim().id == first
+    # The second job on a.csv would share the running job's workspace
+    assert queue._claim().id == other
+    assert queue._claim() is None
+
+
+def _run_tool(name, description, expected_output, dataset_path=None):
+    """Stand-in for `pipeline.run_agent` that calls the agent's tool the way the agent would, without an LLM."""
+    from tools.data_dashboard_tool import DataDashboardTool
+    from tools.explore_csv_tool import ExploreCSVDataTool
+    from tools.model_suggestion_tool import ModelSuggestionTool
+    from tools.smart_preprocessing_tool import SmartPreprocessingTool
+
+    if name == "model_suggestion":
+        return ModelSuggestionTool(screening_budget=30, screening_workers=1)._report()
+    tool = {"eda": ExploreCSVDataTool, "dashboard": DataDashboardTool, "preprocessing": SmartPreprocessingTool}[name]
+    return tool()._run(dataset_path)
+
+
+def test_single_agent_jobs_hand_outputs_to_each_other(workdir, monkeypatch):
+    import pipeline
+    from conftest import make_frame
+
+    monkeypatch.setattr(pipeline, "run_agent", _run_tool)
+    queue = JobQueue(path=os.path.join(workdir, "jobs.sqlite3"))
+    dataset_path = os.path.join(workdir, "upload.csv")
+    make_frame(400).iloc[:300].to_csv(dataset_path, index=False)
+
+    def run(kind, **params):
+        job_id = queue.submit("alice", kind, **params)
+        queue.run_job(queue._claim())
+        job = queue.get(job_id)
+        assert job.status == DONE, job.error
+        return job
+
+    for kind in ("eda", "dashboard", "preprocessing"):
+        run(kind, dataset_path=dataset_path)
+    job = run("model_suggestion", dataset_path=dataset_path, dataset_keywords="test")
+    report = job.result["results"]["model_suggestion"]
+    assert "No EDA or dashboard insights found" not in report
+    assert "`label`" in report and "Screened" in report
+
+    # A re-upload with appended rows only transforms the new rows
+    make_frame(400).to_csv(dataset_path, index=False)
+    job = run("preprocessing", dataset_path=dataset_path)
+    with open(os.path.join(job.result["workspace"], "processed_output", "preprocessing_strategy.txt"),
+              encoding="utf-8") as f:
+        assert "100 rows were appended" in f.read()
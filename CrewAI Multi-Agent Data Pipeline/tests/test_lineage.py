@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from conftest import make_frame
+from tools.lineage import lineage_of, moved_columns, profile_dataset, signatures
+from tools.workspace import Workspace, use_workspace
+
+BLOCK_ROWS = 100
+
+
+@pytest.fixture
+def lineage_dir(tmp_path):
+    return str(tmp_path / "lineage")
+
+
+def test_unchanged_upload_reuses_every_block(small_csv, lineage_dir):
+    first = profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    second = profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+
+    assert first.reused_blocks == 0
+    assert second.reused_blocks == second.blocks == 3
+    assert second.new_rows == 0
+    assert signatures(second.profiler) == signatures(first.profiler)
+
+
+def test_appended_rows_profile_only_the_changed_blocks(small_csv, lineage_dir):
+    profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    grown = pd.concat([make_frame(), make_frame(150, seed=4)], ignore_index=True)
+    grown.to_csv(small_csv, index=False)
+
+    update = profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    fresh = profile_dataset(small_csv, BLOCK_ROWS, lineage_dir + "-fresh")
+
+    # The three old blocks are merged from saved state; the 150 new rows fill two more
+    assert (update.blocks, update.reused_blocks, update.new_rows) == (5, 3, 150)
+    assert update.profiler.n_rows == fresh.profiler.n_rows == 450
+    assert update.profiler.nulls == fresh.profiler.nulls
+    assert update.profiler.moments["Age"].mean == pytest.approx(fresh.profiler.moments["Age"].mean)
+
+
+def test_edited_block_is_profiled_again(small_csv, lineage_dir):
+    profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    # Written from the same frame as the fixture, so untouched rows keep their exact text
+    df = make_frame()
+    df.loc[150, "Weight"] = 1e6
+    df.to_csv(small_csv, index=False)
+
+    update = profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    assert update.reused_blocks == 2
+    assert update.profiler.moments["Weight"].max == 1e6
+
+
+def test_shifted_column_counts_as_moved(small_csv, lineage_dir):
+    before = signatures(profile_dataset(small_csv, BLOCK_ROWS, lineage_dir).profiler)
+    df = make_frame()
+    df["Age"] += 20
+    df.to_csv(small_csv, index=False)
+    after = signatures(profile_dataset(small_csv, BLOCK_ROWS, lineage_dir).profiler)
+
+    assert moved_columns(before, after) == ["Age"]
+
+
+def test_another_file_with_the_same_header_starts_its_own_lineage(small_csv, workdir, lineage_dir):
+    profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    other = str(workdir / "other.csv")
+    make_frame().to_csv(other, index=False)
+
+    update = profile_dataset(other, BLOCK_ROWS, lineage_dir)
+    assert update.reused_blocks == 0 and update.lineage.id != lineage_of(small_csv, lineage_dir).id
+
+
+def test_the_same_file_in_another_workspace_starts_its_own_lineage(small_csv, workdir, lineage_dir):
+    with use_workspace(Workspace(str(workdir / "alice"))):
+        profile_dataset(small_csv, BLOCK_ROWS, lineage_dir)
+    with use_workspace(Workspace(str(workdir / "bob"))):
+        assert profile_dataset(small_csv, BLOCK_ROWS, lineage_dir).reused_blocks == 0
+    with use_workspace(Workspace(str(workdir / "alice"))):
+        assert profile_dataset(small_csv, BLOCK_ROWS, lineage_dir).reused_blocks == 3
@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools.llm_cache import CachedLLM, StubLLM, response_key
+
+MESSAGES = [{"role": "system", "content": "You are a data analyst."},
+            {"role": "user", "content": "Current Task: Summarize the dataset."}]
+
+
+@pytest.fixture
+def llm(tmp_path):
+    return CachedLLM.wrap(StubLLM(model="stub"), cache_dir=str(tmp_path / "llm"))
+
+
+def test_repeated_requests_are_answered_from_the_cache(llm):
+    first = llm.call(MESSAGES)
+    assert llm.call(MESSAGES) == first
+    # Whitespace differences are normalized away
+    assert llm.call([{"role": "system", "content": " You are a  data analyst.\n"}, MESSAGES[1]]) == first
+    assert llm.inner.calls == 1
+
+
+def test_different_requests_miss(llm):
+    llm.call(MESSAGES)
+    llm.call(MESSAGES[:1] + [{"role": "user", "content": "Current Task: Plot the dataset."}])
+    llm.call([dict(message, role="user") for message in MESSAGES])
+    llm.stop_sequences = ["\nObservation:"]
+    llm.call(MESSAGES)
+    assert llm.inner.calls == 4
+
+
+def test_cache_persists_across_instances(llm, tmp_path):
+    answer = llm.call(MESSAGES)
+    again = CachedLLM.wrap(StubLLM(model="stub"), cache_dir=str(tmp_path / "llm"))
+    assert again.call(MESSAGES) == answer
+    assert again.inner.calls == 0
+
+    warmer = CachedLLM.wrap(StubLLM(model="stub", temperature=0.7), cache_dir=str(tmp_path / "llm"))
+    warmer.call(MESSAGES)
+    assert warmer.inner.calls == 1
+
+
+def test_concurrent_identical_requests_share_one_call(tmp_path):
+    llm = CachedLLM.wrap(StubLLM(model="stub", latency=0.2), cache_dir=str(tmp_path / "llm"))
+    with ThreadPoolExecutor(4) as pool:
+        answers = list(pool.map(lambda _: llm.call(MESSAGES), range(4)))
+    assert len(set(answers)) == 1
+    assert llm.inner.calls == 1
+
+
+def test_failed_calls_are_not_cached(llm, monkeypatch):
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(type(llm.inner), "call", fail)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="quota"):
+            llm.call(MESSAGES)
+    assert len(calls) == 2
+
+
+def test_keys_are_stable_across_processes():
+    key = response_key("stub", 0.2, MESSAGES, ["\nObservation:"])
+    assert key == response_key("stub", 0.2, [dict(reversed(list(m.items()))) for m in MESSAGES], ("\nObservation:",))
+    script = ("import json, sys; from tools.llm_cache import response_key; "
+              "print(response_key('stub', 0.2, json.loads(sys.argv[1]), ['\\nObservation:']))")
+    # A fresh interpreter has its own hash seed
+    output = subprocess.run([sys.executable, "-c", script, json.dumps(MESSAGES)], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert output.stdout.strip() == key
+
+
+def test_stub_runs_the_tool_then_answers_with_its_output():
+    stub = StubLLM(model="stub")
+    prompt = ("Tool Name: Explore CSV\nTool Arguments: {\n  \"properties\": {\"csv_path\": {}}\n}\n"
+              "Tool Description: profile a CSV\nCurrent Task: Explore the dataset at path: data/obesity.csv")
+    action = stub.call(prompt)
+    assert "Action: Explore CSV" in action and json.dumps({"csv_path": "data/obesity.csv"}) in action
+
+    answer = stub.call([{"role": "user", "content": prompt},
+                        {"role": "assistant", "content": action + "\nObservation: 300 rows"}])
+    assert answer.endswith("Final Answer: 300 rows")
+    assert stub.calls == 2
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from conftest import make_frame
+from tools import model_screening
+from tools.compact_output import save_compact
+from tools.model_screening import load_processed, screen_models, screening_report
+from tools.preprocessing_pipeline import PreprocessingPipeline
+
+
+def _processed(tmp_path, frame, output_format):
+    pipeline = PreprocessingPipeline.fit(frame, fitted_on="data.csv")
+    path = str(tmp_path / f"processed.{output_format}")
+    if output_format == "npz":
+        save_compact(path, *pipeline.transform_compact(frame), pipeline.output_columns)
+    else:
+        pipeline.transform(frame).to_csv(path, index=False)
+    return path, pipeline
+
+
+@pytest.mark.parametrize("output_format", ["csv", "npz"])
+def test_scaled_integer_target_is_screened_as_classes(tmp_path, output_format):
+    frame = make_frame(600).drop(columns=["label"])
+    frame["grade"] = np.digitize(frame["Weight"].fillna(45), [30, 40, 50, 60])
+    path, pipeline = _processed(tmp_path, frame, output_format)
+
+    X, y, features = load_processed(path, pipeline, "grade")
+    assert sparse.issparse(X) == (output_format == "npz")
+    assert "grade" not in features and "id" not in features
+    np.testing.assert_allclose(np.sort(np.unique(y)), np.arange(5), atol=1e-5)
+
+    screening = screen_models(X, y, "classification", target="grade", workers=1)
+    assert [result.error for result in screening.results] == [None] * 4
+    assert screening.best.score > 0.5
+
+
+def test_one_hot_target_becomes_labels(tmp_path):
+    path, pipeline = _processed(tmp_path, make_frame(), "npz")
+    _, y, features = load_processed(path, pipeline, "label")
+    assert set(y) == {"high", "low"}
+    assert not [col for col in features if col.startswith("label_")]
+
+
+def test_only_dense_only_candidates_are_densified_within_the_limit(monkeypatch):
+    rng = np.random.default_rng(0)
+    X = sparse.random(300, 20, density=0.2, format="csr", dtype="float32", random_state=0)
+    y = np.asarray(X[:, 0].toarray()).ravel() * 3 + rng.normal(0, 0.1, 300)
+    monkeypatch.setattr(model_screening, "MAX_DENSE_BYTES", 1024)
+
+    screening = screen_models(X, y, "regression", workers=1)
+    errors = {result.name: result.error for result in screening.results}
+    assert "dense copy" in errors.pop("Gradient Boosting (histogram)")
+    assert list(errors.values()) == [None] * 3
+
+
+@pytest.mark.parametrize("rows, candidates", [(5, None), (300, ["Ridge"])])
+def test_every_screening_reports_its_elapsed_time(rows, candidates):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, 4))
+    y = X[:, 0] * 2 + rng.normal(0, 0.1, rows)
+
+    screening = screen_models(X, y, "regression", candidates=candidates, workers=1)
+    assert screening.elapsed > 0
+    assert screening.elapsed >= sum(result.seconds for result in screening.results)
+    assert f"in {screening.elapsed:.1f}s" in screening_report(screening)[0]
+    if rows < 10:
+        assert screening.results[0].error == "not enough rows or classes to cross-validate"
+    else:
+        assert [result.name for result in screening.results] == ["Ridge"] and screening.best.rounds == 1
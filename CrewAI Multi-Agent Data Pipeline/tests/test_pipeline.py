@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from pipeline import Stage, full_pipeline_stages, run_dag
+
+
+def recording_stage(name, log, seconds=0.0, depends_on=(), fail=False):
+    def run():
+        time.sleep(seconds)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        log.append(name)
+        return name.upper()
+
+    return Stage(name, run, depends_on=depends_on)
+
+
+def test_stages_run_after_their_dependencies():
+    log = []
+    stages = [
+        recording_stage("report", log, depends_on=["clean", "plots"]),
+        recording_stage("plots", log, 0.05, depends_on=["load"]),
+        recording_stage("clean", log, depends_on=["load"]),
+        recording_stage("load", log),
+    ]
+    events = []
+    run = run_dag(stages, progress=lambda name, status: events.append((name, status)))
+
+    assert run.ok
+    assert run.results == {"load": "LOAD", "clean": "CLEAN", "plots": "PLOTS", "report": "REPORT"}
+    assert log == ["load", "clean", "plots", "report"]
+    assert events[0] == ("load", "started") and events[-1] == ("report", "done")
+    for name, (start, _) in run.timings.items():
+        for dep in next(stage for stage in stages if stage.name == name).depends_on:
+            assert run.timings[dep][1] <= start
+
+
+def test_independent_stages_overlap():
+    log = []
+    stages = [recording_stage(name, log, 0.3) for name in ("eda", "dashboard", "search")]
+    stages.append(recording_stage("report", log, depends_on=["eda", "dashboard", "search"]))
+    run = run_dag(stages)
+
+    assert run.ok and log[-1] == "report"
+    # Serially the three would take 0.9s
+    assert run.wall_time < 0.6
+    starts = [run.timings[name][0] for name in ("eda", "dashboard", "search")]
+    ends = [run.timings[name][1] for name in ("eda", "dashboard", "search")]
+    assert max(starts) < min(ends)
+
+
+def test_failed_stage_skips_only_its_dependents():
+    log = []
+    events = []
+    stages = [
+        recording_stage("eda", log, fail=True),
+        recording_stage("preprocessing", log, depends_on=["eda"]),
+        recording_stage("models", log, depends_on=["preprocessing"]),
+        recording_stage("dashboard", log, 0.05),
+    ]
+    run = run_dag(stages, progress=lambda name, status: events.append((name, status)))
+
+    assert not run.ok
+    assert list(run.errors) == ["eda"] and str(run.errors["eda"]) == "eda failed"
+    assert run.skipped == ["preprocessing", "models"]
+    assert log == ["dashboard"] and run.results == {"dashboard": "DASHBOARD"}
+    assert ("eda", "failed") in events and ("models", "skipped") in events
+    assert ("preprocessing", "started") not in events
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown stages"):
+        run_dag([Stage("a", lambda: None, depends_on=["b"])])
+    with pytest.raises(ValueError, match="cycle"):
+        run_dag([Stage("a", lambda: None, depends_on=["b"]), Stage("b", lambda: None, depends_on=["a"])])
+
+
+def test_full_pipeline_runs_eda_and_dashboard_first():
+    stages = {stage.name: stage for stage in full_pipeline_stages("data.csv", "obesity")}
+    assert stages["eda"].depends_on == stages["dashboard"].depends_on == ()
+    assert stages["preprocessing"].depends_on == ("eda",)
+    assert set(stages["model_suggestion"].depends_on) == {"eda", "dashboard", "preprocessing"}
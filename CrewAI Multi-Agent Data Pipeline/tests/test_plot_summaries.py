@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import cbook
+
+from conftest import make_frame
+from tools.ingestion import iter_frames
+from tools.plot_summaries import MAX_BINS, auto_bin_edges, summarize_columns
+from tools.profiling import StreamingProfiler
+
+
+def profiled_csv(directory, df):
+    path = str(directory / "data.csv")
+    df.to_csv(path, index=False)
+    profiler = StreamingProfiler()
+    for chunk in iter_frames(path, chunksize=97):
+        profiler.update(chunk)
+    return path, pd.read_csv(path), profiler
+
+
+@pytest.fixture
+def frame():
+    df = make_frame(5000)
+    df["Income"] = np.random.default_rng(2).lognormal(10, 1, len(df))
+    return df
+
+
+def test_histogram_counts_match_numpy(tmp_path, frame):
+    path, df, profiler = profiled_csv(tmp_path, frame)
+    summaries = summarize_columns(path, profiler, ["Age", "Weight", "Income"], [], chunksize=333)
+
+    for col in ("Age", "Weight", "Income"):
+        values = df[col].dropna().to_numpy()
+        summary = summaries[col]
+        counts, _ = np.histogram(values, summary.edges)
+        np.testing.assert_array_equal(summary.counts, counts)
+        assert summary.counts.sum() == len(values)
+        assert (summary.edges[0], summary.edges[-1]) == (values.min(), values.max())
+
+
+def test_small_columns_get_numpys_auto_bins(tmp_path):
+    path, df, profiler = profiled_csv(tmp_path, make_frame(150))
+    summary = summarize_columns(path, profiler, ["Weight"], [])["Weight"]
+    values = df["Weight"].dropna().to_numpy()
+    # The sketch is exact below its capacity, so the edges are numpy's own
+    np.testing.assert_allclose(summary.edges, np.histogram_bin_edges(values, "auto"))
+    np.testing.assert_array_equal(summary.counts, np.histogram(values, "auto")[0])
+
+
+def test_box_stats_follow_matplotlibs_whisker_rule(tmp_path, frame):
+    path, df, profiler = profiled_csv(tmp_path, frame)
+    summary = summarize_columns(path, profiler, ["Income"], [])["Income"]
+    values = df["Income"].dropna().to_numpy()
+    [expected] = cbook.boxplot_stats(values)
+    stats = summary.box_stats()
+
+    # Quartiles come from the sketch; whiskers and fliers are exact for them
+    for key in ("q1", "med", "q3"):
+        assert stats[key] == pytest.approx(expected[key], rel=0.02)
+    inside = values[(values >= summary.fence_low) & (values <= summary.fence_high)]
+    assert (stats["whislo"], stats["whishi"]) == (inside.min(), inside.max())
+    np.testing.assert_array_equal(stats["fliers"], np.sort(values[(values < summary.fence_low) | (values > summary.fence_high)]))
+
+
+def test_category_counts_match_value_counts(tmp_path, frame):
+    path, df, profiler = profiled_csv(tmp_path, frame)
+    summary = summarize_columns(path, profiler, [], ["CALC"], chunksize=333)["CALC"]
+    assert summary.counts == df["CALC"].value_counts().to_dict()
+    assert summary.missing == 0
+
+
+def test_bins_are_capped_and_degenerate_ranges_get_one_bin():
+    assert len(auto_bin_edges(10**9, 0.0, 1e6, 0.0, 1.0)) == MAX_BINS + 1
+    np.testing.assert_array_equal(auto_bin_edges(10, 3.0, 3.0, 3.0, 3.0), [2.5, 3.5])
+    np.testing.assert_array_equal(auto_bin_edges(0, np.nan, np.nan, np.nan, np.nan), [0.0, 1.0])
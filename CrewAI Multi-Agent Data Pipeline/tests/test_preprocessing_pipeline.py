@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_frame
+from tools.compact_output import load_compact, save_compact
+from tools.preprocessing_pipeline import PIPELINE_FORMAT_VERSION, PreprocessingPipeline
+
+
+def test_saved_pipeline_transforms_like_the_fitted_one(tmp_path):
+    df = make_frame()
+    fitted = PreprocessingPipeline.fit(df, fitted_on="small.csv")
+    path = tmp_path / "pipeline.json"
+    fitted.save(str(path))
+    loaded = PreprocessingPipeline.load(str(path))
+
+    assert loaded.to_dict() == fitted.to_dict()
+    # Rows the fit never saw, with missing values and an unseen category
+    new = make_frame(50, seed=1)
+    new.loc[0, "Gender"] = "Other"
+    new.loc[1, "Weight"] = np.nan
+    pd.testing.assert_frame_equal(loaded.transform(new), fitted.transform(new))
+    assert list(loaded.transform(new).columns) == fitted.output_columns
+
+
+def test_transform_skips_fitted_columns_missing_from_new_data():
+    pipeline = PreprocessingPipeline.fit(make_frame())
+    out = pipeline.transform(make_frame(20, seed=2).drop(columns=["label"]))
+    assert not [col for col in out.columns if col.startswith("label")]
+    assert len(out) == 20
+
+
+def test_unknown_format_version_is_rejected(tmp_path):
+    state = PreprocessingPipeline.fit(make_frame()).to_dict()
+    state["format_version"] = PIPELINE_FORMAT_VERSION + 1
+    path = tmp_path / "pipeline.json"
+    path.write_text(json.dumps(state))
+    with pytest.raises(ValueError, match="Unsupported preprocessing pipeline version"):
+        PreprocessingPipeline.load(str(path))
+
+
+def test_compact_csv_transform_matches_dense_transform(tmp_path):
+    df = make_frame()
+    pipeline = PreprocessingPipeline.fit(df)
+    csv_path, npz_path = str(tmp_path / "new.csv"), str(tmp_path / "new.npz")
+    make_frame(250, seed=3).to_csv(csv_path, index=False)
+
+    rows = pipeline.transform_csv_compact(csv_path, npz_path, chunksize=64)
+    dense, one_hot, one_hot_columns, schema = load_compact(npz_path)
+    expected = pipeline.transform(pd.read_csv(csv_path))
+
+    assert rows == len(expected) == schema["rows"]
+    np.testing.assert_array_equal(one_hot.toarray(), expected[one_hot_columns].to_numpy())
+    np.testing.assert_allclose(dense["Age"], expected["Age"], rtol=1e-6)
+    # Ordinal codes are stored as narrow integers, -1 for missing
+    np.testing.assert_array_equal(dense["CALC"], expected["CALC"].fillna(-1))
+
+
+def test_streamed_compact_output_matches_a_single_write(tmp_path):
+    pipeline = PreprocessingPipeline.fit(make_frame())
+    csv_path = str(tmp_path / "new.csv")
+    make_frame(250, seed=3).to_csv(csv_path, index=False)
+
+    # Identifiers of the first chunk fit int8, later ones need int16
+    pipeline.transform_csv_compact(csv_path, str(tmp_path / "streamed.npz"), chunksize=64)
+    save_compact(str(tmp_path / "whole.npz"), *pipeline.transform_compact(pd.read_csv(csv_path)),
+                 pipeline.output_columns)
+    streamed, whole = load_compact(str(tmp_path / "streamed.npz")), load_compact(str(tmp_path / "whole.npz"))
+
+    pd.testing.assert_frame_equal(streamed[0], whole[0])
+    assert (streamed[1] != whole[1]).nnz == 0 and streamed[1].dtype == whole[1].dtype
+    assert streamed[2:] == whole[2:]
+    # The per-chunk spill files are removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "new.csv", "streamed.npz", "streamed.schema.json", "whole.npz", "whole.schema.json"]
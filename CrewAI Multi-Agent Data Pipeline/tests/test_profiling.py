@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.profiling import DistinctCounter, QuantileSketch, RunningMoments, TopKCounter
+
+
+def test_merged_moments_match_the_one_shot_moments():
+    values = np.random.default_rng(0).lognormal(3, 1, 10_001)
+    merged = RunningMoments()
+    for part in np.array_split(values, [0, 17, 5000, 5000, 9999]):
+        chunk = RunningMoments()
+        chunk.update(part)
+        merged.merge(chunk)
+
+    assert merged.n == len(values)
+    assert merged.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert merged.var == pytest.approx(values.var(ddof=1), rel=1e-10)
+    assert merged.skewness == pytest.approx(pd.Series(values).skew(), rel=1e-9)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+
+@pytest.mark.parametrize("parts", [1, 10])
+def test_quantiles_stay_within_the_rank_error_bound(parts):
+    values = np.random.default_rng(1).normal(size=200_000)
+    sketch = QuantileSketch(k=200, seed=0)
+    for i, part in enumerate(np.array_split(values, parts)):
+        piece = QuantileSketch(k=200, seed=i)
+        piece.update(part)
+        sketch.merge(piece)
+
+    assert not sketch.exact
+    ordered = np.sort(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+        # KLL's rank error is O(1/k); 2/k leaves room for the randomness of compaction
+        assert abs(rank - q) <= 2 / sketch.k
+
+
+def test_small_inputs_keep_exact_quantiles():
+    sketch = QuantileSketch(k=200)
+    sketch.update(np.arange(100, dtype="float64"))
+    assert sketch.exact and sketch.quantile(0.25) == np.quantile(np.arange(100), 0.25)
+
+
+@pytest.mark.parametrize("cardinality", [10_000, 200_000])
+def test_distinct_count_relative_error(cardinality):
+    hashes = pd.util.hash_array(np.arange(cardinality).astype(str).astype(object))
+    counter = DistinctCounter(exact_limit=4096, precision=14)
+    for part in np.array_split(np.concatenate([hashes, hashes[:1000]]), 7):
+        counter.update(part)
+
+    assert not counter.exact
+    # Standard error of HyperLogLog is 1.04 / sqrt(2**14) = 0.8%
+    assert abs(counter.count() - cardinality) / cardinality < 0.03
+
+
+def test_register_rank_uses_every_low_bit():
+    counter = DistinctCounter(exact_limit=0, precision=14)
+    counter._switch_to_sketch()
+    bits = 64 - counter.precision
+    # Low bits just below 2**bits: rounding them through float64 gave rank 0
+    counter._add(np.array([(1 << bits) - 1, (5 << bits) | 1, 7 << bits], dtype="uint64"))
+    assert counter.registers[0] == 1
+    assert counter.registers[5] == bits
+    assert counter.registers[7] == bits + 1
+
+
+def test_top_values_bound_their_overestimate():
+    rng = np.random.default_rng(2)
+    data = pd.Series(rng.zipf(1.5, 50_000) % 500)
+    counter = TopKCounter(capacity=32)
+    for part in np.array_split(data, 10):
+        counter.update(part)
+
+    exact = data.value_counts()
+    for value, count in counter.most_common(10):
+        assert exact[value] <= count <= exact[value] + counter.errors[value]
+    assert [value for value, _ in counter.most_common(3)] == list(exact.index[:3])
+    assert counter.exact_top(3)
@@ -0,0 +1,77 @@
+import os
+from types import SimpleNamespace
+
+from tools.result_cache import cached_tool_run, default_cache
+from tools.workspace import Workspace, use_workspace
+
+
+def _tool(use_cache=True):
+    return SimpleNamespace(name="Test Tool", use_cache=use_cache)
+
+
+class Compute:
+    """`compute` callable that writes one artifact and counts its calls."""
+
+    def __init__(self, text="report"):
+        self.text = text
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        os.makedirs("out", exist_ok=True)
+        path = os.path.join("out", "artifact.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{self.text} {self.calls}")
+        return f"{self.text} {self.calls}", [path]
+
+
+def test_second_call_is_a_hit_and_restores_artifacts(small_csv):
+    compute = Compute()
+    first = cached_tool_run(_tool(), 1, [small_csv], {"mode": "a"}, compute)
+    os.remove(os.path.join("out", "artifact.txt"))
+    second = cached_tool_run(_tool(), 1, [small_csv], {"mode": "a"}, compute)
+
+    assert first == second == "report 1"
+    assert compute.calls == 1
+    assert default_cache().stats()["hits"] == 1
+    with open(os.path.join("out", "artifact.txt"), encoding="utf-8") as f:
+        assert f.read() == "report 1"
+
+
+def test_artifacts_are_restored_into_the_current_workspace(small_csv, tmp_path):
+    compute = Compute()
+    cached_tool_run(_tool(), 1, [small_csv], {}, compute)
+    other = tmp_path / "run"
+    with use_workspace(Workspace(str(other))):
+        assert cached_tool_run(_tool(), 1, [small_csv], {}, compute) == "report 1"
+    assert (other / "out" / "artifact.txt").read_text() == "report 1"
+
+
+def test_content_params_and_version_are_part_of_the_key(small_csv):
+    compute = Compute()
+    cached_tool_run(_tool(), 1, [small_csv], {"mode": "a"}, compute)
+    cached_tool_run(_tool(), 1, [small_csv], {"mode": "b"}, compute)
+    cached_tool_run(_tool(), 2, [small_csv], {"mode": "a"}, compute)
+    with open(small_csv, "a", encoding="utf-8") as f:
+        f.write("300,30.0,45.0,no,Male,high\n")
+    cached_tool_run(_tool(), 1, [small_csv], {"mode": "a"}, compute)
+
+    assert compute.calls == 4
+    assert default_cache().stats()["misses"] == 4
+
+
+def test_same_content_under_another_path_is_a_hit(small_csv, workdir):
+    copy = os.path.join(workdir, "copy.csv")
+    with open(small_csv, "rb") as src, open(copy, "wb") as dst:
+        dst.write(src.read())
+    compute = Compute()
+    cached_tool_run(_tool(), 1, [small_csv], {}, compute)
+    cached_tool_run(_tool(), 1, [copy], {}, compute)
+    assert compute.calls == 1
+
+
+def test_disabled_cache_always_computes(small_csv):
+    compute = Compute()
+    cached_tool_run(_tool(use_cache=False), 1, [small_csv], {}, compute)
+    assert cached_tool_run(_tool(use_cache=False), 1, [small_csv], {}, compute) == "report 2"
+    assert default_cache().stats()["entries"] == 0
@@ -0,0 +1,118 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tools import search_client
+from tools.search_client import SearchClient, SearchError
+from tools.serpapi_stub import stub_server, url
+
+
+@pytest.fixture
+def serpapi_stub():
+    """Starts local SerpAPI stand-ins; call with the stub_server options, get `(url, counter)`."""
+    servers = []
+
+    def start(**options):
+        server, counter = stub_server(**options)
+        servers.append(server)
+        return url(server), counter
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(search_client, "time", SimpleNamespace(monotonic=lambda: now.value, sleep=time.sleep))
+    return now
+
+
+def test_cache_keeps_the_most_recently_used_entries(clock, serpapi_stub):
+    base_url, counter = serpapi_stub()
+    client = SearchClient(base_url=base_url, api_key="stub", ttl=60, max_entries=2)
+    client.search("a")
+    client.search("b")
+    client.search(" A ")  # a hit makes "a" the most recent entry
+    client.search("c")
+
+    assert list(client._cache) == [("a", 5), ("c", 5)]
+    assert client.cache_hits == 1
+    client.search("b")
+    assert counter["requests"] == client.requests_sent == 4
+
+
+def test_expired_entries_are_dropped_on_insert(clock, serpapi_stub):
+    base_url, counter = serpapi_stub()
+    client = SearchClient(base_url=base_url, api_key="stub", ttl=60)
+    client.search("a")
+    clock.value = 30
+    client.search("b")
+    clock.value = 61
+    client.search("c")
+
+    assert list(client._cache) == [("b", 5), ("c", 5)]
+    client.search("a")
+    assert client.cache_hits == 0
+    assert counter["requests"] == 4
+
+
+def test_retryable_statuses_are_retried(serpapi_stub):
+    base_url, counter = serpapi_stub(fail_first=2)
+    client = SearchClient(base_url=base_url, api_key="stub", retries=2, backoff=0.01)
+
+    assert client.search("obesity")["organic_results"]
+    assert counter["requests"] == client.requests_sent == 3
+
+
+def test_retries_are_bounded(serpapi_stub):
+    base_url, counter = serpapi_stub(fail_first=10)
+    client = SearchClient(base_url=base_url, api_key="stub", retries=2, backoff=0.01)
+
+    with pytest.raises(SearchError, match="HTTP 503"):
+        client.search("obesity")
+    assert counter["requests"] == client.requests_sent == 3
+    assert not client._cache
+
+
+def test_slow_responses_time_out(serpapi_stub):
+    base_url, counter = serpapi_stub(latency=1.0)
+    client = SearchClient(base_url=base_url, api_key="stub", timeout=(1, 0.1), retries=1, backoff=0.01)
+
+    start = time.perf_counter()
+    [result] = client.search_many(["obesity"])
+    elapsed = time.perf_counter() - start
+
+    assert isinstance(result, SearchError)
+    assert str(result) == "ReadTimeout after 2 attempt(s)"
+    assert client.requests_sent == 2
+    # Both attempts give up at the read timeout instead of waiting for the stub
+    assert elapsed < 0.8
+
+
+def test_search_many_runs_queries_concurrently(serpapi_stub):
+    latency = 0.3
+    base_url, counter = serpapi_stub(latency=latency)
+    client = SearchClient(base_url=base_url, api_key="stub", max_workers=4)
+    queries = [f"obesity model {i}" for i in range(4)]
+
+    start = time.perf_counter()
+    results = client.search_many(queries)
+    elapsed = time.perf_counter() - start
+
+    assert all(result["organic_results"] for result in results)
+    assert elapsed < 2 * latency  # serially this takes 4 * latency
+    assert counter["requests"] == 4
+
+    # A second batch goes over the pooled connections of the first
+    client.search_many([f"obesity dataset {i}" for i in range(4)])
+    assert counter["requests"] == 8
+    assert len(counter["ports"]) <= 4
+
+    # ...and a repeated batch is answered from the cache
+    assert client.search_many(queries) == results
+    assert counter["requests"] == 8
+    assert client.cache_hits == 4
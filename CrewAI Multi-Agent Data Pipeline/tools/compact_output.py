@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from tools.instrumentation import phase
+
+# NPZ + JSON schema layout for processed data that keeps the one-hot block
+# sparse and every other column in its own narrow dtype.
+COMPACT_FORMAT_VERSION = 1
+
+
+def schema_path(npz_path):
+    return npz_path[:-len(".npz")] + ".schema.json" if npz_path.endswith(".npz") else npz_path + ".schema.json"
+
+
+@phase("write")
+def save_compact(npz_path, dense, one_hot, one_hot_columns, column_order=None):
+    """Write `(dense, one_hot, one_hot_columns)` to `npz_path` plus a schema file."""
+    arrays = {}
+    columns = []
+    for i, col in enumerate(dense.columns):
+        values = dense[col].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[f"dense_{i}"] = values
+        columns.append({"name": col, "dtype": str(values.dtype), "key": f"dense_{i}"})
+    one_hot = one_hot.tocsr()
+    arrays.update({
+        "one_hot_data": one_hot.data,
+        "one_hot_indices": one_hot.indices,
+        "one_hot_indptr": one_hot.indptr,
+        "one_hot_shape": np.asarray(one_hot.shape, dtype="int64"),
+    })
+    np.savez_compressed(npz_path, **arrays)
+
+    rows = len(dense) if len(dense.columns) else one_hot.shape[0]
+    return _write_schema(npz_path, rows, columns, one_hot_columns, one_hot.dtype,
+                         column_order if column_order is not None else list(dense.columns) + list(one_hot_columns))
+
+
+def _write_schema(npz_path, rows, dense_columns, one_hot_columns, one_hot_dtype, column_order):
+    schema = {
+        "format_version": COMPACT_FORMAT_VERSION,
+        "rows": int(rows),
+        "dense_columns": dense_columns,
+        "one_hot_columns": list(one_hot_columns),
+        "one_hot_dtype": str(one_hot_dtype),
+        "ordinal_missing_code": -1,
+        "column_order": list(column_order),
+    }
+    path = schema_path(npz_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+    return path
+
+
+class CompactWriter:
+    """Write the same layout as `save_compact` one chunk at a time.
+
+    Each chunk's arrays are spilled to `.npy` files in a temporary directory
+    next to `npz_path`, and `close` streams them into the NPZ members one
+    part at a time, so memory is bounded by a chunk rather than the dataset.
+    Dtypes that differ between chunks (e.g. downcast identifiers, string
+    widths) are widened to their common type.
+
+        with CompactWriter(npz_path) as writer:
+            for dense, one_hot, names in chunks:
+                writer.append(dense, one_hot)
+            writer.close(names, column_order)
+    """
+
+    def __init__(self, npz_path):
+        self.npz_path = npz_path
+        self.rows = 0
+        self.nnz = 0
+        self.columns = None
+        self.n_one_hot = 0
+        self._parts = {}
+        self._spill = tempfile.TemporaryDirectory(prefix=".compact-", dir=os.path.dirname(os.path.abspath(npz_path)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._spill.cleanup()
+
+    def append(self, dense, one_hot):
+        if self.columns is None:
+            self.columns = list(dense.columns)
+        arrays = {}
+        for i, col in enumerate(self.columns):
+            values = dense[col].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            arrays[f"dense_{i}"] = values
+        one_hot = one_hot.tocsr()
+        arrays.update({
+            "one_hot_data": one_hot.data,
+            "one_hot_indices": one_hot.indices,
+            # Row offsets continue from the previous chunk; the leading 0 is written by `close`
+            "one_hot_indptr": one_hot.indptr[1:].astype("int64") + self.nnz,
+        })
+        for key, values in arrays.items():
+            parts = self._parts.setdefault(key, [])
+            path = os.path.join(self._spill.name, f"{key}-{len(parts)}.npy")
+            np.save(path, values)
+            parts.append((path, values.dtype, len(values)))
+        self.rows += one_hot.shape[0]
+        self.nnz += one_hot.nnz
+        self.n_one_hot = one_hot.shape[1]
+
+    @phase("write")
+    def close(self, one_hot_columns, column_order=None):
+        """Assemble the NPZ file and its schema; returns the schema path."""
+        self._parts.setdefault("one_hot_indptr", []).insert(0, (np.zeros(1, dtype="int64"), np.dtype("int64"), 1))
+        columns = []
+        with zipfile.ZipFile(self.npz_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for i, col in enumerate(self.columns or []):
+                dtype = self._write_member(archive, f"dense_{i}")
+                columns.append({"name": col, "dtype": str(dtype), "key": f"dense_{i}"})
+            one_hot_dtype = self._write_member(archive, "one_hot_data", default=np.dtype("uint8"))
+            self._write_member(archive, "one_hot_indices", default=np.dtype("int32"))
+            self._write_member(archive, "one_hot_indptr")
+            with archive.open("one_hot_shape.npy", "w") as f:
+                np.lib.format.write_array(f, np.asarray([self.rows, self.n_one_hot], dtype="int64"))
+        order = column_order if column_order is not None else list(self.columns or []) + list(one_hot_columns)
+        return _write_schema(self.npz_path, self.rows, columns, one_hot_columns, one_hot_dtype, order)
+
+    def _write_member(self, archive, key, default=None):
+        parts = self._parts.get(key, [])
+        dtype = np.result_type(*[part_dtype for _, part_dtype, _ in parts]) if parts else default
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                  "shape": (sum(length for _, _, length in parts),)}
+        with archive.open(f"{key}.npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array_header_1_0(f, header)
+            for part, _, _ in parts:
+                values = np.load(part) if isinstance(part, str) else part
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        return dtype
+
+
+def load_compact(npz_path):
+    """Read back `(dense, one_hot, one_hot_columns, schema)`."""
+    with open(schema_path(npz_path), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    if schema.get("format_version") != COMPACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact output version: {schema.get('format_version')}")
+    with np.load(npz_path) as arrays:
+        dense = pd.DataFrame({col["name"]: arrays[col["key"]] for col in schema["dense_columns"]})
+        one_hot = sparse.csr_matrix(
+            (arrays["one_hot_data"], arrays["one_hot_indices"], arrays["one_hot_indptr"]),
+            shape=tuple(arrays["one_hot_shape"]),
+        )
+    return dense, one_hot, schema["one_hot_columns"], schema
@@ -0,0 +1,229 @@
+import functools
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from tools.ingestion import read_columns
+from tools.insights import DASHBOARD_INSIGHTS_PATH, EDA_INSIGHTS_PATH, load_insights, merge_records
+from tools.workspace import output_path
+
+# Agent prompts are assembled from ranked facts and packed into a token budget
+# per agent and model, so prompt size (and with it LLM latency and cost) is
+# bounded and measured instead of growing with the dataset or the reports.
+DEFAULT_MODEL = "gemini/gemini-2.0-flash"
+# Used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+# Prompt tokens per agent (task plus context); a model's own entry overrides the "*" defaults
+TOKEN_BUDGETS = {
+    "*": {"eda": 300, "dashboard": 300, "preprocessing": 500, "model_suggestion": 1000},
+}
+# EDA digest the preprocessing tool writes into its strategy report
+STRATEGY_EDA_BUDGET = 200
+# A fact is cut down to the remaining budget only if at least this much is left
+MIN_FACT_TOKENS = 24
+MAX_LISTED = 8
+
+# Fact ranks: higher is packed first
+RANK_TASK, RANK_TARGET, RANK_SCHEMA, RANK_QUALITY, RANK_PROFILE, RANK_OUTPUT = 100, 80, 70, 60, 40, 20
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model.split("/")[-1])
+    except KeyError:
+        # Models tiktoken does not know (e.g. Gemini) get a close general-purpose encoding
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """Local token count of `text`: tiktoken when installed, else ~4 characters per token."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, budget, model=DEFAULT_MODEL):
+    """Longest prefix of `text` within `budget` tokens, cut at a line break where possible."""
+    if count_tokens(text, model) <= budget:
+        return text
+    kept = []
+    for line in text.splitlines():
+        if count_tokens("\n".join(kept + [line, "…"]), model) > budget:
+            break
+        kept.append(line)
+    if not kept:
+        kept = [text[:max(budget - 1, 0) * CHARS_PER_TOKEN]]
+        while kept[0] and count_tokens(kept[0] + "…", model) > budget:
+            kept[0] = kept[0][:int(len(kept[0]) * 0.9)]
+    return "\n".join(kept) + "…"
+
+
+def token_budget(agent, model=DEFAULT_MODEL):
+    budgets = TOKEN_BUDGETS.get(model, {})
+    return budgets.get(agent, TOKEN_BUDGETS["*"][agent])
+
+
+@dataclass
+class Fact:
+    name: str
+    text: str
+    rank: int
+    # Required facts (the task itself) are always included, in full
+    required: bool = False
+
+
+@dataclass
+class Context:
+    text: str
+    tokens: int
+    budget: int
+    included: List[str] = field(default_factory=list)
+    truncated: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def bytes(self):
+        return len(self.text.encode("utf-8"))
+
+
+def pack(facts, budget, model=DEFAULT_MODEL):
+    """Highest-ranked facts first until `budget` tokens are used; output keeps their ranked order."""
+    parts, context = [], Context("", 0, budget)
+    used = 0
+    for fact in sorted(facts, key=lambda fact: (not fact.required, -fact.rank)):
+        if not fact.text:
+            continue
+        text = fact.text
+        # Counted with the separator that joins it to the previous fact
+        separator = "\n\n" if parts else ""
+        tokens = count_tokens(separator + text, model)
+        if not fact.required and used + tokens > budget:
+            if budget - used < MIN_FACT_TOKENS:
+                context.dropped.append(fact.name)
+                continue
+            text = truncate_tokens(text, budget - used - count_tokens(separator, model), model)
+            tokens = count_tokens(separator + text, model)
+            context.truncated.append(fact.name)
+        parts.append(separator + text)
+        used += tokens
+        context.included.append(fact.name)
+    context.text = "".join(parts)
+    context.tokens = count_tokens(context.text, model)
+    return context
+
+
+# --- fact sources ---------------------------------------------------------------
+
+def _names(columns):
+    listed = ", ".join(columns[:MAX_LISTED])
+    return listed + (f" and {len(columns) - MAX_LISTED} more" if len(columns) > MAX_LISTED else "")
+
+
+def dataset_record(dataset_path=None):
+    """Merged EDA + dashboard insight record, if one exists for this dataset."""
+    record = merge_records(load_insights(output_path(EDA_INSIGHTS_PATH)),
+                           load_insights(output_path(DASHBOARD_INSIGHTS_PATH)))
+    if record is None or (dataset_path is not None and record.source != str(dataset_path)):
+        return None
+    return record
+
+
+def schema_fact(dataset_path=None, record=None):
+    if record is not None:
+        columns = [f"{col.name} ({col.dtype})" for col in record.columns.values()]
+        return Fact("schema", f"Dataset: {record.rows} rows, {len(columns)} columns: {', '.join(columns)}", RANK_SCHEMA)
+    if dataset_path and os.path.exists(dataset_path):
+        columns = [str(col) for col in read_columns(dataset_path)]
+        return Fact("schema", f"Dataset columns ({len(columns)}): {', '.join(columns)}", RANK_SCHEMA)
+    return Fact("schema", "", RANK_SCHEMA)
+
+
+def insight_facts(record):
+    """Facts from an insight record, most decision-relevant first."""
+    if record is None:
+        return []
+    facts = []
+    if record.target:
+        facts.append(Fact("target", f"Likely target: {record.target} ({record.target_type}, picked by {record.target_from}).",
+                          RANK_TARGET))
+    missing = [f"{col.name} {col.missing / max(col.count + col.missing, 1):.0%}"
+               for col in record.columns.values() if col.missing]
+    if missing:
+        facts.append(Fact("missing", f"Missing values: {_names(missing)}.", RANK_QUALITY))
+    if record.correlations:
+        pairs = [f"{a}~{b} (r={r:+.2f})" for a, b, r in record.correlations]
+        facts.append(Fact("correlations", f"Highly correlated pairs: {_names(pairs)}.", RANK_QUALITY))
+    categorical = [f"{a}~{b} ({'V' if method == 'cramers_v' else 'eta'}={value:.2f})"
+                   for a, b, method, value in record.associations if method in ("cramers_v", "correlation_ratio")]
+    if categorical:
+        facts.append(Fact("associations", f"Associated categorical columns: {_names(categorical)}.", RANK_QUALITY - 2))
+    skewed = [f"{col.name} ({col.skewness:+.1f})" for col in record.numeric()
+              if col.skewness is not None and abs(col.skewness) > 1]
+    if skewed:
+        facts.append(Fact("skew", f"Skewed numeric columns: {_names(skewed)}.", RANK_QUALITY - 5))
+    profile = [f"- {col.name}: mean {col.mean:.4g}, std {col.std:.4g}, range [{col.min:.4g}, {col.max:.4g}]"
+               for col in record.numeric() if None not in (col.mean, col.std, col.min, col.max)]
+    profile += [f"- {col.name}: {col.unique} categories" +
+                (f", top value {col.top_share:.0%}" if col.top_share is not None else "")
+                for col in record.categorical()]
+    if profile:
+        facts.append(Fact("profile", "Column profile:\n" + "\n".join(profile), RANK_PROFILE))
+    return facts
+
+
+def output_fact(name, path, rank=RANK_OUTPUT):
+    """A previous agent's saved output, `path` being relative to the run's workspace."""
+    path = output_path(path)
+    if not os.path.exists(path):
+        return Fact(name, "", rank)
+    with open(path, "r", encoding="utf-8") as f:
+        return Fact(name, f"{name}:\n{f.read()}", rank)
+
+
+def agent_facts(agent, dataset_path=None):
+    """Facts worth giving `agent` beyond its task description, from what earlier stages saved."""
+    record = dataset_record(dataset_path)
+    facts = [schema_fact(dataset_path, record)]
+    if agent in ("preprocessing", "model_suggestion"):
+        facts += insight_facts(record)
+    if agent == "model_suggestion":
+        facts.append(output_fact("Preprocessing strategy", os.path.join("processed_output", "preprocessing_strategy.txt")))
+        facts.append(output_fact("EDA report", "eda_report.txt", RANK_OUTPUT - 5))
+    return facts
+
+
+def build_context(agent, task, facts=(), model=DEFAULT_MODEL):
+    """Task description plus the highest-ranked facts that fit the agent's budget."""
+    return pack([Fact("task", task, RANK_TASK, required=True)] + list(facts), token_budget(agent, model), model)
+
+
+# --- per-call accounting --------------------------------------------------------
+
+_calls = []
+_calls_lock = threading.Lock()
+
+
+def log_call(agent, model, context, prompt_tokens=None, requests=None):
+    """Record the size of one agent call; `prompt_tokens` is what the LLM provider reported, if anything."""
+    with _calls_lock:
+        _calls.append({
+            "time": time.time(), "agent": agent, "model": model,
+            "context_bytes": context.bytes, "context_tokens": context.tokens, "budget": context.budget,
+            "dropped": ", ".join(context.dropped), "truncated": ", ".join(context.truncated),
+            "prompt_tokens": prompt_tokens, "llm_requests": requests,
+        })
+
+
+def call_log():
+    with _calls_lock:
+        return list(_calls)
@@ -0,0 +1,359 @@
+import heapq
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from tools.instrumentation import phase
+
+# Pairwise associations for tables far wider than a printable correlation
+# matrix. The columns are loaded once into float32 matrices (every row, or a
+# row sample when the table does not fit the memory budget) and every
+# measure is a Gram product computed tile by tile on a thread pool; each tile
+# keeps only its pairs above the threshold, so no p x p matrix is ever held.
+# The EDA tool takes the sample from its single profiling pass and, for
+# tables narrow enough, Pearson's r from co-moments over every row.
+METHODS = ("pearson", "spearman", "cramers_v", "correlation_ratio")
+# |r| for Pearson/Spearman, V or eta for the categorical measures
+CORRELATION_THRESHOLD = 0.8
+ASSOCIATION_THRESHOLD = 0.5
+# Strongest pairs kept per method
+TOP_K = 20
+
+# Budget for the sampled matrices and the tiles in flight, and a cap on
+# sampled rows (r from 50k rows is within ~0.01 of the full table's)
+MAX_MATRIX_BYTES = 256 << 20
+MAX_SAMPLE_ROWS = 50_000
+# Columns per side of a numeric tile, and one-hot columns (levels) per side of a categorical tile
+BLOCK_COLUMNS = 256
+ONE_HOT_COLUMNS = 256
+# Categorical columns with more distinct values than this (ids, free text) are left out;
+# the others keep their MAX_LEVELS - 1 most frequent levels plus one "other" level
+MAX_CATEGORICAL_UNIQUE = 1000
+MAX_LEVELS = 32
+
+
+@dataclass
+class Pair:
+    left: str
+    right: str
+    method: str
+    value: float
+
+    def to_list(self):
+        return [self.left, self.right, self.method, round(float(self.value), 4)]
+
+
+@dataclass
+class Associations:
+    """Strongest pairs per method, and how much of the table they were computed from."""
+
+    pairs: List[Pair] = field(default_factory=list)
+    rows: int = 0
+    total_rows: int = 0
+    # Methods computed over every row even when the others used a sample
+    exact: List[str] = field(default_factory=list)
+
+    @property
+    def sampled(self):
+        return self.rows < self.total_rows
+
+    def by_method(self, method):
+        return [pair for pair in self.pairs if pair.method == method]
+
+
+def _top(pairs, top_k):
+    return heapq.nlargest(top_k, pairs, key=lambda pair: abs(pair.value))
+
+
+def _pairs(values, found, left, right, method):
+    rows, cols = np.nonzero(found)
+    return [Pair(str(left[a]), str(right[b]), method, float(values[a, b])) for a, b in zip(rows, cols)]
+
+
+def _run_tiles(tiles, work, top_k, workers):
+    """Top-k pairs over all tiles; `work(tile)` returns the pairs of one tile."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return _top([pair for pairs in pool.map(work, tiles) for pair in _top(pairs, top_k)], top_k)
+
+
+def _workers(workers):
+    return workers or min(os.cpu_count() or 1, 8)
+
+
+# --- sampling -----------------------------------------------------------------
+
+def sample_rows(n_rows, n_numeric, n_categorical, methods=METHODS, max_bytes=MAX_MATRIX_BYTES, workers=None):
+    """Rows that fit the budget: the sampled frame, float32 z-scores (and ranks) and masks, int16 codes, and the tiles in flight."""
+    per_row = n_numeric * (8 + 4 + 1 + 4 * ("spearman" in methods)) + 10 * n_categorical
+    per_row += _workers(workers) * 4 * 4 * max(BLOCK_COLUMNS, ONE_HOT_COLUMNS)
+    return int(min(n_rows, MAX_SAMPLE_ROWS, max(max_bytes // per_row, 1000)))
+
+
+def sample_frame(frames, n_rows, rows, seed=0):
+    """Uniform row sample of about `rows` rows from a stream of DataFrame chunks (all rows if they fit)."""
+    if rows >= n_rows:
+        parts = list(frames)
+    else:
+        rng = np.random.default_rng(seed)
+        parts = [chunk[rng.random(len(chunk)) < rows / n_rows] for chunk in frames]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+# --- numeric: Pearson / Spearman ----------------------------------------------
+
+def standardize(values):
+    """float32 z-scores over each column's present values (0 where missing or constant), and the presence mask."""
+    values = np.asarray(values, dtype="float32")
+    mask = ~np.isnan(values)
+    with warnings.catch_warnings():
+        # All-missing columns; their z-scores are 0 like those of constant columns
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = np.inf
+    return np.where(mask, (values - mean) / std, np.float32(0)), mask
+
+
+def rank(values):
+    """Average ranks per column (ties share their mean rank; missing stays NaN), as float32."""
+    x = np.ascontiguousarray(np.asarray(values, dtype="float32").T)
+    order = np.argsort(x, axis=1)
+    ordered = np.take_along_axis(x, order, axis=1)
+    start = np.ones(x.shape, dtype=bool)
+    start[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    end = np.ones(x.shape, dtype=bool)
+    end[:, :-1] = start[:, 1:]
+    position = np.broadcast_to(np.arange(x.shape[1], dtype="int32"), x.shape)
+    first = np.maximum.accumulate(np.where(start, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(end, position, x.shape[1])[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(x.shape, dtype="float32")
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+    ranks[np.isnan(x)] = np.nan
+    return ranks.T
+
+
+def _correlation_tile(z, mask, complete, tile, columns, method, threshold):
+    """Pairs of one column tile with |r| >= threshold, pairwise-complete where values are missing."""
+    i0, i1, j0, j1 = tile
+    zi, zj = z[:, i0:i1], z[:, j0:j1]
+    sxy = zi.T @ zj
+    if complete[i0:i1].all() and complete[j0:j1].all():
+        # No missing values: the z-scores are already centred and scaled over the same rows
+        r = sxy / len(z)
+    else:
+        mi, mj = mask[:, i0:i1].astype("float32"), mask[:, j0:j1].astype("float32")
+        n = mi.T @ mj
+        sx, sy = zi.T @ mj, mi.T @ zj
+        sxx, syy = (zi * zi).T @ mj, mi.T @ (zj * zj)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n = np.where(n > 1, n, np.nan)
+            r = (sxy - sx * sy / n) / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+    r = np.nan_to_num(np.clip(r, -1.0, 1.0), nan=0.0)
+    found = np.abs(r) >= threshold
+    if i0 == j0:
+        found &= np.triu(np.ones(found.shape, dtype=bool), k=1)
+    return _pairs(r, found, columns[i0:i1], columns[j0:j1], method)
+
+
+def correlation_pairs(values, columns, method="pearson", threshold=CORRELATION_THRESHOLD, top_k=TOP_K,
+                      block=BLOCK_COLUMNS, workers=None):
+    """Top-k column pairs of a (rows x columns) matrix by |Pearson r|, or Spearman's (Pearson on average ranks).
+
+    Ranks are taken per column over all its present values, so with missing
+    values Spearman's is a close approximation of the pairwise-complete one.
+    """
+    if method == "spearman":
+        with ThreadPoolExecutor(max_workers=_workers(workers)) as pool:
+            blocks = np.array_split(values, max(values.shape[1] // block, 1), axis=1)
+            values = np.hstack(list(pool.map(rank, blocks)))
+    z, mask = standardize(values)
+    complete = mask.all(axis=0)
+    columns, p = list(columns), z.shape[1]
+    tiles = [(i0, min(i0 + block, p), j0, min(j0 + block, p))
+             for i0 in range(0, p, block) for j0 in range(i0, p, block)]
+    return _run_tiles(tiles, lambda tile: _correlation_tile(z, mask, complete, tile, columns, method, threshold),
+                      top_k, _workers(workers))
+
+
+def matrix_pairs(corr, method="pearson", threshold=CORRELATION_THRESHOLD, top_k=TOP_K):
+    """Top-k upper-triangle pairs of a correlation DataFrame with |r| >= threshold."""
+    values = np.nan_to_num(corr.to_numpy(), nan=0.0)
+    found = (np.abs(values) >= threshold) & np.triu(np.ones(values.shape, dtype=bool), k=1)
+    return _top(_pairs(values, found, list(corr.index), list(corr.columns), method), top_k)
+
+
+# --- categorical: Cramér's V / correlation ratio ---------------------------------
+
+def encode_categories(frame, max_levels=MAX_LEVELS):
+    """int16 codes per column (-1 for missing), most frequent levels first and the rest in one "other" level."""
+    codes = np.empty(frame.shape, dtype="int16")
+    levels = []
+    for index, col in enumerate(frame.columns):
+        counts = frame[col].value_counts()
+        kept = counts.index[:max_levels - 1]
+        column = pd.Categorical(frame[col], categories=kept).codes.astype("int16")
+        if len(counts) > len(kept):
+            column[(column < 0) & frame[col].notna().to_numpy()] = len(kept)
+        codes[:, index] = column
+        levels.append(min(len(counts), max_levels))
+    return codes, np.array(levels, dtype="int64")
+
+
+def _level_blocks(levels, width=ONE_HOT_COLUMNS):
+    """Categorical columns grouped by level count into blocks of at most `width` one-hot columns.
+
+    Every column of a block is padded to the block's largest level count, so
+    a block's contingency tables come out of one product as a dense array.
+    """
+    blocks, current = [], []
+    for index in np.argsort(levels, kind="stable"):
+        if current and (len(current) + 1) * levels[index] > width:
+            blocks.append((np.array(current), int(levels[current[-1]])))
+            current = []
+        current.append(index)
+    if current:
+        blocks.append((np.array(current), int(levels[current[-1]])))
+    return blocks
+
+
+def _one_hot(codes, width):
+    """(rows x columns*width) float32 indicators; a missing code sets no column."""
+    n_rows, q = codes.shape
+    out = np.zeros((n_rows, q * width), dtype="float32")
+    rows, cols = np.nonzero(codes >= 0)
+    out[rows, cols * width + codes[rows, cols]] = 1.0
+    return out
+
+
+def _cramers_v(tables):
+    """Bias-corrected Cramér's V (Bergsma) of a stack of contingency tables."""
+    n = tables.sum(axis=(1, 2))
+    rows, cols = tables.sum(axis=2), tables.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = rows[:, :, None] * cols[:, None, :] / n[:, None, None]
+        chi2 = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0).sum(axis=(1, 2))
+        r, k = (rows > 0).sum(axis=1), (cols > 0).sum(axis=1)
+        phi2 = np.maximum(chi2 / n - (k - 1) * (r - 1) / (n - 1), 0.0)
+        r_corr, k_corr = r - (r - 1) ** 2 / (n - 1), k - (k - 1) ** 2 / (n - 1)
+        denominator = np.minimum(k_corr - 1, r_corr - 1)
+        v = np.where(denominator > 0, np.sqrt(phi2 / denominator), 0.0)
+    return np.nan_to_num(np.clip(v, 0.0, 1.0), nan=0.0)
+
+
+def _cramers_v_tile(codes, tile, columns, threshold):
+    (left, left_width), (right, right_width), diagonal = tile
+    counts = _one_hot(codes[:, left], left_width).T @ _one_hot(codes[:, right], right_width)
+    tables = counts.reshape(len(left), left_width, len(right), right_width).transpose(0, 2, 1, 3)
+    v = _cramers_v(tables.reshape(-1, left_width, right_width).astype("float64")).reshape(len(left), len(right))
+    found = v >= threshold
+    if diagonal:
+        found &= np.triu(np.ones(found.shape, dtype=bool), k=1)
+    return _pairs(v, found, [columns[i] for i in left], [columns[i] for i in right], "cramers_v")
+
+
+def cramers_v_pairs(codes, levels, columns, threshold=ASSOCIATION_THRESHOLD, top_k=TOP_K, workers=None):
+    """Top-k pairs by bias-corrected Cramér's V, with all contingency tables of a tile from one one-hot product."""
+    blocks = _level_blocks(levels)
+    tiles = [(blocks[a], blocks[b], a == b) for a in range(len(blocks)) for b in range(a, len(blocks))]
+    return _run_tiles(tiles, lambda tile: _cramers_v_tile(codes, tile, list(columns), threshold),
+                      top_k, _workers(workers))
+
+
+def _correlation_ratio_tile(codes, z, mask, tile, categorical, numeric, threshold):
+    (left, width), (j0, j1) = tile
+    one_hot = _one_hot(codes[:, left], width).T
+    zj, mj = z[:, j0:j1], mask[:, j0:j1].astype("float32")
+    shape = (len(left), width, j1 - j0)
+    counts = (one_hot @ mj).reshape(shape)
+    sums = (one_hot @ zj).reshape(shape)
+    squares = (one_hot @ (zj * zj)).reshape(shape).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n, total = counts.sum(axis=1), sums.sum(axis=1)
+        between = np.where(counts > 0, sums * sums / counts, 0.0).sum(axis=1)
+        eta2 = (between - total * total / n) / (squares - total * total / n)
+        # Adjusted for the number of groups: with one row per level eta is 1 by construction
+        groups = (counts > 0).sum(axis=1)
+        eta = np.sqrt(np.maximum(1 - (1 - eta2) * (n - 1) / (n - groups), 0.0))
+    eta = np.nan_to_num(np.where(n > groups, np.clip(eta, 0.0, 1.0), 0.0), nan=0.0)
+    return _pairs(eta, eta >= threshold, [categorical[i] for i in left], numeric[j0:j1], "correlation_ratio")
+
+
+def correlation_ratio_pairs(codes, levels, categorical, values, numeric, threshold=ASSOCIATION_THRESHOLD,
+                            top_k=TOP_K, block=BLOCK_COLUMNS, workers=None):
+    """Top-k (categorical, numeric) pairs by the bias-adjusted correlation ratio eta, from per-level sums."""
+    z, mask = standardize(values)
+    p = z.shape[1]
+    tiles = [(level_block, (j0, min(j0 + block, p))) for level_block in _level_blocks(levels)
+             for j0 in range(0, p, block)]
+    return _run_tiles(tiles, lambda tile: _correlation_ratio_tile(codes, z, mask, tile, list(categorical),
+                                                                  list(numeric), threshold),
+                      top_k, _workers(workers))
+
+
+# --- entry point -----------------------------------------------------------------
+
+def _numeric_values(frame, numeric):
+    """float32 matrix of the numeric columns; values that fail to parse become NaN."""
+    values = np.empty((len(frame), len(numeric)), dtype="float32")
+    for index, col in enumerate(numeric):
+        series = frame[col]
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors="coerce")
+        values[:, index] = series.to_numpy(dtype="float32", na_value=np.nan)
+    return values
+
+
+@phase("correlation")
+def find_associations(frames, n_rows, numeric, categorical, methods=METHODS, threshold=CORRELATION_THRESHOLD,
+                      association_threshold=ASSOCIATION_THRESHOLD, top_k=TOP_K, max_bytes=MAX_MATRIX_BYTES,
+                      workers=None, seed=0):
+    """Strongest pairwise associations among the `numeric` and `categorical` columns of a chunked table.
+
+    `frames` yields the table's chunks (only these columns are needed) and
+    `n_rows` is its length, so the sample is drawn in one pass. Pearson and
+    Spearman pairs need |r| >= `threshold`, Cramér's V and the correlation
+    ratio >= `association_threshold`; at most `top_k` pairs are kept per method.
+    """
+    rows = sample_rows(n_rows, len(numeric), len(categorical), methods, max_bytes, workers)
+    with phase("sample") as span:
+        frame = sample_frame(frames, n_rows, rows, seed)
+        span.add(rows=len(frame))
+    return sample_associations(frame, n_rows, numeric, categorical, methods, threshold, association_threshold,
+                               top_k, workers)
+
+
+def sample_associations(frame, total_rows, numeric, categorical, methods=METHODS, threshold=CORRELATION_THRESHOLD,
+                        association_threshold=ASSOCIATION_THRESHOLD, top_k=TOP_K, workers=None, correlation=None):
+    """Like `find_associations`, from `frame`, a row sample (or all rows) of a `total_rows`-row table.
+
+    `correlation` is a Pearson matrix over every row (from streamed
+    co-moments); when given, the Pearson pairs come from it instead of the sample.
+    """
+    numeric, categorical = list(numeric), list(categorical)
+    result = Associations(rows=len(frame), total_rows=total_rows)
+    if "pearson" in methods and correlation is not None:
+        result.pairs += matrix_pairs(correlation, "pearson", threshold, top_k)
+        result.exact.append("pearson")
+    if frame.empty:
+        return result
+
+    values = _numeric_values(frame, numeric) if numeric else None
+    for method in ("pearson", "spearman"):
+        if method in methods and method not in result.exact and len(numeric) > 1:
+            with phase(method):
+                result.pairs += correlation_pairs(values, numeric, method, threshold, top_k, workers=workers)
+    if categorical and {"cramers_v", "correlation_ratio"} & set(methods):
+        codes, levels = encode_categories(frame[categorical])
+        if "cramers_v" in methods and len(categorical) > 1:
+            with phase("cramers_v"):
+                result.pairs += cramers_v_pairs(codes, levels, categorical, association_threshold, top_k, workers)
+        if "correlation_ratio" in methods and numeric:
+            with phase("correlation_ratio"):
+                result.pairs += correlation_ratio_pairs(codes, levels, categorical, values, numeric,
+                                                        association_threshold, top_k, workers=workers)
+    return result
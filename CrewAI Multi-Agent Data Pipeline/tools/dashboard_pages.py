@@ -0,0 +1,92 @@
+import hashlib
+import html
+import os
+import zipfile
+
+from tools.plot_rendering import IMAGE_SIZE
+
+# Compact dashboard layout: each image is written once under assets/, named
+# by a hash of its bytes, so identical plots share a file and an unchanged
+# plot keeps its name (and browser cache entry) across runs. The HTML page
+# only references the images; they load lazily, and the column sections are
+# split into pages, so opening the dashboard of a wide table fetches one
+# page of images instead of all of them.
+ASSETS_DIR = "assets"
+HTML_NAME = "insights_dashboard.html"
+ARCHIVE_NAME = "insights_dashboard.zip"
+PAGE_COLUMNS = 20
+
+_STYLE = """
+body { font-family: sans-serif; margin: 0 2em; }
+section.column { border-bottom: 1px solid #ddd; padding: 1em 0; }
+section.column img { max-width: 100%; height: auto; }
+nav a { margin-right: .5em; }
+nav a.current { font-weight: bold; text-decoration: none; }
+"""
+
+# Pages other than the first are `hidden`, so their lazy images are not
+# fetched until the page is shown; without scripts every page is shown
+_SCRIPT = """
+const pages = document.querySelectorAll("div.page");
+function show() {
+  const current = Math.max(Array.from(pages).findIndex(page => "#" + page.id === location.hash), 0);
+  pages.forEach((page, index) => { page.hidden = index !== current; });
+  document.querySelectorAll("nav a").forEach((link, index) => link.classList.toggle("current", index === current));
+}
+window.addEventListener("hashchange", () => { show(); window.scrollTo(0, 0); });
+show();
+"""
+
+
+def write_asset(data, directory, extension):
+    """Write `data` to `directory` under its content hash, once; returns the file name."""
+    name = f"{hashlib.sha256(data).hexdigest()[:20]}.{extension}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return name
+
+
+def _section(column, kind, images, insights):
+    alt = f"{column} count plot" if kind == "categorical" else f"{column} plot"
+    width, height = IMAGE_SIZE
+    tags = [f'<img src="{ASSETS_DIR}/{name}" alt="{html.escape(alt)}" width="{width}" height="{height}" '
+            f'loading="lazy" decoding="async">' for name in images]
+    return f'<section class="column">{"".join(insights)}{"".join(tags)}</section>'
+
+
+def page_html(sections, page_columns=PAGE_COLUMNS, title="Data Dashboard"):
+    """Dashboard page for `(column, kind, image names, insight html)` sections, `page_columns` per page."""
+    pages = [sections[start:start + page_columns] for start in range(0, len(sections), page_columns)] or [[]]
+    nav = "".join(f'<a href="#page-{number}">{number}</a>' for number in range(1, len(pages) + 1))
+    body = "".join(
+        f'<div class="page" id="page-{number}"{" hidden" if number > 1 else ""}>'
+        + "".join(_section(*section) for section in page) + "</div>"
+        for number, page in enumerate(pages, start=1)
+    )
+    return (f"<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title><style>{_STYLE}</style>"
+            f"<noscript><style>div.page[hidden] {{ display: block; }} nav {{ display: none; }}</style></noscript>"
+            f"</head><body><h1>Visual Insights</h1><nav>Pages: {nav}</nav>{body}"
+            f"<script>{_SCRIPT}</script></body></html>")
+
+
+def write_archive(directory, names, archive_name=ARCHIVE_NAME):
+    """Zip `names` (relative to `directory`) for a one-file download; images are stored, not recompressed."""
+    archive_path = os.path.join(directory, archive_name)
+    tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w") as archive:
+        for name in names:
+            compression = zipfile.ZIP_DEFLATED if name.endswith(".html") else zipfile.ZIP_STORED
+            archive.write(os.path.join(directory, name), name, compress_type=compression)
+    os.replace(tmp_path, archive_path)
+    return archive_path
+
+
+def prune_assets(directory, keep):
+    """Delete images under `directory` that the current page no longer references."""
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name not in keep:
+            os.remove(entry.path)
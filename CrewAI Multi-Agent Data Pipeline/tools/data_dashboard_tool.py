@@ -1,106 +1,278 @@
 from crewai.tools import BaseTool
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import os
 import base64
+from typing import Optional
+
+import pandas as pd
+
+from tools.dashboard_pages import ARCHIVE_NAME, ASSETS_DIR, HTML_NAME, page_html, prune_assets, write_archive, write_asset
+from tools.ingestion import read_frame
+from tools.insights import DASHBOARD_INSIGHTS_PATH, ColumnInsight, InsightRecord, claim_insights, save_insights
+from tools.instrumentation import phase
+from tools.lineage import lineage_of, moved_columns, profile_dataset, signatures
+from tools.plot_rendering import render_plots
+from tools.plot_summaries import summarize_columns
+from tools.result_cache import cached_tool_run
+from tools import workspace
+
+# Bump whenever the dashboard output changes so stale cache entries are not reused
+CACHE_VERSION = 8
 
 class DataDashboardTool(BaseTool):
     name: str = "Data Dashboard Tool"
-    description: str = "Generates visualizations and insights from a given CSV file."
+    description: str = "Generates visualizations and insights from a given dataset file (CSV or Arrow)."
+    # Plot rendering processes; None means one per CPU, 1 renders inline
+    render_workers: Optional[int] = None
+    # "raw" plots every row, "binned" draws from streaming pre-aggregates
+    # (histogram bins, sketch quartiles); "auto" bins from binned_min_rows up
+    render_mode: str = "auto"
+    binned_min_rows: int = 1_000_000
+    # Rows per chunk of the binning pass
+    chunksize: int = 100_000
+    # "embedded" writes one self-contained HTML file with base64 PNGs (and the
+    # PNGs beside it); "compact" writes each image once, as lossless WebP, to
+    # dashboard_output/assets/ for a paginated page that loads them lazily, plus
+    # a zip of both; "auto" is compact from compact_min_columns columns up
+    output_mode: str = "auto"
+    compact_min_columns: int = 40
+    # Column sections per page of a compact dashboard
+    page_columns: int = 20
+    use_cache: bool = True
 
     def _run(self, csv_path: str) -> str:
-       
-            df = pd.read_csv(csv_path)
-            output_dir = "dashboard_output"
-            os.makedirs(output_dir, exist_ok=True)
-            insights = []
+        params = {"render_mode": self.render_mode, "binned_min_rows": self.binned_min_rows,
+                  "output_mode": self.output_mode, "compact_min_columns": self.compact_min_columns,
+                  "page_columns": self.page_columns}
+        # What this run reused from the previous upload; not part of the
+        # cached message, since a cache hit re-analyses nothing
+        notes = []
+        message = cached_tool_run(self, CACHE_VERSION, [csv_path], params,
+                                  lambda: self._build_dashboard(csv_path, notes))
+        claim_insights(workspace.output_path(DASHBOARD_INSIGHTS_PATH), csv_path)
+        return " ".join([message] + notes)
+
+    def _build_dashboard(self, csv_path: str, notes: list):
+        # The saved plots are loaded, partly redrawn and saved as one step, so
+        # concurrent runs on the same lineage wait for each other
+        with lineage_of(csv_path).lock:
+            return self._build_locked(csv_path, notes)
+
+    def _build_locked(self, csv_path: str, notes: list):
+
+            output_dir = workspace.output_dir("dashboard_output")
+
+            # Profile incrementally and only re-render the columns whose
+            # distribution moved since this table's last dashboard
+            update = profile_dataset(csv_path)
+            profiler = update.profiler
+            current = signatures(profiler)
+            compact = self.output_mode == "compact" or (self.output_mode == "auto" and len(current) >= self.compact_min_columns)
+            image_format = "webp" if compact else "png"
+            previous = update.lineage.load("dashboard") or {"signatures": {}, "columns": {}}
+            moved = set(moved_columns(previous["signatures"], current))
+            # Plots saved in another image format are drawn again
+            reused = {col: previous["columns"][col]["images"] for col in current
+                      if col not in moved and col in previous["columns"]
+                      and previous["columns"][col].get("image_format", "png") == image_format}
+            n_rows = profiler.n_rows
 
             # Save data summary
-            description = df.describe(include='all').transpose()
+            description = profiler.describe_all()
             description.to_csv(f"{output_dir}/summary.csv")
+            artifacts = [f"{output_dir}/summary.csv"]
 
-            image_tags = []
-
-            # Numerical features plots and insights
-            for column in df.select_dtypes(include=['int64', 'float64']).columns:
-                data = df[column].dropna()
-
-                # Histogram
-                hist_path = f"{output_dir}/{column}_hist.png"
-                plt.figure(figsize=(8, 5))
-                sns.histplot(data, kde=True)
-                plt.title(f"Distribution of {column}")
-                plt.savefig(hist_path)
-                plt.close()
-
-                # Box plot
-                box_path = f"{output_dir}/{column}_box.png"
-                plt.figure(figsize=(8, 5))
-                sns.boxplot(x=data)
-                plt.title(f"Box Plot of {column}")
-                plt.savefig(box_path)
-                plt.close()
-
-                # Insight about skewness and outliers
-                skewness = data.skew()
-                outliers = data[(data < data.quantile(0.25) - 1.5 * data.std()) |
-                                (data > data.quantile(0.75) + 1.5 * data.std())]
-                insights.append(f"<h3>{column}</h3>")
-                insights.append(f"<p>Skewness: {skewness:.2f}</p>")
-                if skewness > 1 or skewness < -1:
-                    insights.append("<p>Highly skewed distribution.</p>")
-                elif skewness > 0.5 or skewness < -0.5:
-                    insights.append("<p>Moderately skewed.</p>")
+            # Statistics and insights are always computed from the current
+            # rows; only the plots, the expensive part, are kept for columns
+            # that did not move
+            sections = {}
+            binned = self.render_mode == "binned" or (self.render_mode == "auto" and n_rows >= self.binned_min_rows)
+            with phase("analyse"):
+                if binned:
+                    jobs = self._binned_sections(csv_path, profiler, profiler.columns, sections)
                 else:
-                    insights.append("<p>Fairly symmetric.</p>")
-
-                insights.append(f"<p>Outliers detected: {len(outliers)} values.</p>")
-
-                # Encode images to base64 and create img tags
-                for img_path in [hist_path, box_path]:
-                    with open(img_path, "rb") as image_file:
-                        encoded = base64.b64encode(image_file.read()).decode()
-                        img_tag = f'<img src="data:image/png;base64,{encoded}" alt="{column} plot" style="max-width:100%;height:auto;">'
-                        image_tags.append(img_tag)
-
-            # Categorical features plots and insights
-            for column in df.select_dtypes(include='object').columns:
-                unique_vals = df[column].nunique()
-                top_values = df[column].value_counts(normalize=True).head(3)
-
-                if unique_vals <= 10:
-                    count_path = f"{output_dir}/{column}_count.png"
-                    plt.figure(figsize=(8, 5))
-                    sns.countplot(x=column, data=df)
-                    plt.title(f"Count Plot of {column}")
-                    plt.xticks(rotation=45)
-                    plt.savefig(count_path)
-                    plt.close()
-
-                    insights.append(f"<h3>{column}</h3>")
-                    for cat, pct in top_values.items():
-                        insights.append(f"<p>{cat}: {pct*100:.1f}%</p>")
-
-                    # Encode image to base64 and create img tag
-                    with open(count_path, "rb") as image_file:
-                        encoded = base64.b64encode(image_file.read()).decode()
-                        img_tag = f'<img src="data:image/png;base64,{encoded}" alt="{column} count plot" style="max-width:100%;height:auto;">'
-                        image_tags.append(img_tag)
-
-            # Generate HTML content
-            html_content = "<html><head><title>Data Dashboard</title></head><body>"
-            html_content += "<h1>Visual Insights</h1>"
-            html_content += "".join(image_tags)
-            html_content += "<h2>Insights</h2>"
-            html_content += "".join(insights)
-            html_content += "</body></html>"
-
-            # Save HTML file
-            html_path = f"{output_dir}/insights_dashboard.html"
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-
-            return f"Dashboard and insights saved in '{html_path}'."
+                    jobs = self._raw_sections(read_frame(csv_path), n_rows, sections)
+            for col, images in reused.items():
+                if col in sections:
+                    sections[col]["images"] = images
+            jobs = [job for job in jobs if str(job[1]) not in reused]
+
+            # Render every plot in parallel; the image bytes are kept per column
+            # so the next upload can reuse them
+            with phase("render", plots=len(jobs)):
+                for (kind, column, _), images in zip(jobs, render_plots(jobs, self.render_workers, image_format)):
+                    sections[str(column)]["images"] = images
+            for section in sections.values():
+                section["image_format"] = image_format
+            update.lineage.save("dashboard", {"signatures": current, "columns": sections})
+
+            # Numeric columns first, then categorical, each in file order
+            ordered = [col for kind in ("numeric", "categorical") for col in current
+                       if col in sections and sections[col]["kind"] == kind]
+            record = InsightRecord("dashboard", csv_path, n_rows,
+                                   columns={col: sections[col]["insight"] for col in current if col in sections})
+            record.detect_target()
+            artifacts.append(save_insights(record, workspace.output_path(DASHBOARD_INSIGHTS_PATH)))
+
+            if compact:
+                html_path, written = self._write_compact(output_dir, ordered, sections)
+            else:
+                html_path, written = self._write_embedded(output_dir, ordered, sections)
+            artifacts += written
+
+            message = f"Dashboard and insights saved in '{workspace.relative_path(html_path)}'."
+            if reused:
+                notes.append(f"Redrew the plots of {len(current) - len(reused)} of {len(current)} columns; "
+                             f"the others did not move since the previous upload.")
+            if binned:
+                message += f" Plots were drawn from pre-binned summaries of {n_rows} rows."
+            if compact:
+                message += (f" Images are in '{workspace.relative_path(os.path.join(output_dir, ASSETS_DIR))}' next to it; "
+                            f"'{workspace.relative_path(os.path.join(output_dir, ARCHIVE_NAME))}' has both.")
+            return message, artifacts
+
+    @staticmethod
+    def _write_embedded(output_dir, ordered, sections):
+        """One HTML file with every plot inlined as base64, plus the PNG files."""
+        artifacts = []
+        # Save and embed the PNG bytes straight from memory
+        image_tags = []
+        with phase("embed", "io") as span:
+            for column in ordered:
+                kind = sections[column]["kind"]
+                for plot, png in sections[column]["images"].items():
+                    image_path = f"{output_dir}/{column}_{plot}.png"
+                    with open(image_path, "wb") as image_file:
+                        image_file.write(png)
+                    artifacts.append(image_path)
+                    encoded = base64.b64encode(png).decode()
+                    alt = f"{column} count plot" if kind == "categorical" else f"{column} plot"
+                    img_tag = f'<img src="data:image/png;base64,{encoded}" alt="{alt}" style="max-width:100%;height:auto;">'
+                    image_tags.append(img_tag)
+            span.add(bytes=sum(len(tag) for tag in image_tags))
+        insights = [line for column in ordered for line in sections[column]["insights"]]
+
+        # Generate HTML content
+        html_content = "<html><head><title>Data Dashboard</title></head><body>"
+        html_content += "<h1>Visual Insights</h1>"
+        html_content += "".join(image_tags)
+        html_content += "<h2>Insights</h2>"
+        html_content += "".join(insights)
+        html_content += "</body></html>"
+
+        # Save HTML file
+        html_path = f"{output_dir}/{HTML_NAME}"
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+        artifacts.append(html_path)
+        return html_path, artifacts
+
+    def _write_compact(self, output_dir, ordered, sections):
+        """Paginated HTML page with each column's plots and insights, its image assets, and a zip of both."""
+        asset_dir = os.path.join(output_dir, ASSETS_DIR)
+        os.makedirs(asset_dir, exist_ok=True)
+        assets, page = {}, []
+        with phase("assets", "io") as span:
+            for column in ordered:
+                section = sections[column]
+                names = [write_asset(data, asset_dir, section["image_format"]) for data in section["images"].values()]
+                assets.update(zip(names, section["images"].values()))
+                if names or section["insights"]:
+                    page.append((column, section["kind"], names, section["insights"]))
+            span.add(bytes=sum(len(data) for data in assets.values()))
+        prune_assets(asset_dir, keep=assets)
+
+        html_path = os.path.join(output_dir, HTML_NAME)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(page_html(page, self.page_columns))
+        asset_paths = [os.path.join(asset_dir, name) for name in assets]
+        with phase("archive", "io"):
+            archive_path = write_archive(output_dir, [HTML_NAME] + [f"{ASSETS_DIR}/{name}" for name in assets])
+        return html_path, [html_path, archive_path] + asset_paths
+
+    def _raw_sections(self, df, n_rows, sections):
+        """Per-column insights from the raw rows; returns the plot jobs."""
+        jobs = []
+
+        # Numerical features insights; plots are queued for the render pool
+        for column in df.select_dtypes(include=['int64', 'float64']).columns:
+            data = df[column].dropna()
+            jobs.append(("numeric", column, data))
+
+            # Insight about skewness and outliers
+            outliers = data[(data < data.quantile(0.25) - 1.5 * data.std()) |
+                            (data > data.quantile(0.75) + 1.5 * data.std())]
+            sections[str(column)] = self._numeric_section(ColumnInsight(
+                str(column), str(df[column].dtype), "numeric", count=len(data),
+                missing=n_rows - len(data), unique=int(data.nunique()), mean=data.mean(),
+                std=data.std(), min=data.min(), max=data.max(), skewness=data.skew(), outliers=len(outliers),
+            ))
+
+        # Categorical features insights
+        for column in df.select_dtypes(include='object').columns:
+            unique_vals = df[column].nunique()
+            if unique_vals <= 10:
+                jobs.append(("count", column, df[column]))
+            sections[str(column)] = self._categorical_section(
+                column, int(df[column].count()), int(df[column].isna().sum()), int(unique_vals),
+                df[column].value_counts(normalize=True).head(3))
+        return jobs
+
+    def _binned_sections(self, csv_path, profiler, columns, sections):
+        """Same insights from the streaming profile plus one pass that bins the data.
+
+        Nothing here holds more than a chunk of rows, and the plot jobs carry
+        bin counts instead of columns, so rendering cost no longer grows with
+        the row count.
+        """
+        numeric = [col for col in columns if profiler.dtypes[col] in ("int64", "float64")]
+        categorical = [col for col in columns if profiler.dtypes[col] == "object"]
+        plotted = [col for col in categorical if profiler.distinct[col].count() <= 10]
+        summaries = summarize_columns(csv_path, profiler, numeric, plotted, self.chunksize)
+
+        jobs = []
+        for column in numeric:
+            summary = summaries[column]
+            jobs.append(("numeric_binned", column, summary))
+            sections[str(column)] = self._numeric_section(ColumnInsight(
+                str(column), profiler.dtypes[column], "numeric", count=summary.n,
+                missing=profiler.n_rows - summary.n, unique=profiler.distinct[column].count(), mean=summary.mean,
+                std=summary.std, min=summary.min, max=summary.max, skewness=summary.skewness,
+                outliers=summary.outliers,
+            ))
+        for column in categorical:
+            present = profiler.n_rows - profiler.nulls[column]
+            if column in summaries:
+                jobs.append(("count_binned", column, summaries[column]))
+                top_values = summaries[column].top_shares(3)
+            else:
+                top = profiler.top_values[column].most_common(3, dropna=True)
+                top_values = pd.Series({value: count / present for value, count in top}, dtype="float64")
+            sections[str(column)] = self._categorical_section(
+                column, present, profiler.nulls[column], profiler.distinct[column].count(), top_values)
+        return jobs
+
+    @staticmethod
+    def _numeric_section(insight):
+        column, skewness = insight.name, insight.skewness
+        skewness = float("nan") if skewness is None else skewness
+        insights = [f"<h3>{column}</h3>", f"<p>Skewness: {skewness:.2f}</p>"]
+        if skewness > 1 or skewness < -1:
+            insights.append("<p>Highly skewed distribution.</p>")
+        elif skewness > 0.5 or skewness < -0.5:
+            insights.append("<p>Moderately skewed.</p>")
+        else:
+            insights.append("<p>Fairly symmetric.</p>")
 
+        insights.append(f"<p>Outliers detected: {insight.outliers} values.</p>")
+        return {"kind": "numeric", "images": {}, "insights": insights, "insight": insight}
 
+    @staticmethod
+    def _categorical_section(column, count, missing, unique, top_values):
+        insights = []
+        if unique <= 10:
+            insights.append(f"<h3>{column}</h3>")
+            for cat, pct in top_values.items():
+                insights.append(f"<p>{cat}: {pct*100:.1f}%</p>")
+        insight = ColumnInsight(str(column), "object", "categorical", count=count, missing=missing, unique=unique,
+                                top_share=top_values.iloc[0] if len(top_values) else None)
+        return {"kind": "categorical", "images": {}, "insights": insights, "insight": insight}
@@ -1,38 +1,158 @@
 from crewai.tools import BaseTool
 import pandas as pd
 import io
+import os
+
+from tools.correlation import MAX_CATEGORICAL_UNIQUE, sample_associations
+from tools.insights import EDA_INSIGHTS_PATH, claim_insights, profile_record, save_insights
+from tools.instrumentation import phase
+from tools.lineage import lineage_of, moved_columns, profile_dataset, signatures
+from tools.profiling import StreamingProfiler
+from tools.result_cache import cached_tool_run
+from tools.workspace import output_path
+
+METHOD_LABELS = {
+    "pearson": "Pearson r",
+    "spearman": "Spearman rank r",
+    "cramers_v": "Cramér's V (categorical pairs)",
+    "correlation_ratio": "Correlation ratio η (categorical ~ numeric)",
+}
+
+# Bump whenever the report changes so stale cache entries are not reused
+CACHE_VERSION = 6
 
 class ExploreCSVDataTool(BaseTool):
     name: str = "Explore CSV Data Tool"
-    description: str = "Performs EDA on CSV data string and returns a report."
+    description: str = (
+        "Performs EDA on a dataset file and returns a compact profile report. "
+        "Pass the path of the dataset file (CSV or Arrow), not its contents."
+    )
+    # The report is what the LLM sees, so keep it bounded by the number of
+    # columns, never by the number of rows.
+    max_value_chars: int = 40
+    max_report_chars: int = 20000
+    # Rows per chunk of the single streaming pass; peak memory scales with it
+    chunksize: int = 100_000
+    use_cache: bool = True
+
+    def _run(self, csv_path: str) -> str:
+        params = {
+            "chunksize": self.chunksize,
+            "max_value_chars": self.max_value_chars,
+            "max_report_chars": self.max_report_chars,
+        }
+        report = cached_tool_run(self, CACHE_VERSION, [csv_path], params,
+                                 lambda: (self._profile(csv_path), [output_path(EDA_INSIGHTS_PATH)]))
+        if os.path.exists(csv_path):
+            claim_insights(output_path(EDA_INSIGHTS_PATH), csv_path)
+        return report
+
+    def _profile(self, csv_path: str) -> str:
 
-    def _run(self, csv_string: str) -> str:
-        
-            df = pd.read_csv(io.StringIO(csv_string))
+            # Profile is computed out-of-band from the file; inline CSV text is
+            # still accepted for backwards compatibility.
+            changes = None
+            if os.path.exists(csv_path):
+                # Row blocks unchanged since the last upload of this table are
+                # merged from saved state instead of being profiled again
+                with lineage_of(csv_path).lock:
+                    update = profile_dataset(csv_path, self.chunksize)
+                    changes = self._changes_section(update)
+                profiler = update.profiler
+            else:
+                profiler = StreamingProfiler()
+                with phase("profile"):
+                    for chunk in pd.read_csv(io.StringIO(csv_path), chunksize=self.chunksize):
+                        profiler.update(chunk)
+
+            # Pairwise associations come from the same pass: Pearson's r from
+            # co-moments over every row, the other measures from its row sample
+            unique = profiler.unique_series()
+            numeric = list(profiler.numeric_columns)
+            categorical = [col for col in profiler.columns
+                           if col not in profiler.moments and 2 <= unique[col] <= MAX_CATEGORICAL_UNIQUE]
+            correlation = profiler.correlation()
+            with phase("associations"):
+                associations = sample_associations(profiler.sample.frame(), profiler.n_rows, numeric, categorical,
+                                                   correlation=correlation)
+
+            # Machine-readable summary for the model suggestion step
+            source = csv_path if os.path.exists(csv_path) else "<inline csv>"
+            with phase("insights"):
+                save_insights(profile_record(profiler, source, associations=associations), output_path(EDA_INSIGHTS_PATH))
             report = []
 
             report.append("🔍 **DATA EXPLORATION REPORT** 🔍")
-            report.append(f"\n🧾 Shape of the data: {df.shape[0]} rows, {df.shape[1]} columns")
-            report.append("\n📋 Columns and Data Types:\n" + str(df.dtypes))
-            report.append("\n🧹 Missing Values per Column:\n" + str(df.isnull().sum()))
-            report.append("\n📊 Number of Unique Values per Column:\n" + str(df.nunique()))
-            report.append("\n📈 Descriptive Statistics (Numerical Columns):\n" + str(df.describe(include='number').round(2)))
-            report.append("\n🔢 Descriptive Statistics (Categorical Columns):\n" + str(df.describe(include='object')))
+            report.append(f"\n🧾 Shape of the data: {profiler.n_rows} rows, {len(profiler.columns)} columns")
+            # Ahead of the per-column sections, which are the ones cut when the report is truncated
+            report.append(self._associations_section(associations))
+            report.append("\n📋 Columns and Data Types:\n" + str(profiler.dtypes_series()))
+            report.append("\n🧹 Missing Values per Column:\n" + str(profiler.missing_series()))
+            report.append("\n📊 Number of Unique Values per Column:\n" + str(profiler.unique_series()))
+            if profiler.numeric_columns:
+                report.append("\n📈 Descriptive Statistics (Numerical Columns):\n" + str(profiler.describe_numeric().round(2)))
+            categorical = profiler.describe_categorical()
+            if not categorical.empty:
+                categorical.loc['top'] = categorical.loc['top'].map(self._shorten)
+                report.append("\n🔢 Descriptive Statistics (Categorical Columns):\n" + str(categorical))
 
             # Top frequent values for each column
             report.append("\n📌 Top Frequent Values per Column:")
-            for col in df.columns:
-                top_values = df[col].value_counts(dropna=False).head(3)
+            for col in profiler.columns:
+                top_values = profiler.value_counts(col, 3)
+                top_values.index = top_values.index.map(self._shorten)
                 report.append(f"\n🔹 {col}:\n{top_values.to_string()}")
 
-            # Correlation matrix
-            numeric_cols = df.select_dtypes(include='number')
-            if not numeric_cols.empty:
-                corr = numeric_cols.corr().round(2)
-                report.append("\n🔗 Correlation Matrix (numeric columns):\n" + str(corr))
+            if changes is not None:
+                report.append(changes)
+
+            # Sketch-based numbers are flagged so nobody mistakes them for exact counts
+            approximations = profiler.approximations()
+            if approximations:
+                lines = [f"🔸 {col}: {', '.join(flags)}" for col, flags in approximations.items()]
+                report.append("\n⚠️ Approximate Statistics (streaming sketches):\n" + "\n".join(lines))
             else:
-                report.append("\n🔗 No numeric columns to compute correlation matrix.")
+                report.append("\n✅ All statistics are exact.")
+
+            text = "\n\n".join(report)
+            if len(text) > self.max_report_chars:
+                text = text[:self.max_report_chars] + "\n\n✂️ Report truncated to keep the prompt size bounded."
+            return text
 
-            return "\n\n".join(report)
+    def _associations_section(self, associations):
+        # Only the strongest pairs: a full matrix grows with the square of the column count
+        if not associations.pairs:
+            return "\n🔗 No strongly associated column pairs."
+        lines = []
+        for method, label in METHOD_LABELS.items():
+            pairs = associations.by_method(method)
+            if pairs:
+                listed = ", ".join(f"{self._shorten(p.left)} ~ {self._shorten(p.right)} ({p.value:+.2f})" for p in pairs)
+                lines.append(f"🔸 {label}: {listed}")
+        scope = ""
+        if associations.sampled:
+            scope = f" (from a sample of {associations.rows} of {associations.total_rows} rows"
+            scope += ", Pearson r from every row)" if "pearson" in associations.exact else ")"
+        return f"\n🔗 Strongest Associations{scope}:\n" + "\n".join(lines)
 
+    def _changes_section(self, update):
+        # Called with the lineage's lock held, between loading and saving the EDA state
+        current = signatures(update.profiler)
+        previous = update.lineage.load("eda")
+        update.lineage.save("eda", {"signatures": current})
+        if previous is None:
+            return "\n🆕 First upload of this table; the full profile was computed."
+        moved = moved_columns(previous["signatures"], current)
+        lines = [f"🔸 Reused {update.reused_rows} rows ({update.reused_blocks} of {update.blocks} blocks) "
+                 f"from the previous upload; profiled {update.new_rows} new or changed rows."]
+        if moved:
+            lines.append("🔸 Columns whose distribution moved: " + ", ".join(map(self._shorten, moved)))
+        else:
+            lines.append("🔸 No column distribution moved noticeably.")
+        return "\n🔄 Changes Since the Previous Upload:\n" + "\n".join(lines)
 
+    def _shorten(self, value):
+        # Long free-text cells would otherwise leak row content into the prompt
+        if isinstance(value, str) and len(value) > self.max_value_chars:
+            return value[:self.max_value_chars - 1] + "…"
+        return value
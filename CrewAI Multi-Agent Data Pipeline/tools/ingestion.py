@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from tools.instrumentation import phase
+
+# Uploads are parsed from CSV exactly once and stored as uncompressed Arrow IPC
+# files, which every tool then memory-maps and reads column-selectively.
+ARROW_SUFFIX = ".arrow"
+BATCH_ROWS = 64_000
+
+
+def is_arrow(path):
+    return str(path).endswith(ARROW_SUFFIX)
+
+
+def _arrow_safe(df):
+    # Mixed-type object columns cannot become an Arrow column; keep them as text
+    for col in df.select_dtypes(include="object").columns:
+        if pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def write_arrow(df, arrow_path):
+    """Store a DataFrame as an Arrow IPC file in record batches of BATCH_ROWS."""
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+    if os.path.dirname(arrow_path):
+        os.makedirs(os.path.dirname(arrow_path), exist_ok=True)
+    tmp_path = arrow_path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=BATCH_ROWS)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+def ingest_csv(source, arrow_path):
+    """Parse a CSV (path, buffer or bytes) once and store it as Arrow IPC."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with phase("parse csv", "io") as span:
+        df = pd.read_csv(source, low_memory=False)
+        span.add(rows=len(df))
+    return write_arrow(df, arrow_path)
+
+
+def ingest_upload(name, content, data_dir="data"):
+    """Convert uploaded CSV bytes to `data_dir/<name>.arrow`, skipping unchanged uploads.
+
+    A `.sha256` sidecar remembers which upload the Arrow file came from, so
+    Streamlit reruns on the same file do not parse the CSV again.
+    """
+    arrow_path = os.path.join(data_dir, os.path.splitext(os.path.basename(name))[0] + ARROW_SUFFIX)
+    digest = hashlib.sha256(content).hexdigest()
+    digest_path = arrow_path + ".sha256"
+    if os.path.exists(arrow_path) and os.path.exists(digest_path):
+        with open(digest_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == digest:
+                return arrow_path
+    ingest_csv(content, arrow_path)
+    with open(digest_path, "w", encoding="utf-8") as f:
+        f.write(digest)
+    return arrow_path
+
+
+def _open(arrow_path):
+    return pa.ipc.open_file(pa.memory_map(arrow_path, "r"))
+
+
+def read_columns(path):
+    """Column names of a dataset without reading any rows."""
+    if is_arrow(path):
+        return list(_open(path).schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_frame(path, columns=None):
+    """Load a dataset (Arrow IPC or CSV) as a DataFrame, optionally only some columns."""
+    if is_arrow(path):
+        table = _open(path).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        return table.to_pandas()
+    return pd.read_csv(path, usecols=columns)
+
+
+def iter_frames(path, chunksize=100_000, columns=None):
+    """Yield a dataset as DataFrame chunks of at most `chunksize` rows."""
+    if not is_arrow(path):
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+        return
+    reader = _open(path)
+    pending, rows = [], 0
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        if columns is not None:
+            batch = batch.select(list(columns))
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize).to_pandas()
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending, schema=pending[0].schema).to_pandas()
+
+
+def preview_frame(path, rows=5):
+    """First `rows` rows, reading only the first record batch."""
+    if not is_arrow(path):
+        return pd.read_csv(path, nrows=rows)
+    reader = _open(path)
+    if reader.num_record_batches == 0:
+        return reader.schema.empty_table().to_pandas()
+    return reader.get_batch(0).slice(0, rows).to_pandas()
@@ -0,0 +1,177 @@
+import json
+import math
+import os
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, List, Optional
+
+from tools.correlation import CORRELATION_THRESHOLD
+
+# Typed insight records the EDA and dashboard tools publish for the model
+# suggestion step, so it never has to scan free-text reports.
+INSIGHTS_FORMAT_VERSION = 1
+INSIGHTS_DIR = "insights"
+EDA_INSIGHTS_PATH = os.path.join(INSIGHTS_DIR, "eda.json")
+DASHBOARD_INSIGHTS_PATH = os.path.join(INSIGHTS_DIR, "dashboard.json")
+
+TARGET_NAMES = ("target", "label", "class", "outcome", "y", "nobeyesdad")
+# Integer targets with at most this many distinct values are treated as classes
+MAX_CLASS_LABELS = 20
+
+
+def _number(value):
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+@dataclass
+class ColumnInsight:
+    name: str
+    dtype: str
+    kind: str  # "numeric" or "categorical"
+    count: int
+    missing: int
+    unique: int
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    skewness: Optional[float] = None
+    outliers: Optional[int] = None
+    top_share: Optional[float] = None
+
+    def __post_init__(self):
+        for name in ("mean", "std", "min", "max", "skewness", "top_share"):
+            setattr(self, name, _number(getattr(self, name)))
+
+
+@dataclass
+class InsightRecord:
+    produced_by: str
+    source: str
+    rows: int
+    columns: Dict[str, ColumnInsight] = field(default_factory=dict)
+    # (column, column, pearson r) with |r| >= CORRELATION_THRESHOLD
+    correlations: List[list] = field(default_factory=list)
+    # (column, column, method, value): strongest pairs per method of tools/correlation.py
+    associations: List[list] = field(default_factory=list)
+    target: Optional[str] = None
+    target_type: Optional[str] = None  # "classification" or "regression"
+    target_from: Optional[str] = None  # "name" or "last column"
+
+    def to_dict(self):
+        state = asdict(self)
+        state["format_version"] = INSIGHTS_FORMAT_VERSION
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get("format_version") != INSIGHTS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported insight record version: {state.get('format_version')}")
+        known = {f.name for f in fields(cls)}
+        state = {key: value for key, value in state.items() if key in known}
+        state["columns"] = {name: ColumnInsight(**col) for name, col in state.get("columns", {}).items()}
+        return cls(**state)
+
+    def numeric(self):
+        return [col for col in self.columns.values() if col.kind == "numeric"]
+
+    def categorical(self):
+        return [col for col in self.columns.values() if col.kind == "categorical"]
+
+    def detect_target(self):
+        """Pick the target by name, falling back to the last column, and classify it."""
+        if not self.columns:
+            return
+        by_name = [name for name in self.columns if str(name).lower() in TARGET_NAMES]
+        self.target, self.target_from = (by_name[0], "name") if by_name else (list(self.columns)[-1], "last column")
+        col = self.columns[self.target]
+        if col.kind == "categorical" or (col.dtype.startswith(("int", "bool")) and col.unique <= MAX_CLASS_LABELS):
+            self.target_type = "classification"
+        else:
+            self.target_type = "regression"
+
+
+def profile_record(profiler, source, produced_by="eda", associations=None):
+    """Insight record from a fed `StreamingProfiler`, with the pairs of `find_associations` if given."""
+    record = InsightRecord(produced_by, str(source), profiler.n_rows)
+    unique = profiler.unique_series()
+    for col in profiler.columns:
+        present = profiler.n_rows - profiler.nulls[col]
+        top = profiler.top_values[col].most_common(1, dropna=True)
+        insight = ColumnInsight(
+            str(col), profiler.dtypes[col], "numeric" if col in profiler.moments else "categorical",
+            count=present, missing=profiler.nulls[col], unique=int(unique[col]),
+            top_share=top[0][1] / present if top and present else None,
+        )
+        moments = profiler.moments.get(col)
+        if moments is not None and moments.n:
+            insight.mean, insight.std = _number(moments.mean), _number(moments.std)
+            insight.min, insight.max = _number(moments.min), _number(moments.max)
+        record.columns[str(col)] = insight
+    if associations is not None:
+        record.associations = [pair.to_list() for pair in associations.pairs]
+        record.correlations = [[left, right, value] for left, right, method, value in record.associations
+                               if method == "pearson" and abs(value) >= CORRELATION_THRESHOLD]
+    record.detect_target()
+    return record
+
+
+def merge_records(*records):
+    """Combine records for the same dataset; later records fill in fields the earlier ones lack.
+
+    Records describing another source (left over from an earlier upload) are ignored.
+    """
+    records = [record for record in records if record is not None]
+    if not records:
+        return None
+    merged = InsightRecord.from_dict(records[0].to_dict())
+    for record in records[1:]:
+        if record.source != merged.source:
+            continue
+        merged.produced_by += f"+{record.produced_by}"
+        merged.rows = max(merged.rows, record.rows)
+        for name, col in record.columns.items():
+            if name not in merged.columns:
+                merged.columns[name] = col
+                continue
+            current = merged.columns[name]
+            for f in fields(ColumnInsight):
+                if getattr(current, f.name) is None:
+                    setattr(current, f.name, getattr(col, f.name))
+        merged.correlations = merged.correlations or record.correlations
+        merged.associations = merged.associations or record.associations
+        if merged.target is None:
+            merged.target, merged.target_type, merged.target_from = record.target, record.target_type, record.target_from
+    return merged
+
+
+def save_insights(record, path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record.to_dict(), f, indent=2, default=str)
+    return path
+
+
+def claim_insights(path, source):
+    """Point the record at `path` at `source`, if it describes another file.
+
+    A result-cache hit restores the record saved for the first file with the
+    same content, whose path the readers would not recognise.
+    """
+    record = load_insights(path)
+    if record is not None and record.source != str(source):
+        record.source = str(source)
+        save_insights(record, path)
+    return record
+
+
+def load_insights(path):
+    """The record at `path`, or None when it has not been written (or is unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return InsightRecord.from_dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
@@ -0,0 +1,194 @@
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Wall time per phase of the tools' hot paths. Phases are only timed while a
+# `record_phases()` block or a `trace_run()` is active, so outside the
+# benchmarks and traced runs each marker costs two context-variable lookups.
+_recorder = contextvars.ContextVar("phase_recorder", default=None)
+_trace = contextvars.ContextVar("trace", default=None)
+
+TRACE_DIR = os.environ.get("PIPELINE_TRACE_DIR", os.path.join(".cache", "traces"))
+
+
+class PhaseRecorder:
+    """Seconds per phase; nested phases are named "outer/inner" and repeats add up."""
+
+    def __init__(self):
+        self.phases = {}
+        self._stack = []
+
+
+class Span:
+    """Handle yielded by `phase()`; `add(rows=..., bytes=...)` attaches counts to the span."""
+
+    def __init__(self):
+        self.args = {}
+
+    def add(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan(Span):
+    def add(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MiB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class Trace:
+    """Timed spans of one run, from every thread that inherited its context.
+
+    Exported in the Chrome trace event format, which chrome://tracing and
+    Perfetto open directly and OpenTelemetry tooling can import.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """A trace saved by `save()`, e.g. to show a finished background run again."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        trace = cls(data["otherData"]["run"])
+        trace.started, trace.origin = data["otherData"]["started"], 0.0
+        for event in data["traceEvents"]:
+            if event["ph"] == "M":
+                trace._threads[event["tid"]] = (event["tid"], event["args"]["name"])
+            else:
+                start = event["ts"] / 1e6
+                trace.spans.append({"name": event["name"], "category": event["cat"], "start": start,
+                                    "end": start + event["dur"] / 1e6, "tid": event["tid"], "args": event["args"]})
+        return trace
+
+    def add(self, name, category, start, end, args):
+        thread = threading.current_thread()
+        with self._lock:
+            tid = self._threads.setdefault(thread.ident, (len(self._threads) + 1, thread.name))[0]
+            self.spans.append({"name": name, "category": category, "start": start - self.origin,
+                               "end": end - self.origin, "tid": tid, "args": args})
+
+    def rows(self):
+        """One dict per span, with its thread name and nesting depth within that thread."""
+        names = {tid: name for tid, name in self._threads.values()}
+        rows, open_ends = [], {}
+        for span in sorted(self.spans, key=lambda span: (span["tid"], span["start"], -span["end"])):
+            stack = open_ends.setdefault(span["tid"], [])
+            while stack and stack[-1] <= span["start"]:
+                stack.pop()
+            rows.append({"name": span["name"], "category": span["category"], "thread": names[span["tid"]],
+                         "depth": len(stack), "start_s": span["start"], "end_s": span["end"],
+                         "duration_s": span["end"] - span["start"], **span["args"]})
+            stack.append(span["end"])
+        return rows
+
+    def to_chrome(self):
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self._threads.values()]
+        events += [{"name": span["name"], "cat": span["category"], "ph": "X", "pid": pid, "tid": span["tid"],
+                    "ts": span["start"] * 1e6, "dur": (span["end"] - span["start"]) * 1e6, "args": span["args"]}
+                   for span in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"run": self.name, "started": self.started}}
+
+    def save(self, directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        path = os.path.join(directory, f"{stamp}_{self.name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, default=str)
+        return path
+
+
+@contextlib.contextmanager
+def phase(name, category="phase", **args):
+    """Time the enclosed block as `name` when a recorder or trace is active (also usable as a decorator).
+
+    Keyword arguments and `span.add()` counts are stored with the span;
+    `rows` and `bytes` also yield a throughput, and every traced span gets
+    the change in resident memory.
+    """
+    recorder, trace = _recorder.get(), _trace.get()
+    if recorder is None and trace is None:
+        yield _NULL_SPAN
+        return
+    if recorder is not None:
+        recorder._stack.append(name)
+        key = "/".join(recorder._stack)
+    span = Span()
+    span.args.update(args)
+    rss = current_rss_mb() if trace is not None else None
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        end = time.perf_counter()
+        if recorder is not None:
+            recorder.phases[key] = recorder.phases.get(key, 0.0) + end - start
+            recorder._stack.pop()
+        if trace is not None:
+            seconds = max(end - start, 1e-9)
+            if "rows" in span.args:
+                span.args["rows_per_s"] = round(span.args["rows"] / seconds)
+            if "bytes" in span.args:
+                span.args["mb_per_s"] = round(span.args["bytes"] / 2 ** 20 / seconds, 2)
+            if rss is not None:
+                span.args["rss_delta_mb"] = round(current_rss_mb() - rss, 1)
+            trace.add(name, category, start, end, span.args)
+
+
+@contextlib.contextmanager
+def record_phases():
+    recorder = PhaseRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextlib.contextmanager
+def trace_run(name):
+    """Collect the spans of everything run inside the block (and in threads started from its context)."""
+    trace = Trace(name)
+    token = _trace.set(trace)
+    try:
+        with phase(name, "run"):
+            yield trace
+    finally:
+        _trace.reset(token)
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or of its largest finished child) in MiB, if known."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return usage.ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
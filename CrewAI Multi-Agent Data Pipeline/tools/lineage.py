@@ -0,0 +1,193 @@
+import collections
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from tools.ingestion import iter_frames, read_columns
+from tools.instrumentation import phase
+from tools.profiling import StreamingProfiler
+from tools import workspace
+
+# Saved profiling state per dataset lineage: successive uploads of the same
+# file (same path in the same workspace, same columns in the same order)
+# share a lineage, and only the row blocks that changed since the previous
+# upload are profiled again.
+LINEAGE_DIR = os.environ.get("PIPELINE_LINEAGE_DIR", os.path.join(".cache", "lineage"))
+LINEAGE_FORMAT_VERSION = 6
+BLOCK_ROWS = 100_000
+
+# A column has "moved" when a decile/quartile shifts by this fraction of its spread,
+# or its missing rate / category shares change by this much
+DRIFT_THRESHOLD = 0.05
+SIGNATURE_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Reentrant, so a tool can hold its lineage's lock around `profile_dataset`
+_locks = collections.defaultdict(threading.RLock)
+
+
+def lineage_id(path, columns, root="."):
+    """Key of the lineage of the dataset at `path` in the workspace at `root`.
+
+    A re-upload replaces the file at the same path, so it finds the state of
+    the previous upload; another file with the same header, or the same
+    name in another user's workspace, never does.
+    """
+    key = [os.path.abspath(root), os.path.abspath(str(path)), [str(col) for col in columns]]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()[:16]
+
+
+def row_hashes(frame):
+    """One uint64 per row, independent of the index and of how rows are chunked."""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def digest(hashes):
+    return hashlib.sha256(np.ascontiguousarray(hashes, dtype="uint64").tobytes()).hexdigest()
+
+
+class Lineage:
+    """Pickled state files of one dataset lineage, shared by all tools.
+
+    Hold `lock` from loading a tool's state until saving it again, so that
+    concurrent runs on the same lineage cannot interleave.
+    """
+
+    def __init__(self, path, columns, directory=LINEAGE_DIR, root=None):
+        root = workspace.current().root if root is None else root
+        self.id = lineage_id(path, columns, root)
+        self.directory = os.path.join(directory, self.id)
+        self.lock = _locks[self.directory]
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def load(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        return state if state.get("format_version") == LINEAGE_FORMAT_VERSION else None
+
+    def save(self, name, state):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(dict(state, format_version=LINEAGE_FORMAT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(name))
+
+
+def lineage_of(path, directory=LINEAGE_DIR):
+    """Lineage of the dataset file at `path` in the current workspace."""
+    return Lineage(path, read_columns(path), directory)
+
+
+class ProfileUpdate:
+    """Result of `profile_dataset`: the merged profile and how much of it was reused."""
+
+    def __init__(self, lineage, profiler, blocks, reused_blocks, reused_rows):
+        self.lineage = lineage
+        self.profiler = profiler
+        self.blocks = blocks
+        self.reused_blocks = reused_blocks
+        self.reused_rows = reused_rows
+
+    @property
+    def new_rows(self):
+        return self.profiler.n_rows - self.reused_rows
+
+
+@phase("profile")
+def profile_dataset(path, block_rows=BLOCK_ROWS, directory=LINEAGE_DIR):
+    """Profile a dataset file, reusing the saved state of unchanged row blocks.
+
+    Rows are cut into blocks of `block_rows`, and each block's profile is
+    stored with a digest of its rows. On the next upload of the same table
+    a block whose digest still matches is merged from the saved state;
+    only new or edited blocks are read into a profiler. Appending rows
+    therefore costs a hash pass over the old rows plus profiling the delta.
+    """
+    lineage = lineage_of(path, directory)
+    with lineage.lock:
+        saved = lineage.load("profile")
+        saved_blocks = saved["blocks"] if saved and saved["block_rows"] == block_rows else []
+
+        blocks, reused_blocks, reused_rows = [], 0, 0
+        template = None
+        for i, chunk in enumerate(iter_frames(path, block_rows)):
+            with phase("hash", rows=len(chunk)):
+                hashes = row_hashes(chunk)
+                block_digest = digest(hashes)
+            # Saved blocks are only reusable if their schema matches the first block's
+            if (i < len(saved_blocks) and saved_blocks[i]["digest"] == block_digest
+                    and (template is None or saved_blocks[i]["profiler"].numeric_columns == template.numeric_columns)):
+                block = saved_blocks[i]
+                reused_blocks += 1
+                reused_rows += block["rows"]
+            else:
+                profiler = template.spawn() if template is not None else StreamingProfiler()
+                with phase("sketch", rows=len(chunk)):
+                    profiler.update(chunk, hashes)
+                block = {"digest": block_digest, "rows": len(chunk), "profiler": profiler}
+            template = template or block["profiler"]
+            blocks.append(block)
+
+        total = template.spawn() if template is not None else StreamingProfiler()
+        for block in blocks:
+            total.merge(block["profiler"])
+        if reused_blocks < len(blocks) or len(blocks) != len(saved_blocks):
+            lineage.save("profile", {"block_rows": block_rows, "blocks": blocks})
+    return ProfileUpdate(lineage, total, len(blocks), reused_blocks, reused_rows)
+
+
+def column_signature(profiler, col):
+    """Small per-column summary used to decide whether a column's distribution moved."""
+    present = profiler.n_rows - profiler.nulls[col]
+    signature = {
+        "dtype": profiler.dtypes[col],
+        "missing": profiler.nulls[col] / profiler.n_rows if profiler.n_rows else 0.0,
+    }
+    if col in profiler.moments:
+        moments, sketch = profiler.moments[col], profiler.quantiles[col]
+        signature["quantiles"] = [sketch.quantile(q) for q in SIGNATURE_QUANTILES]
+        # Outer quantile range: one sketch item of noise in the tails must not count as movement
+        signature["spread"] = max(signature["quantiles"][-1] - signature["quantiles"][0],
+                                  moments.std if moments.n > 1 else 0.0)
+    else:
+        signature["unique"] = profiler.distinct[col].count()
+        signature["shares"] = {str(value): count / present
+                               for value, count in profiler.top_values[col].most_common(dropna=True)} if present else {}
+    return signature
+
+
+def signatures(profiler):
+    return {str(col): column_signature(profiler, col) for col in profiler.columns}
+
+
+def drift(old, new):
+    """How far a column moved between two signatures (0 = identical, >= 1 = different kind)."""
+    if old["dtype"] != new["dtype"] or ("quantiles" in old) != ("quantiles" in new):
+        return 1.0
+    moved = abs(old["missing"] - new["missing"])
+    if "quantiles" in new:
+        spread = new["spread"] or old["spread"] or 1.0
+        shifts = [abs(a - b) / spread for a, b in zip(old["quantiles"], new["quantiles"])
+                  if not (np.isnan(a) and np.isnan(b))]
+        if any(np.isnan(shift) for shift in shifts):
+            return 1.0
+        return max([moved] + shifts)
+    values = old["shares"].keys() | new["shares"].keys()
+    total_variation = 0.5 * sum(abs(old["shares"].get(v, 0.0) - new["shares"].get(v, 0.0)) for v in values)
+    unique_change = abs(old["unique"] - new["unique"]) / max(old["unique"], new["unique"], 1)
+    return max(moved, total_variation, unique_change)
+
+
+def moved_columns(old, new, threshold=DRIFT_THRESHOLD):
+    """Columns of `new` that are missing from `old` or drifted past `threshold`."""
+    return [col for col in new if col not in old or drift(old[col], new[col]) >= threshold]
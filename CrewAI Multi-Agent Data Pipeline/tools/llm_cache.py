@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+from pydantic import PrivateAttr
+
+from tools.instrumentation import phase
+from tools.result_cache import ResultCache
+
+# LLM responses keyed by model, temperature, stop words and normalized
+# messages. Entries share the ResultCache format (and LRU eviction) in a
+# directory of their own, so they can be cleared without losing tool results.
+LLM_CACHE_DIR = os.environ.get("PIPELINE_LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_LLM_CACHE_MAX_BYTES", 256 << 20))
+# Bump when the key layout changes
+LLM_CACHE_VERSION = 1
+
+
+def normalize_messages(messages):
+    """Role and content of each message, with whitespace runs collapsed."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        normalized.append([message.get("role", "user"), " ".join(content.split())])
+    return normalized
+
+
+def response_key(model, temperature, messages, stop=(), response_model=None):
+    payload = json.dumps([LLM_CACHE_VERSION, model, temperature, list(stop), normalize_messages(messages),
+                          getattr(response_model, "__name__", None)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedLLM(BaseLLM):
+    """Response cache in front of another crewai LLM.
+
+    Identical requests (same model, temperature, stop words and messages
+    after whitespace normalization) are answered from a persistent cache,
+    and identical requests that arrive while one is in flight wait for
+    that call instead of sending their own.
+
+    Agents are switched to crewai's text (ReAct) tool protocol: tools are
+    then always run by crewai, never inside a cached LLM call, so a cache
+    hit cannot skip a tool and the files it writes.
+    """
+
+    llm_type: str = "cached"
+    inner: Any = None
+    cache_dir: str = LLM_CACHE_DIR
+    max_bytes: int = LLM_CACHE_MAX_BYTES
+
+    _cache: Any = PrivateAttr(default=None)
+    _inflight: dict = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def wrap(cls, inner, **kwargs):
+        return cls(model=inner.model, temperature=inner.temperature, inner=inner, **kwargs)
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = ResultCache(self.cache_dir, self.max_bytes)
+        return self._cache
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        with phase("llm", "llm", model=self.model) as span:
+            return self._call(span, messages, tools, callbacks, available_functions, from_task, from_agent,
+                              response_model)
+
+    def _call(self, span, messages, tools, callbacks, available_functions, from_task, from_agent, response_model):
+        stop = self.stop_sequences
+        key = response_key(self.model, self.temperature, messages, stop, response_model)
+        entry = self.cache.get(key)
+        if entry is not None:
+            span.add(cache="hit")
+            return entry["result"]
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            span.add(cache="shared")
+            return pending.result()
+
+        span.add(cache="miss", prompt_bytes=sum(len(content) for _, content in normalize_messages(messages)))
+
+        try:
+            # The executor sets its stop words on this wrapper; the inner LLM must see them too
+            with call_stop_override(self.inner, stop):
+                result = self.inner.call(messages, tools=tools, callbacks=callbacks,
+                                         available_functions=available_functions, from_task=from_task,
+                                         from_agent=from_agent, response_model=response_model)
+            if isinstance(result, str):
+                span.add(response_bytes=len(result))
+                self.cache.put(key, {"result": result, "artifacts": {}})
+            pending.set_result(result)
+            return result
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        return await asyncio.to_thread(self.call, messages, tools, callbacks, available_functions,
+                                       from_task, from_agent, response_model)
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        # Only requests that reached the inner LLM used tokens
+        return self.inner.get_token_usage_summary()
+
+
+class StubLLM(BaseLLM):
+    """Local stand-in for a hosted model, for offline and repeatable pipeline runs.
+
+    Speaks crewai's text tool protocol: the first call runs the agent's tool
+    on the dataset path (or the task text) from the prompt, the next one
+    returns the tool's output as the final answer. Every call takes
+    `latency` seconds, so timings are repeatable.
+    """
+
+    llm_type: str = "stub"
+    latency: float = 0.0
+    calls: int = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        time.sleep(self.latency)
+        self.calls += 1
+        text = "\n".join(str(message.get("content", "")) for message in messages)
+
+        # crewai appends each tool result to the assistant turn that asked for it
+        replies = [str(message.get("content", "")) for message in messages if message.get("role") == "assistant"]
+        if replies and "\nObservation:" in replies[-1]:
+            answer = replies[-1].rsplit("\nObservation:", 1)[1].strip()
+            return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+        tool = re.search(r"Tool Name: (.+)", text)
+        task = re.search(r"Current Task: (.+)", text)
+        task = task.group(1).strip() if task else text.strip()
+        if tool is None:
+            return f"Thought: I now know the final answer\nFinal Answer: {task}"
+        arguments = re.search(r"Tool Arguments: (\{.*?\n\})\nTool Description", text, re.S)
+        names = list(json.loads(arguments.group(1)).get("properties", {})) if arguments else []
+        path = re.search(r"path:\s*(\S+)", task)
+        value = path.group(1) if path and names and names[0].endswith("path") else task
+        action_input = json.dumps({names[0]: value} if names else {})
+        return f"Thought: I should use the tool\nAction: {tool.group(1).strip()}\nAction Input: {action_input}"
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        return await asyncio.to_thread(self.call, messages, tools, callbacks, available_functions,
+                                       from_task, from_agent, response_model)
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 1_000_000
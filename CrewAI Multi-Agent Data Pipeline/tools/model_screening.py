@@ -0,0 +1,277 @@
+import math
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import (ExtraTreesClassifier, HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.linear_model import LassoCV, LogisticRegression, RidgeCV
+from sklearn.model_selection import KFold, StratifiedKFold, cross_val_score
+
+from tools.compact_output import load_compact
+from tools.instrumentation import phase
+
+# Empirical model screening on the preprocessed table by successive halving:
+# every candidate is cross-validated on a small stratified sample, the best
+# 1/ETA go on to a sample ETA times larger, and so on until one is left, the
+# sample is the whole (capped) table, or the next round would overrun the
+# time budget. Candidates of a round are fitted side by side on a process pool.
+SCREENING_BUDGET_SECONDS = 60.0
+# Rows of the first round, and the most rows any round uses
+MIN_ROWS = 500
+MAX_ROWS = 100_000
+ETA = 3
+CV_FOLDS = 3
+SCORING = {"classification": "balanced_accuracy", "regression": "r2"}
+
+# Preprocessed inputs are already imputed, scaled and encoded; models are
+# built in the worker process from these factories (seed -> estimator)
+CANDIDATES = {
+    "classification": {
+        "Logistic Regression (L2)": lambda seed: LogisticRegression(max_iter=1000),
+        "Random Forest": lambda seed: RandomForestClassifier(n_estimators=100, n_jobs=1, random_state=seed),
+        "Extra Trees": lambda seed: ExtraTreesClassifier(n_estimators=100, n_jobs=1, random_state=seed),
+        "Gradient Boosting (histogram)": lambda seed: HistGradientBoostingClassifier(random_state=seed),
+    },
+    "regression": {
+        "Ridge": lambda seed: RidgeCV(alphas=np.logspace(-3, 3, 7)),
+        "Lasso": lambda seed: LassoCV(alphas=20, max_iter=5000, random_state=seed),
+        "Random Forest": lambda seed: RandomForestRegressor(n_estimators=100, n_jobs=1, random_state=seed),
+        "Gradient Boosting (histogram)": lambda seed: HistGradientBoostingRegressor(random_state=seed),
+    },
+}
+# Candidates that cannot fit a sparse matrix (the NPZ output's one-hot block
+# stays sparse for the others); they get a dense copy of each round's sample
+# if it stays within MAX_DENSE_BYTES, and fail that round otherwise
+DENSE_ONLY = {"Gradient Boosting (histogram)"}
+MAX_DENSE_BYTES = 512 << 20
+
+
+@dataclass
+class CandidateResult:
+    name: str
+    score: Optional[float] = None
+    std: Optional[float] = None
+    # Sample size of the last round the candidate took part in
+    rows: int = 0
+    rounds: int = 0
+    # Cross-validation time summed over its rounds
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class Screening:
+    task: str
+    metric: str
+    target: str
+    rows: int
+    features: int
+    budget: float
+    elapsed: float = 0.0
+    # Best first: candidates of the last round by score, then the ones eliminated earlier
+    results: List[CandidateResult] = field(default_factory=list)
+    stopped_by_budget: bool = False
+
+    @property
+    def best(self):
+        return next((result for result in self.results if result.error is None), None)
+
+
+# --- data ---------------------------------------------------------------------
+
+def load_processed(data_path, pipeline, target):
+    """`(X, y, feature names)` from SmartPreprocessingTool output, the target's encoded columns turned back into labels.
+
+    `pipeline` is the fitted PreprocessingPipeline that wrote `data_path`. A
+    one-hot encoded target becomes its category names and a scaled numeric
+    target gets its original values back; identifier columns are left out
+    of the features. The NPZ output is returned as a sparse CSR matrix.
+    """
+    target_columns = pipeline.output_columns_for(target)
+    if not target_columns:
+        raise ValueError(f"Target '{target}' is not in the preprocessed output")
+    dropped = set(target_columns) | set(pipeline.id_columns)
+    if data_path.endswith(".npz"):
+        dense, one_hot, one_hot_columns, _ = load_compact(data_path)
+        columns = list(dense.columns) + list(one_hot_columns)
+        matrix = sparse.hstack([sparse.csr_matrix(dense.to_numpy(dtype="float32")), one_hot.astype("float32")],
+                               format="csr")
+    else:
+        frame = pd.read_csv(data_path)
+        columns = list(frame.columns)
+        matrix = frame.to_numpy(dtype="float32")
+    index = {col: i for i, col in enumerate(columns)}
+    features = [col for col in columns if col not in dropped]
+    target_values = matrix[:, [index[col] for col in target_columns]]
+    if sparse.issparse(target_values):
+        target_values = target_values.toarray()
+    if len(target_columns) > 1:
+        categories = np.array([col[len(target) + 1:] for col in target_columns], dtype=object)
+        y = categories[target_values.argmax(axis=1)]
+    else:
+        y = target_values[:, 0].astype("float64")
+        if target in pipeline.numeric_columns:
+            i = pipeline.numeric_columns.index(target)
+            y = y * pipeline.scale[i] + pipeline.center[i]
+    return matrix[:, [index[col] for col in features]], y, features
+
+
+def stratified_order(y, classification, seed=0):
+    """Row order whose every prefix is a random sample with (close to) the class shares of `y`.
+
+    Successive rounds take longer prefixes of it, so each round's sample
+    contains the previous one.
+    """
+    rng = np.random.default_rng(seed)
+    if not classification:
+        return rng.permutation(len(y))
+    _, codes = np.unique(y, return_inverse=True)
+    key = np.empty(len(y))
+    for code in np.unique(codes):
+        members = rng.permutation(np.flatnonzero(codes == code))
+        key[members] = (np.arange(len(members)) + rng.random(len(members))) / len(members)
+    return np.argsort(key, kind="stable")
+
+
+# --- evaluation (worker side) ---------------------------------------------------
+
+_data = {}
+
+
+def _load(X, y):
+    _data["X"], _data["y"] = X, y
+
+
+def _evaluate(job):
+    """Cross-validate one candidate on the first `rows` rows; returns (mean, std, seconds) or an error string."""
+    task, name, rows, folds, seed = job
+    X, y = _data["X"][:rows], _data["y"][:rows]
+    if sparse.issparse(X) and name in DENSE_ONLY:
+        dense_bytes = X.shape[0] * X.shape[1] * X.dtype.itemsize
+        if dense_bytes > MAX_DENSE_BYTES:
+            return f"a dense copy of {rows} rows needs {dense_bytes / 2 ** 20:.0f} MB (limit {MAX_DENSE_BYTES / 2 ** 20:.0f} MB)"
+        X = X.toarray()
+    splitter = StratifiedKFold if task == "classification" else KFold
+    start = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            # Convergence and small-class warnings on the early, small rounds
+            warnings.simplefilter("ignore")
+            scores = cross_val_score(CANDIDATES[task][name](seed), X, y, scoring=SCORING[task],
+                                     cv=splitter(folds, shuffle=True, random_state=seed))
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return float(np.mean(scores)), float(np.std(scores)), time.perf_counter() - start
+
+
+# --- successive halving ------------------------------------------------------------
+
+@phase("screening")
+def screen_models(X, y, task, target="target", candidates=None, budget=SCREENING_BUDGET_SECONDS, min_rows=MIN_ROWS,
+                  max_rows=MAX_ROWS, eta=ETA, folds=CV_FOLDS, workers=None, seed=0):
+    """Rank candidate models on `(X, y)` within about `budget` seconds.
+
+    `task` is "classification" or "regression"; `candidates` names entries
+    of CANDIDATES[task] (all by default). `X` may be a dense array or a CSR
+    matrix. `workers=None` uses one process per CPU; `workers=1` evaluates
+    inline.
+    """
+    start = time.perf_counter()
+    classification = task == "classification"
+    names = list(candidates or CANDIDATES[task])
+    if classification:
+        # Class codes: labels may be strings or floats (a numeric target read back from the scaled output)
+        _, y = np.unique(y, return_inverse=True)
+        # Classes too rare to appear in every fold cannot be scored
+        keep = np.bincount(y)[y] >= folds
+        X, y = X[keep], y[keep]
+    order = stratified_order(y, classification, seed)[:max_rows]
+    X, y = X[order], y[order]
+    limit = len(y)
+    screening = Screening(task, SCORING[task], str(target), limit, X.shape[1], budget)
+    results = {name: CandidateResult(name) for name in names}
+    eliminated = []
+    if limit < folds * 2 or (classification and len(np.unique(y)) < 2):
+        for result in results.values():
+            result.error = "not enough rows or classes to cross-validate"
+        screening.results = list(results.values())
+        screening.elapsed = time.perf_counter() - start
+        return screening
+
+    # As many rounds as it takes to get down to one candidate, the last one on
+    # every row; the first round never goes below `min_rows`
+    rounds, remaining = 1, len(names)
+    while remaining > 1 and eta > 1:
+        remaining, rounds = math.ceil(remaining / eta), rounds + 1
+    rows = min(max(limit // eta ** (rounds - 1), min_rows, folds * 2), limit)
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(names)), initializer=_load, initargs=(X, y)) \
+        if workers > 1 and len(names) > 1 else None
+    if pool is None:
+        _load(X, y)
+    alive = names
+    try:
+        while True:
+            with phase("round", rows=rows, candidates=len(alive)):
+                jobs = [(task, name, rows, folds, seed) for name in alive]
+                outcomes = list(pool.map(_evaluate, jobs)) if pool else [_evaluate(job) for job in jobs]
+            seconds = {}
+            for name, outcome in zip(alive, outcomes):
+                result = results[name]
+                result.rows, result.rounds = rows, result.rounds + 1
+                if isinstance(outcome, str):
+                    result.error = outcome
+                else:
+                    result.score, result.std = outcome[:2]
+                    result.seconds += outcome[2]
+                    seconds[name] = outcome[2]
+            alive = sorted(alive, key=lambda name: _rank(results[name]))
+            if len(alive) <= 1 or rows >= limit or results[alive[0]].error is not None:
+                break
+            survivors = [name for name in alive[:math.ceil(len(alive) / eta)] if results[name].error is None]
+            # The last survivor is scored on every row
+            next_rows = limit if len(survivors) == 1 else min(rows * eta, limit)
+            # Fit time grows at least linearly with the rows; candidates run `workers` at a time
+            slowest = max(seconds[name] for name in survivors)
+            predicted = slowest * next_rows / rows * math.ceil(len(survivors) / workers)
+            if time.perf_counter() - start + predicted > budget:
+                screening.stopped_by_budget = True
+                break
+            eliminated = [name for name in alive if name not in survivors] + eliminated
+            alive, rows = survivors, next_rows
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    screening.results = [results[name] for name in alive + eliminated]
+    screening.elapsed = time.perf_counter() - start
+    return screening
+
+
+def _rank(result):
+    # Best score first, failed candidates last
+    return result.error is not None, -(result.score if result.score is not None else 0.0)
+
+
+def screening_report(screening):
+    """Ranked table of a screening, as report lines."""
+    lines = [f"🏁 Screened {len(screening.results)} models on `{screening.target}` ({screening.task}, "
+             f"{screening.metric}, {CV_FOLDS}-fold CV) in {screening.elapsed:.1f}s; "
+             f"up to {screening.rows} rows, {screening.features} features:"]
+    for rank, result in enumerate(screening.results, start=1):
+        if result.error is not None:
+            lines.append(f"{rank}. {result.name}: failed ({result.error})")
+            continue
+        lines.append(f"{rank}. **{result.name}**: {result.score:.3f} ± {result.std:.3f} on {result.rows} rows "
+                     f"({result.rounds} round{'s' if result.rounds > 1 else ''}, {result.seconds:.1f}s)")
+    if screening.stopped_by_budget:
+        lines.append(f"⏱️ Stopped early to stay within the {screening.budget:.0f}s budget.")
+    return lines
@@ -1,28 +1,37 @@
-from crewai.tools import BaseTool
 import os
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import RobustScaler, OrdinalEncoder, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.impute import SimpleImputer
-from crewai import Agent, Task, Crew, LLM
+from typing import Optional
+
 from crewai.tools import BaseTool
 
-import seaborn as sns
-import matplotlib.pyplot as plt
+from tools.insights import DASHBOARD_INSIGHTS_PATH, EDA_INSIGHTS_PATH, load_insights, merge_records
+from tools.instrumentation import phase
+from tools.model_screening import SCREENING_BUDGET_SECONDS, load_processed, screen_models, screening_report
+from tools.preprocessing_pipeline import PreprocessingPipeline
+from tools.result_cache import cached_tool_run
+from tools.search_client import default_client  # SerpAPI (SERPAPI_API_KEY), to search Kaggle and GitHub
+from tools.workspace import output_path
 
-from typing import Optional 
-# Assuming 'llm' is defined elsewhere as in the original notebook
-import os
-os.environ["SERPAPI_API_KEY"] = "5b052e700fa2d7a59b59bad4c7aa713589708babaa9c56cfeb94a7695feeae43"
+# Bump whenever the recommendation logic changes so stale cache entries are not reused
+CACHE_VERSION = 4
 
+# Share of a column's values that must be outliers before it counts
+OUTLIER_SHARE = 0.01
+HIGH_CARDINALITY = 50
+MAX_LISTED = 5
+# Written by SmartPreprocessingTool; the screening fits models on it
+PROCESSED_DATA_PATHS = [os.path.join("processed_output", f"processed_data.{ext}") for ext in ("csv", "npz")]
+PIPELINE_PATH = os.path.join("processed_output", "preprocessing_pipeline.json")
+
+
+def _names(columns):
+    listed = ", ".join(f"`{col}`" for col in columns[:MAX_LISTED])
+    return listed + (f" and {len(columns) - MAX_LISTED} more" if len(columns) > MAX_LISTED else "")
 
-from crewai.tools import BaseTool
-from typing import Optional
-from crewai import tools
 
-from serpapi import GoogleSearch  # you can use SerpAPI to search Kaggle and GitHub
+def _processed_data():
+    """The most recently written processed table in the workspace, if any."""
+    paths = [output_path(path) for path in PROCESSED_DATA_PATHS if os.path.exists(output_path(path))]
+    return max(paths, key=os.path.getmtime) if paths else None
 
 class KaggleGithubModelSearchTool(BaseTool):
     name: str = "Kaggle & GitHub Model Search Tool"
@@ -32,24 +41,23 @@ class KaggleGithubModelSearchTool(BaseTool):
         if not tool_input:
             return "No dataset keywords provided for search."
 
-        results = []
-
         # Use Google Search API or SerpAPI to simulate Kaggle/GitHub search
         queries = [
             f"site:kaggle.com {tool_input} best machine learning models",
             f"site:github.com {tool_input} ML models used",
         ]
-        for query in queries:
-            search = GoogleSearch({
-                "q": query,
-                "api_key": os.getenv("SERPAPI_API_KEY"),
-                "num": 5
-            })
-            result = search.get_dict()
-            links = [r['link'] for r in result.get('organic_results', [])]
-            results.extend(links)
+        results, failures = [], []
+        for query, result in zip(queries, default_client().search_many(queries, num=5)):
+            if isinstance(result, Exception):
+                failures.append(f"{query!r}: {result}")
+                continue
+            for r in result.get('organic_results', []):
+                if r.get('link') and r['link'] not in results:
+                    results.append(r['link'])
 
         if not results:
+            if failures:
+                return "Kaggle/GitHub search failed:\n" + "\n".join(failures)
             return "No useful Kaggle or GitHub results found."
 
         formatted = "\n".join(results[:5])
@@ -59,39 +67,100 @@ class KaggleGithubModelSearchTool(BaseTool):
 class ModelSuggestionTool(BaseTool):
     name: str = "Model Suggestion Tool"
     description: str = "Suggests the best ML models based on EDA, visual insights, and external sources (Kaggle/GitHub)."
+    use_cache: bool = True
+    # Cross-validate candidate models on the preprocessed data, within
+    # screening_budget seconds; None workers uses one process per CPU
+    screen_models: bool = True
+    screening_budget: float = SCREENING_BUDGET_SECONDS
+    screening_workers: Optional[int] = None
 
     def _run(self, tool_input: Optional[str] = None) -> str:
-        with open("eda_report.txt", "r", encoding="utf-8") as f1, open("dashboard_output/visual_insights.txt", "r", encoding="utf-8") as f2:
-            eda = f1.read()
-            vis = f2.read()
+        # Only the local rules and the screening go through the result cache; the web
+        # search has its own TTL cache, so a failed search is not stored with the report
+        sources = [output_path(EDA_INSIGHTS_PATH), output_path(DASHBOARD_INSIGHTS_PATH)]
+        params = {"screen_models": self.screen_models, "screening_budget": self.screening_budget}
+        if self.screen_models:
+            sources += [output_path(path) for path in PROCESSED_DATA_PATHS + [PIPELINE_PATH]]
+        suggestions = cached_tool_run(self, CACHE_VERSION, sources, params, lambda: (self._report(), []))
 
-        # Combine EDA + Visuals
-        insights = eda + "\n\n" + vis
+        # Optional: Search Kaggle/GitHub
+        search_tool = KaggleGithubModelSearchTool()
+        with phase("search"):
+            external_findings = search_tool._run(tool_input)
+
+        return suggestions + "\n\n🌐 **External Suggestions from Kaggle/GitHub:**\n" + external_findings
+
+    def _report(self) -> str:
+        # Typed records published by the EDA and dashboard tools
+        record = merge_records(load_insights(output_path(EDA_INSIGHTS_PATH)),
+                               load_insights(output_path(DASHBOARD_INSIGHTS_PATH)))
+        report = self._suggest(record)
+        if self.screen_models and record is not None and record.target is not None:
+            report += "\n\n" + self._screen(record)
+        return report
+
+    @phase("rules")
+    def _suggest(self, record) -> str:
         suggestions = ["🤖 **MODEL RECOMMENDATION REPORT** 🤖\n"]
+        if record is None:
+            suggestions.append("⚠️ No EDA or dashboard insights found; run the EDA and Dashboard agents first.")
+            suggestions.append("🔍 Not enough patterns detected. Start with **Random Forest** and **XGBoost**.")
+            return "\n".join(suggestions)
 
         # Rule-based logic
-        if "Outliers detected" in vis or "RobustScaler" in eda:
-            suggestions.append("📌 Outliers detected. Recommended models: **Random Forest**, **XGBoost**.")
-
-        if "Highly skewed" in vis or "Skewness" in vis:
-            suggestions.append("📈 Skewed data. Suggested: **Gradient Boosting**, or transform + **Logistic Regression**.")
-
-        if "🔗 Correlation Matrix" in eda and "1.00" in eda:
-            suggestions.append("🔗 High multicollinearity. Use regularized models like **Lasso/Ridge**.")
-
-        if "Target" in eda and "object" in eda:
-            suggestions.append("🧠 Categorical target. Classification models like **XGBoost**, **Random Forest**, **Logistic Regression** recommended.")
-        elif "Target" in eda:
-            suggestions.append("📈 Numerical target. Regression models like **Linear Regression**, **XGBoost Regressor**.")
+        outliers = [col.name for col in record.numeric()
+                    if col.outliers and col.count and col.outliers / col.count >= OUTLIER_SHARE]
+        if outliers:
+            suggestions.append(f"📌 Outliers detected in {_names(outliers)}. Recommended models: **Random Forest**, **XGBoost**.")
+
+        skewed = [col.name for col in record.numeric() if col.skewness is not None and abs(col.skewness) > 1]
+        if skewed:
+            suggestions.append(f"📈 Skewed data in {_names(skewed)}. Suggested: **Gradient Boosting**, or transform + **Logistic Regression**.")
+
+        if record.correlations:
+            pairs = ", ".join(f"{a}/{b} ({r:+.2f})" for a, b, r in record.correlations[:MAX_LISTED])
+            suggestions.append(f"🔗 High multicollinearity: {pairs}. Use regularized models like **Lasso/Ridge**.")
+
+        high_cardinality = [col.name for col in record.categorical()
+                            if col.name != record.target and col.unique > HIGH_CARDINALITY]
+        if high_cardinality:
+            suggestions.append(f"🏷️ High-cardinality categoricals: {_names(high_cardinality)}. "
+                               "Prefer **CatBoost** or target encoding over one-hot.")
+
+        if record.target is not None:
+            target = record.columns[record.target]
+            guessed = " (assumed: last column)" if record.target_from == "last column" else ""
+            if record.target_type == "classification":
+                suggestions.append(f"🧠 Categorical target `{target.name}`{guessed}, {target.unique} classes. "
+                                   "Classification models like **XGBoost**, **Random Forest**, **Logistic Regression** recommended.")
+            else:
+                suggestions.append(f"📈 Numerical target `{target.name}`{guessed}. "
+                                   "Regression models like **Linear Regression**, **XGBoost Regressor**.")
 
         if len(suggestions) == 1:
             suggestions.append("🔍 Not enough patterns detected. Start with **Random Forest** and **XGBoost**.")
 
-        # Optional: Search Kaggle/GitHub
-        
-        search_tool = KaggleGithubModelSearchTool()
-        external_findings = search_tool._run(tool_input)
-
-        suggestions.append("\n🌐 **External Suggestions from Kaggle/GitHub:**\n" + external_findings)
-
         return "\n".join(suggestions)
+
+    def _screen(self, record) -> str:
+        """Empirical ranking of candidate models on the preprocessed data for `record`'s target."""
+        data_path, pipeline_path = _processed_data(), output_path(PIPELINE_PATH)
+        if data_path is None or not os.path.exists(pipeline_path):
+            return "⚠️ No preprocessed data found; run the Preprocessing agent first to screen models empirically."
+        pipeline = PreprocessingPipeline.load(pipeline_path)
+        if pipeline.fitted_on != os.path.basename(str(record.source)):
+            return (f"⚠️ The preprocessed data comes from {pipeline.fitted_on}, not {record.source}; "
+                    "run the Preprocessing agent on this dataset to screen models empirically.")
+        try:
+            X, y, _ = load_processed(data_path, pipeline, record.target)
+        except ValueError as exc:
+            return f"⚠️ Model screening skipped: {exc}"
+        # A one-hot encoded target is categorical whatever the insights guessed
+        task = "classification" if record.target_type == "classification" or y.dtype == object else "regression"
+        screening = screen_models(X, y, task, target=record.target, budget=self.screening_budget,
+                                  workers=self.screening_workers)
+        lines = screening_report(screening)
+        if screening.best is not None:
+            lines.append(f"🏆 Best on this data: **{screening.best.name}**; "
+                         "tune it (and the runner-up) before committing to one model.")
+        return "\n".join(lines)
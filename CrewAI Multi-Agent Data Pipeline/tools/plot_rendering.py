@@ -0,0 +1,121 @@
+import io
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+# Everything here uses the object-oriented Figure API (Agg canvas) rather than
+# the global pyplot state machine, so plots can be drawn in worker processes.
+FIGSIZE = (8, 5)
+DPI = 100
+IMAGE_SIZE = (int(FIGSIZE[0] * DPI), int(FIGSIZE[1] * DPI))
+# savefig options per image format; lossless WebP (through Pillow) is about a
+# third of the PNG size for these plots and keeps text and lines sharp
+IMAGE_FORMATS = {
+    "png": {},
+    "webp": {"pil_kwargs": {"lossless": True}},
+}
+
+
+def _encode(fig, image_format="png"):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format, dpi=DPI, **IMAGE_FORMATS[image_format])
+    return buffer.getvalue()
+
+
+def render_numeric_plots(column, data, image_format="png"):
+    """Histogram and box plot image bytes for one numeric column."""
+    hist = Figure(figsize=FIGSIZE)
+    ax = hist.subplots()
+    sns.histplot(data, kde=True, ax=ax)
+    ax.set_title(f"Distribution of {column}")
+
+    box = Figure(figsize=FIGSIZE)
+    ax = box.subplots()
+    sns.boxplot(x=data, ax=ax)
+    ax.set_title(f"Box Plot of {column}")
+    return {"hist": _encode(hist, image_format), "box": _encode(box, image_format)}
+
+
+def render_count_plot(column, data, image_format="png"):
+    """Count plot image bytes for one low-cardinality categorical column."""
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+    sns.countplot(x=data, ax=ax)
+    ax.set_title(f"Count Plot of {column}")
+    ax.tick_params(axis="x", labelrotation=45)
+    return {"count": _encode(fig, image_format)}
+
+
+def render_numeric_summary(column, summary, image_format="png"):
+    """`render_numeric_plots` drawn from a `NumericSummary` instead of raw rows.
+
+    The histogram is seaborn's, fed the pre-binned counts as weights on the
+    bin centres, so the bars are identical and the KDE runs over the bins.
+    The box is seaborn's, drawn from a five-point stand-in with the same
+    quartiles and whiskers; the sampled fliers are added on top.
+    """
+    centers = (summary.edges[:-1] + summary.edges[1:]) / 2
+    # Zero-weight end points keep the KDE support on the true data range
+    values = pd.Series(np.r_[summary.min, centers, summary.max], name=column)
+    weights = np.r_[0, summary.counts, 0]
+    hist = Figure(figsize=FIGSIZE)
+    ax = hist.subplots()
+    # Scott's factor for the real row count, not for the number of bins
+    sns.histplot(x=values, weights=weights, bins=list(summary.edges), kde=True,
+                 kde_kws={"bw_method": max(summary.n, 1) ** (-1 / 5)}, ax=ax)
+    ax.set_title(f"Distribution of {column}")
+
+    stats = summary.box_stats()
+    box = Figure(figsize=FIGSIZE)
+    ax = box.subplots()
+    sns.boxplot(x=pd.Series([stats["whislo"], stats["q1"], stats["med"], stats["q3"], stats["whishi"]], name=column), ax=ax)
+    if len(stats["fliers"]):
+        # scaley=False keeps seaborn's categorical y limits
+        ax.plot(stats["fliers"], np.zeros(len(stats["fliers"])), linestyle="none", scaley=False,
+                marker=matplotlib.rcParams["boxplot.flierprops.marker"], markersize=5,
+                markerfacecolor="none", markeredgecolor=ax.patches[0].get_edgecolor())
+    ax.set_title(f"Box Plot of {column}")
+    return {"hist": _encode(hist, image_format), "box": _encode(box, image_format)}
+
+
+def render_count_summary(column, summary, image_format="png"):
+    """`render_count_plot` drawn from a `CategorySummary`."""
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+    sns.barplot(x=pd.Series(list(summary.counts), name=column, dtype=object),
+                y=pd.Series(list(summary.counts.values()), name="count"), ax=ax)
+    ax.set_title(f"Count Plot of {column}")
+    ax.tick_params(axis="x", labelrotation=45)
+    return {"count": _encode(fig, image_format)}
+
+
+RENDERERS = {
+    "numeric": render_numeric_plots,
+    "count": render_count_plot,
+    "numeric_binned": render_numeric_summary,
+    "count_binned": render_count_summary,
+}
+
+
+def _render(job, image_format="png"):
+    kind, column, data = job
+    return RENDERERS[kind](column, data, image_format)
+
+
+def render_plots(jobs, workers=None, image_format="png"):
+    """Render `(kind, column, data)` jobs, in order, on a process pool, as `image_format` bytes.
+
+    `data` is the raw column for "numeric"/"count" jobs and a summary from
+    `tools.plot_summaries` for the "_binned" kinds.
+
+    `workers=None` uses one process per CPU; `workers=1` renders inline.
+    """
+    if workers == 1 or len(jobs) <= 1:
+        return [_render(job, image_format) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, jobs, itertools.repeat(image_format)))
@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from tools.ingestion import iter_frames
+from tools.instrumentation import phase
+
+# Pre-aggregated plot inputs for large datasets: each summary is filled in one
+# streaming pass and has a size bounded by its bins, never by the row count.
+MAX_BINS = 1000
+FLIER_SAMPLE = 2000
+
+
+def auto_bin_edges(n, low, high, q1, q3):
+    """Edges numpy's `bins="auto"` would pick for `n` values in [low, high] with this IQR.
+
+    Same rule as `np.histogram_bin_edges(x, "auto")` (relaxed Freedman-Diaconis
+    vs. Sturges), computed from summary statistics and capped at MAX_BINS.
+    """
+    if not n or not math.isfinite(low) or not math.isfinite(high):
+        return np.array([0.0, 1.0])
+    if low == high:
+        return np.array([low - 0.5, high + 0.5])
+    span = high - low
+    fd = 2.0 * (q3 - q1) * n ** (-1.0 / 3.0)
+    sturges = span / (math.log2(n) + 1.0)
+    width = min(max(fd, span / math.sqrt(n) / 2), sturges)
+    bins = int(math.ceil(span / width)) if width > 0 else 1
+    return np.linspace(low, high, min(max(bins, 1), MAX_BINS) + 1)
+
+
+class NumericSummary:
+    """Histogram counts, box-plot statistics and outlier count for one numeric column.
+
+    Quartiles, bounds and moments come from the streaming profile; the pass
+    over the data only fills the histogram, finds the whisker ends and keeps
+    a bounded random sample of the box-plot fliers.
+    """
+
+    def __init__(self, profiler, column, seed=0):
+        moments, sketch = profiler.moments[column], profiler.quantiles[column]
+        self.column = column
+        self.n = moments.n
+        self.min, self.max = moments.min, moments.max
+        self.mean, self.std, self.skewness = moments.mean, moments.std, moments.skewness
+        self.q1, self.median, self.q3 = (sketch.quantile(q) for q in (0.25, 0.5, 0.75))
+        self.edges = auto_bin_edges(self.n, self.min, self.max, self.q1, self.q3)
+        self.counts = np.zeros(len(self.edges) - 1, dtype="int64")
+        # matplotlib's whisker rule (1.5 IQR) for the box plot
+        iqr = self.q3 - self.q1
+        self.fence_low, self.fence_high = self.q1 - 1.5 * iqr, self.q3 + 1.5 * iqr
+        self.whisker_low, self.whisker_high = math.inf, -math.inf
+        self.fliers = np.empty(0)
+        self._flier_keys = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+        # The dashboard's own outlier rule (quartile +/- 1.5 std)
+        std = self.std if self.n > 1 else 0.0
+        self.outlier_low, self.outlier_high = self.q1 - 1.5 * std, self.q3 + 1.5 * std
+        self.outliers = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.counts += np.histogram(values, self.edges)[0]
+        inside = values[(values >= self.fence_low) & (values <= self.fence_high)]
+        if inside.size:
+            self.whisker_low = min(self.whisker_low, float(inside.min()))
+            self.whisker_high = max(self.whisker_high, float(inside.max()))
+        fliers = values[(values < self.fence_low) | (values > self.fence_high)]
+        if fliers.size:
+            # Bottom-k random keys = uniform sample; the extremes are always kept
+            keys = self._rng.random(fliers.size)
+            keys[[fliers.argmin(), fliers.argmax()]] = -1.0
+            merged, merged_keys = np.concatenate([self.fliers, fliers]), np.concatenate([self._flier_keys, keys])
+            keep = np.argsort(merged_keys, kind="stable")[:FLIER_SAMPLE]
+            self.fliers, self._flier_keys = merged[keep], merged_keys[keep]
+        self.outliers += int(((values < self.outlier_low) | (values > self.outlier_high)).sum())
+
+    def box_stats(self):
+        """Box-plot statistics in the form `Axes.bxp` takes."""
+        return {
+            "med": self.median, "q1": self.q1, "q3": self.q3,
+            "whislo": self.whisker_low if math.isfinite(self.whisker_low) else self.q1,
+            "whishi": self.whisker_high if math.isfinite(self.whisker_high) else self.q3,
+            "fliers": np.sort(self.fliers),
+        }
+
+
+class CategorySummary:
+    """Value counts of one categorical column, in order of first appearance."""
+
+    def __init__(self, column):
+        self.column = column
+        self.counts = {}
+        self.missing = 0
+
+    def update(self, series):
+        self.missing += int(series.isna().sum())
+        for value, count in series.value_counts(sort=False).items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+
+    def top_shares(self, n=3):
+        total = sum(self.counts.values())
+        top = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return pd.Series({value: count / total for value, count in top}, dtype="float64")
+
+
+@phase("bin")
+def summarize_columns(path, profiler, numeric_columns, categorical_columns, chunksize=100_000):
+    """One streaming pass over the given columns; returns `{column: summary}`."""
+    summaries = {col: NumericSummary(profiler, col, seed=i) for i, col in enumerate(numeric_columns)}
+    summaries.update({col: CategorySummary(col) for col in categorical_columns})
+    if not summaries:
+        return summaries
+    for chunk in iter_frames(path, chunksize, columns=list(summaries)):
+        for col, summary in summaries.items():
+            if isinstance(summary, NumericSummary):
+                summary.update(pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype="float64"))
+            else:
+                summary.update(chunk[col])
+    return summaries
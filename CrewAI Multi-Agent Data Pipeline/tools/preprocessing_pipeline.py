@@ -0,0 +1,279 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import RobustScaler, OrdinalEncoder, OneHotEncoder
+
+from tools.compact_output import CompactWriter
+from tools.ingestion import iter_frames
+from tools.instrumentation import phase
+
+# Version of the saved artifact layout; bump on incompatible changes
+PIPELINE_FORMAT_VERSION = 1
+
+ORDINAL_MAPPING = {
+    'CALC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    'CAEC': ['no', 'Sometimes', 'Frequently', 'Always']
+}
+
+
+def _plain(values):
+    """JSON-friendly list: numpy scalars unwrapped, NaN stored as None."""
+    return [None if pd.isna(value) else (value.item() if hasattr(value, "item") else value) for value in values]
+
+
+class PreprocessingPipeline:
+    """Fitted state of the smart preprocessing steps.
+
+    Holds everything needed to replay the transform on new data: imputation
+    values, RobustScaler center/scale, category vocabularies and the output
+    column layout. It is saved as a versioned JSON artifact and applied
+    without refitting, chunk by chunk if needed.
+    """
+
+    def __init__(self, numeric_columns, categorical_columns, fill_values, center, scale,
+                 ordinal_columns, ordinal_categories, nominal_columns, nominal_categories,
+                 passthrough_columns, output_columns, id_columns=(), fitted_on=None, created=None):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.fill_values = dict(fill_values)
+        self.center = list(center)
+        self.scale = list(scale)
+        self.ordinal_columns = list(ordinal_columns)
+        self.ordinal_categories = {col: list(cats) for col, cats in ordinal_categories.items()}
+        self.nominal_columns = list(nominal_columns)
+        self.nominal_categories = {col: list(cats) for col, cats in nominal_categories.items()}
+        self.passthrough_columns = list(passthrough_columns)
+        self.output_columns = list(output_columns)
+        self.id_columns = list(id_columns)
+        self.fitted_on = fitted_on
+        self.created = created or datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    @classmethod
+    @phase("fit")
+    def fit(cls, df, fitted_on=None):
+        """Learn the preprocessing state from a (deduplicated) DataFrame."""
+        df = df.copy()
+        num_cols = list(df.select_dtypes(include=['float64', 'int64']).columns)
+        cat_cols = list(df.select_dtypes(include='object').columns)
+        # Integer identifier columns ("id", "*_id"); the compact output keeps them as integers
+        id_cols = [col for col in df.select_dtypes(include='int64').columns
+                   if str(col).lower() == "id" or str(col).lower().endswith("_id")]
+
+        fill_values = {col: df[col].median() for col in num_cols}
+        fill_values.update({col: df[col].mode()[0] for col in cat_cols})
+        for col, value in fill_values.items():
+            df[col] = df[col].fillna(value)
+
+        center, scale = [], []
+        if num_cols:
+            scaler = RobustScaler().fit(df[num_cols])
+            center, scale = scaler.center_.tolist(), scaler.scale_.tolist()
+
+        ordinal_cols = [col for col in ORDINAL_MAPPING if col in df.columns]
+        for col in ordinal_cols:
+            df[col] = pd.Categorical(df[col], categories=ORDINAL_MAPPING[col], ordered=True)
+        # Sorted for a stable layout; set order used to change between runs
+        nominal_cols = sorted(set(cat_cols) - set(ordinal_cols))
+
+        transformers = []
+        if ordinal_cols:
+            transformers.append(('ord', OrdinalEncoder(), ordinal_cols))
+        if nominal_cols:
+            transformers.append(('nom', OneHotEncoder(sparse_output=False, handle_unknown='ignore'), nominal_cols))
+
+        ordinal_categories, nominal_categories = {}, {}
+        output_columns = list(df.columns)
+        passthrough = [col for col in df.columns if col not in ordinal_cols + nominal_cols]
+        if transformers:
+            preprocessor = ColumnTransformer(transformers, remainder='passthrough').fit(df)
+            output_columns = list(ordinal_cols)
+            if ordinal_cols:
+                ordinal = preprocessor.named_transformers_['ord']
+                ordinal_categories = {col: _plain(cats) for col, cats in zip(ordinal_cols, ordinal.categories_)}
+            if nominal_cols:
+                ohe = preprocessor.named_transformers_['nom']
+                nominal_categories = {col: _plain(cats) for col, cats in zip(nominal_cols, ohe.categories_)}
+                output_columns.extend(ohe.get_feature_names_out(nominal_cols))
+            output_columns.extend(passthrough)
+
+        return cls(num_cols, cat_cols, {col: _plain([value])[0] for col, value in fill_values.items()},
+                   center, scale, ordinal_cols, ordinal_categories, nominal_cols, nominal_categories,
+                   passthrough, output_columns, id_columns=id_cols, fitted_on=fitted_on)
+
+    @phase("transform")
+    def transform(self, df):
+        """Apply the fitted preprocessing to a DataFrame (no refitting).
+
+        Fitted columns that are absent from `df` (typically the target when
+        scoring a test file) are skipped together with their output columns.
+        """
+        df = df.copy()
+        for col, value in self.fill_values.items():
+            if col in df.columns and value is not None:
+                df[col] = df[col].fillna(value)
+
+        numeric = [col for col in self.numeric_columns if col in df.columns]
+        if numeric:
+            positions = [self.numeric_columns.index(col) for col in numeric]
+            center, scale = np.asarray(self.center)[positions], np.asarray(self.scale)[positions]
+            df[numeric] = (df[numeric].to_numpy(dtype="float64") - center) / scale
+
+        if not (self.ordinal_columns or self.nominal_columns):
+            return df
+
+        blocks = []
+        for col in self.ordinal_columns:
+            if col in df.columns:
+                blocks.append(self._ordinal_codes(df[col], col).rename(col))
+        for col in self.nominal_columns:
+            if col in df.columns:
+                blocks.append(self._one_hot(df[col], col))
+        blocks.append(df[[col for col in self.passthrough_columns if col in df.columns]])
+        return pd.concat(blocks, axis=1).reset_index(drop=True)
+
+    def _ordinal_codes(self, series, col):
+        # Values outside the ordinal mapping are treated as missing, and so are
+        # categories never seen during fit
+        values = pd.Series(pd.Categorical(series, categories=ORDINAL_MAPPING[col], ordered=True), index=series.index)
+        lookup = {cat: float(code) for code, cat in enumerate(self.ordinal_categories[col]) if cat is not None}
+        return values.astype(object).map(lookup).astype("float64")
+
+    def _one_hot_codes(self, series, col):
+        # Column position of each value inside this column's one-hot block,
+        # -1 for categories never seen during fit
+        categories = self.nominal_categories[col]
+        known = [cat for cat in categories if cat is not None]
+        positions = np.array([categories.index(cat) for cat in known] + [-1], dtype="int64")
+        codes = positions[pd.Categorical(series, categories=known).codes]
+        if None in categories:
+            codes[series.isna().to_numpy()] = categories.index(None)
+        return codes
+
+    def output_columns_for(self, col):
+        """Output columns that input column `col` becomes: its one-hot block, or the column itself."""
+        if col in self.nominal_columns:
+            return self._one_hot_names(col)
+        return [col] if col in self.output_columns else []
+
+    def _one_hot_names(self, col):
+        return [f"{col}_{'nan' if cat is None else cat}" for cat in self.nominal_categories[col]]
+
+    def _one_hot(self, series, col):
+        codes = self._one_hot_codes(series, col)
+        hit = codes >= 0
+        block = np.zeros((len(series), len(self.nominal_categories[col])))
+        block[np.flatnonzero(hit), codes[hit]] = 1.0
+        return pd.DataFrame(block, index=series.index, columns=self._one_hot_names(col))
+
+    @phase("transform")
+    def transform_compact(self, df):
+        """Memory-lean variant of `transform`.
+
+        Returns `(dense, one_hot, one_hot_columns)`: a DataFrame with ordinal
+        codes as int8/int16 (-1 = missing or unseen), scaled values as
+        float32, identifier columns as the narrowest integer type and other
+        passthrough columns untouched, plus the one-hot block as a uint8 CSR
+        matrix with its column names.
+        """
+        df = df.copy()
+        for col, value in self.fill_values.items():
+            if col in df.columns and value is not None:
+                df[col] = df[col].fillna(value)
+
+        dense = {}
+        for col in self.ordinal_columns:
+            if col in df.columns:
+                dtype = "int8" if len(self.ordinal_categories[col]) < 127 else "int16"
+                dense[col] = self._ordinal_codes(df[col], col).fillna(-1).astype(dtype).to_numpy()
+        for col in (self.passthrough_columns if self.ordinal_columns or self.nominal_columns else self.output_columns):
+            if col not in df.columns:
+                continue
+            if col in self.id_columns:
+                dense[col] = pd.to_numeric(df[col], downcast="integer").to_numpy()
+            elif col in self.numeric_columns:
+                i = self.numeric_columns.index(col)
+                values = (df[col].to_numpy(dtype="float64") - self.center[i]) / self.scale[i]
+                dense[col] = values.astype("float32")
+            else:
+                dense[col] = df[col].to_numpy()
+        dense = pd.DataFrame(dense)
+
+        rows, cols, names = [], [], []
+        for col in self.nominal_columns:
+            if col not in df.columns:
+                continue
+            codes = self._one_hot_codes(df[col], col)
+            hit = codes >= 0
+            rows.append(np.flatnonzero(hit))
+            cols.append(codes[hit] + len(names))
+            names.extend(self._one_hot_names(col))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype="int64")
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype="int64")
+        one_hot = sparse.csr_matrix((np.ones(len(rows), dtype="uint8"), (rows, cols)), shape=(len(df), len(names)))
+        return dense, one_hot, names
+
+    def transform_csv(self, csv_path, output_path, chunksize=100_000):
+        """Stream a dataset through the fitted transform into a CSV; returns the row count."""
+        rows = 0
+        for i, chunk in enumerate(iter_frames(csv_path, chunksize)):
+            self.transform(chunk).to_csv(output_path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+            rows += len(chunk)
+        return rows
+
+    def transform_csv_compact(self, csv_path, npz_path, chunksize=100_000):
+        """Stream a dataset through `transform_compact` into an NPZ file; returns the row count.
+
+        Each chunk is spilled to disk as soon as it is transformed, so memory
+        stays bounded by `chunksize` rows whatever the size of the dataset.
+        """
+        names = []
+        with CompactWriter(npz_path) as writer:
+            for chunk in iter_frames(csv_path, chunksize):
+                chunk_dense, chunk_one_hot, names = self.transform_compact(chunk)
+                writer.append(chunk_dense, chunk_one_hot)
+            writer.close(names, self.output_columns)
+        return writer.rows
+
+    def to_dict(self):
+        return {
+            "format_version": PIPELINE_FORMAT_VERSION,
+            "created": self.created,
+            "fitted_on": self.fitted_on,
+            "numeric_columns": self.numeric_columns,
+            "categorical_columns": self.categorical_columns,
+            "fill_values": self.fill_values,
+            "scaler": {"center": self.center, "scale": self.scale},
+            "ordinal_columns": self.ordinal_columns,
+            "ordinal_categories": self.ordinal_categories,
+            "nominal_columns": self.nominal_columns,
+            "nominal_categories": self.nominal_categories,
+            "passthrough_columns": self.passthrough_columns,
+            "output_columns": self.output_columns,
+            "id_columns": self.id_columns,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get("format_version") != PIPELINE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported preprocessing pipeline version: {state.get('format_version')}")
+        return cls(state["numeric_columns"], state["categorical_columns"], state["fill_values"],
+                   state["scaler"]["center"], state["scaler"]["scale"], state["ordinal_columns"],
+                   state["ordinal_categories"], state["nominal_columns"], state["nominal_categories"],
+                   state["passthrough_columns"], state["output_columns"],
+                   id_columns=state.get("id_columns", []), fitted_on=state.get("fitted_on"), created=state.get("created"))
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,516 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+from tools.correlation import MAX_SAMPLE_ROWS, sample_rows
+from tools.instrumentation import phase
+
+# Pearson co-moments are accumulated over every row up to this many numeric
+# columns (four p x p float64 matrices); wider tables take their Pearson
+# pairs from the row sample like the other association measures
+MAX_COMOMENT_COLUMNS = 256
+
+
+class RunningMoments:
+    """Count, mean, variance, skewness, min and max merged chunk by chunk (Welford/Chan/Pébay)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        if values.size == 0:
+            return
+        chunk = RunningMoments()
+        chunk.n = int(values.size)
+        chunk.mean = float(values.mean())
+        centered = values - chunk.mean
+        chunk.m2 = float((centered ** 2).sum())
+        chunk.m3 = float((centered ** 3).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m3 += (other.m3 + delta ** 3 * self.n * other.n * (self.n - other.n) / (n * n)
+                    + 3 * delta * (self.n * other.m2 - other.n * self.m2) / n)
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var) if self.n > 1 else math.nan
+
+    @property
+    def skewness(self):
+        """Bias-corrected sample skewness, as `pandas.Series.skew` computes it."""
+        if self.n < 3:
+            return math.nan
+        if self.m2 == 0:
+            return 0.0
+        g1 = (self.m3 / self.n) / (self.m2 / self.n) ** 1.5
+        return g1 * math.sqrt(self.n * (self.n - 1)) / (self.n - 2)
+
+
+class QuantileSketch:
+    """KLL quantile sketch. Exact (all values kept) until the first compaction."""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.exact = True
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.exact = self.exact and other.exact
+        self._compress()
+
+    def _compress(self):
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    self._compact(level)
+                    break
+
+    def _compact(self, level):
+        items = np.sort(self.levels[level])
+        leftover = items[-1:] if len(items) % 2 else items[:0]
+        items = items[:len(items) - len(leftover)]
+        promoted = items[self._rng.randint(0, 1)::2]
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0))
+        self.levels[level] = leftover
+        self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+        self.exact = False
+
+    def quantile(self, q):
+        if self.exact:
+            return float(np.quantile(self.levels[0], q)) if self.levels[0].size else math.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype="float64")
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(items) - 1)
+        return float(items[order][index])
+
+
+def _bit_length(values):
+    """`int.bit_length` of each element of a uint64 array."""
+    values = values.copy()
+    length = np.zeros(values.shape, dtype="int64")
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >> np.uint64(shift) != 0
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    return length + (values != 0)
+
+
+class DistinctCounter:
+    """Exact distinct count up to `exact_limit` values, HyperLogLog beyond it."""
+
+    def __init__(self, exact_limit=4096, precision=14):
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self._hashes = set()
+        self.registers = None
+
+    @property
+    def exact(self):
+        return self.registers is None
+
+    def update(self, hashes):
+        hashes = np.asarray(hashes, dtype="uint64")
+        if self.registers is None:
+            self._hashes.update(np.unique(hashes).tolist())
+            if len(self._hashes) > self.exact_limit:
+                self._switch_to_sketch()
+        else:
+            self._add(hashes)
+
+    def merge(self, other):
+        if self.exact and other.exact:
+            self._hashes |= other._hashes
+            if len(self._hashes) > self.exact_limit:
+                self._switch_to_sketch()
+            return
+        if self.exact:
+            self._switch_to_sketch()
+        if other.exact:
+            self._add(np.fromiter(other._hashes, dtype="uint64", count=len(other._hashes)))
+        else:
+            np.maximum(self.registers, other.registers, out=self.registers)
+
+    def _switch_to_sketch(self):
+        self.registers = np.zeros(1 << self.precision, dtype="uint8")
+        self._add(np.fromiter(self._hashes, dtype="uint64", count=len(self._hashes)))
+        self._hashes = set()
+
+    def _add(self, hashes):
+        if hashes.size == 0:
+            return
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining `bits` bits
+        # (bits + 1 when they are all zero), in integer arithmetic: through a
+        # float64 cast, values just below 2**bits would round up to rank 0
+        rank = (bits + 1 - _bit_length(rest)).astype("uint8")
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        if self.exact:
+            return len(self._hashes)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype("int64")))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TopKCounter:
+    """Space-Saving heavy hitters, merged from per-chunk exact counts.
+
+    `floor` bounds the count of any value that is not monitored and `errors`
+    holds how much of each monitored count may be overestimated.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    @property
+    def exact(self):
+        return self.floor == 0
+
+    def update(self, series):
+        counts = series.value_counts(dropna=False)
+        chunk = TopKCounter(self.capacity)
+        if len(counts) > self.capacity:
+            chunk.floor = int(counts.iloc[self.capacity])
+            counts = counts.iloc[:self.capacity]
+        chunk.counts = {(None if pd.isna(value) else value): int(count) for value, count in counts.items()}
+        chunk.errors = dict.fromkeys(chunk.counts, 0)
+        self.merge(chunk)
+
+    def merge(self, other):
+        counts, errors = {}, {}
+        for value in self.counts.keys() | other.counts.keys():
+            counts[value] = self.counts.get(value, self.floor) + other.counts.get(value, other.floor)
+            errors[value] = self.errors.get(value, self.floor) + other.errors.get(value, other.floor)
+        self.counts, self.errors = counts, errors
+        self.floor += other.floor
+        if len(self.counts) > self.capacity:
+            ranked = sorted(self.counts, key=self.counts.get, reverse=True)
+            self.floor = max(self.floor, self.counts[ranked[self.capacity]])
+            self.counts = {value: self.counts[value] for value in ranked[:self.capacity]}
+            self.errors = {value: self.errors[value] for value in ranked[:self.capacity]}
+
+    def most_common(self, n=None, dropna=False):
+        items = [(value, count) for value, count in self.counts.items() if not (dropna and value is None)]
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items[:n] if n is not None else items
+
+    def exact_top(self, n, dropna=False):
+        """True when the `n` most common values and their counts are exact."""
+        items = self.most_common(n, dropna)
+        return all(self.errors[value] == 0 and count >= self.floor for value, count in items)
+
+
+class CovarianceAccumulator:
+    """Streaming pairwise-complete co-moments for a Pearson correlation matrix.
+
+    Sums are kept relative to a per-column shift (the first chunk's means) so
+    the one-pass formulas stay numerically stable; accumulators with different
+    shifts can still be merged.
+    """
+
+    def __init__(self, columns):
+        p = len(columns)
+        self.columns = list(columns)
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        mask = ~np.isnan(values)
+        if self.shift is None:
+            counts = mask.sum(axis=0)
+            self.shift = np.where(counts > 0, np.where(mask, values, 0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(mask, values - self.shift, 0.0)
+        if mask.all():
+            # Every pair is complete: the count and marginal sums need no products
+            self.n += len(values)
+            self.sx += centered.sum(axis=0)[:, None]
+            self.sxx += (centered * centered).sum(axis=0)[:, None]
+        else:
+            present = mask.astype("float64")
+            self.n += present.T @ present
+            self.sx += centered.T @ present
+            self.sxx += (centered * centered).T @ present
+        self.sxy += centered.T @ centered
+
+    def merge(self, other):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        d = (other.shift - self.shift)[:, None]
+        self.sxy += other.sxy + d.T * other.sx + d * other.sx.T + other.n * d * d.T
+        self.sxx += other.sxx + 2 * d * other.sx + other.n * d * d
+        self.sx += other.sx + other.n * d
+        self.n += other.n
+
+    def correlation(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.where(self.n > 1, self.n, np.nan)
+            cov = self.sxy - self.sx * self.sx.T / n
+            var_x = self.sxx - self.sx ** 2 / n
+            var_y = var_x.T
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        corr[(var_x <= 0) | (var_y <= 0)] = np.nan
+        diagonal = np.diag(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class RowSample:
+    """Uniform sample of at most `size` rows: the rows with the smallest hashes.
+
+    The sample of a union of disjoint row sets is the merge of their
+    samples, so each lineage block keeps its own and a re-upload only
+    samples its new rows.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.rows = None
+        self.hashes = np.empty(0, dtype="uint64")
+
+    def update(self, chunk, hashes):
+        self._keep(chunk.reset_index(drop=True), np.asarray(hashes, dtype="uint64"))
+
+    def merge(self, other):
+        if other.rows is not None:
+            self._keep(other.rows, other.hashes)
+
+    def _keep(self, rows, hashes):
+        if self.rows is not None:
+            rows = pd.concat([self.rows, rows], ignore_index=True)
+            hashes = np.concatenate([self.hashes, hashes])
+        if len(hashes) > self.size:
+            keep = np.sort(np.argpartition(hashes, self.size - 1)[:self.size])
+            rows, hashes = rows.iloc[keep].reset_index(drop=True), hashes[keep]
+        self.rows, self.hashes = rows, hashes
+
+    def frame(self):
+        return self.rows if self.rows is not None else pd.DataFrame()
+
+
+class StreamingProfiler:
+    """Single-pass, chunked dataset profile with memory bounded by chunk size.
+
+    Feed it DataFrame chunks with `update`; the column layout and the numeric /
+    categorical split are fixed by the first chunk. Numeric columns are coerced
+    in later chunks, and values that fail to parse are counted in `coerced`.
+    """
+
+    def __init__(self, quantile_k=200, top_k=64, distinct_exact_limit=4096, report_top_n=3):
+        self.quantile_k = quantile_k
+        self.top_k = top_k
+        self.distinct_exact_limit = distinct_exact_limit
+        self.report_top_n = report_top_n
+        self.columns = None
+        self.numeric_columns = []
+        self.n_rows = 0
+
+    def _init_schema(self, chunk):
+        self._template = chunk.iloc[:0]
+        self.columns = list(chunk.columns)
+        self.dtypes = {col: str(chunk[col].dtype) for col in self.columns}
+        self.numeric_columns = [col for col in self.columns
+                                if pd.api.types.is_numeric_dtype(chunk[col])
+                                and not pd.api.types.is_bool_dtype(chunk[col])]
+        self.nulls = dict.fromkeys(self.columns, 0)
+        self.coerced = dict.fromkeys(self.numeric_columns, 0)
+        self.distinct = {col: DistinctCounter(self.distinct_exact_limit) for col in self.columns}
+        self.top_values = {col: TopKCounter(self.top_k) for col in self.columns}
+        self.moments = {col: RunningMoments() for col in self.numeric_columns}
+        self.quantiles = {col: QuantileSketch(self.quantile_k, seed=i) for i, col in enumerate(self.numeric_columns)}
+        self.covariance = (CovarianceAccumulator(self.numeric_columns)
+                           if 1 < len(self.numeric_columns) <= MAX_COMOMENT_COLUMNS else None)
+        # Sized for the most tile workers, so it does not depend on the machine
+        self.sample = RowSample(sample_rows(MAX_SAMPLE_ROWS, len(self.numeric_columns),
+                                            len(self.columns) - len(self.numeric_columns), workers=8))
+
+    def spawn(self):
+        """Empty profiler with the same settings and column layout, mergeable into this one."""
+        other = StreamingProfiler(self.quantile_k, self.top_k, self.distinct_exact_limit, self.report_top_n)
+        if self.columns is not None:
+            other._init_schema(self._template)
+        return other
+
+    def update(self, chunk, hashes=None):
+        """Add a chunk; `hashes` are its row hashes if the caller already has them."""
+        if self.columns is None:
+            self._init_schema(chunk)
+        self.n_rows += len(chunk)
+        numeric = {}
+        for col in self.columns:
+            series = chunk[col]
+            self.nulls[col] += int(series.isna().sum())
+            if col in self.moments:
+                if not pd.api.types.is_numeric_dtype(series):
+                    parsed = pd.to_numeric(series, errors="coerce")
+                    self.coerced[col] += int(parsed.isna().sum() - series.isna().sum())
+                    series = parsed
+                elif self.dtypes[col] != str(series.dtype) and series.dtype.kind == "f":
+                    self.dtypes[col] = str(series.dtype)
+                series = series.astype("float64")
+                numeric[col] = series
+                values = series.dropna().to_numpy()
+                self.moments[col].update(values)
+                self.quantiles[col].update(values)
+            elif series.dtype != object:
+                series = series.where(series.isna(), series.astype(str))
+            self.distinct[col].update(pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy())
+            self.top_values[col].update(series)
+        # Pairwise associations come from this same pass: exact co-moments for
+        # Pearson, and a row sample for the measures that need rows side by side
+        if self.covariance is not None:
+            self.covariance.update(pd.DataFrame(numeric).to_numpy())
+        if hashes is None:
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        self.sample.update(chunk, hashes)
+
+    def merge(self, other):
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.__dict__.update({key: value for key, value in other.__dict__.items()})
+            return
+        self.n_rows += other.n_rows
+        for col in self.columns:
+            self.nulls[col] += other.nulls[col]
+            self.distinct[col].merge(other.distinct[col])
+            self.top_values[col].merge(other.top_values[col])
+        for col in self.numeric_columns:
+            if other.dtypes[col].startswith("float"):
+                self.dtypes[col] = other.dtypes[col]
+            self.coerced[col] += other.coerced[col]
+            self.moments[col].merge(other.moments[col])
+            self.quantiles[col].merge(other.quantiles[col])
+        if self.covariance is not None:
+            self.covariance.merge(other.covariance)
+        self.sample.merge(other.sample)
+
+    # --- report views -------------------------------------------------------
+
+    def dtypes_series(self):
+        return pd.Series(self.dtypes, dtype=object)
+
+    def missing_series(self):
+        return pd.Series(self.nulls, dtype="int64")
+
+    def unique_series(self):
+        return pd.Series({col: self.distinct[col].count() for col in self.columns}, dtype="int64")
+
+    def describe_numeric(self):
+        rows = {}
+        for col in self.numeric_columns:
+            m, q = self.moments[col], self.quantiles[col]
+            rows[col] = {
+                "count": m.n, "mean": m.mean if m.n else math.nan, "std": m.std,
+                "min": m.min if m.n else math.nan, "25%": q.quantile(0.25), "50%": q.quantile(0.5),
+                "75%": q.quantile(0.75), "max": m.max if m.n else math.nan,
+            }
+        return pd.DataFrame(rows)
+
+    def describe_categorical(self):
+        rows = {}
+        for col in self.columns:
+            if col in self.moments or self.dtypes[col] != "object":
+                continue
+            top = self.top_values[col].most_common(1, dropna=True)
+            rows[col] = {
+                "count": self.n_rows - self.nulls[col], "unique": self.distinct[col].count(),
+                "top": top[0][0] if top else math.nan, "freq": top[0][1] if top else math.nan,
+            }
+        return pd.DataFrame(rows, index=["count", "unique", "top", "freq"], dtype=object)
+
+    @phase("describe")
+    def describe_all(self):
+        """Counterpart of `DataFrame.describe(include='all').transpose()`."""
+        table = pd.concat([self.describe_categorical().T, self.describe_numeric().T.astype(object)])
+        return table.reindex(index=self.columns, columns=["count", "unique", "top", "freq", "mean", "std",
+                                                          "min", "25%", "50%", "75%", "max"])
+
+    @phase("correlation")
+    def correlation(self):
+        """Pearson matrix over every row, or None when the table is too wide for co-moments."""
+        return self.covariance.correlation() if self.covariance is not None else None
+
+    def value_counts(self, col, n=3):
+        items = self.top_values[col].most_common(n)
+        values = [math.nan if value is None else value for value, _ in items]
+        if self.dtypes[col].startswith("int"):
+            values = [value if pd.isna(value) else int(value) for value in values]
+        return pd.Series([count for _, count in items], index=pd.Index(values, name=col, dtype=object),
+                         name="count", dtype="int64")
+
+    def approximations(self):
+        """Map each column to the statistics that are sketch estimates."""
+        notes = {}
+        for col in self.columns:
+            flags = []
+            if not self.distinct[col].exact:
+                flags.append("unique (HyperLogLog)")
+            if not self.top_values[col].exact_top(self.report_top_n):
+                flags.append("top values (Space-Saving)")
+            if col in self.quantiles and not self.quantiles[col].exact:
+                flags.append("quantiles (KLL)")
+            if self.coerced.get(col):
+                flags.append(f"{self.coerced[col]} non-numeric values ignored")
+            if flags:
+                notes[col] = flags
+        return notes
@@ -0,0 +1,159 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+from tools.instrumentation import phase
+from tools.workspace import output_path, relative_path
+
+CACHE_DIR = os.environ.get("PIPELINE_CACHE_DIR", os.path.join(".cache", "results"))
+CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_CACHE_MAX_BYTES", 1 << 30))
+
+_fingerprints = {}
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """SHA-256 of a file's content, memoised on (path, size, mtime)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _fingerprints:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        _fingerprints[memo_key] = digest.hexdigest()
+    return _fingerprints[memo_key]
+
+
+def fingerprint(source):
+    """Content hash of a file path, or of the text itself when it is not a file."""
+    if os.path.isfile(source):
+        return file_fingerprint(source)
+    return hashlib.sha256(str(source).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Persistent, content-addressed cache of tool results.
+
+    Entries are pickled `{"result", "artifacts"}` records, one file per key.
+    A hit refreshes the file's mtime, and once the directory grows past
+    `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tool_name, tool_version, fingerprints, params=None):
+        payload = json.dumps([tool_name, tool_version, fingerprints, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        entries = list(self._entries())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def run(self, key, compute):
+        """Return a cached result for `key`, or call `compute()` and store it.
+
+        `compute` returns `(result, artifact_paths)`; the artifact files it
+        wrote are stored with the result, relative to the run's workspace,
+        and written back into the current workspace on a hit.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            for name, content in entry["artifacts"].items():
+                path = output_path(name)
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(content)
+            return entry["result"]
+
+        result, artifact_paths = compute()
+        artifacts = {}
+        for path in artifact_paths:
+            with open(path, "rb") as f:
+                artifacts[relative_path(path)] = f.read()
+        self.put(key, {"result": result, "artifacts": artifacts})
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def default_cache():
+    """Process-wide cache shared by every tool (and by the Streamlit reruns)."""
+    return ResultCache()
+
+
+def cached_tool_run(tool, version, sources, params, compute):
+    """Run `compute` through the shared cache unless `tool.use_cache` is off.
+
+    The key covers the tool name and version, the content of every source
+    (file path or inline text) and the parameters that change the output.
+    """
+    with phase(f"tool:{tool.name}", "tool"):
+        if not getattr(tool, "use_cache", True):
+            return compute()[0]
+        cache = default_cache()
+        key = cache.key(tool.name, version, [fingerprint(source) for source in sources], params)
+        return cache.run(key, compute)
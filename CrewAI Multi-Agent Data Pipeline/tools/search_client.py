@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tools.instrumentation import phase
+
+# SerpAPI's JSON endpoint; point SERPAPI_BASE_URL at a local stub server to
+# exercise the client without network access or an API key. The key is read
+# from SERPAPI_API_KEY.
+SERPAPI_URL = "https://serpapi.com/search.json"
+SERPAPI_BASE_URL = os.environ.get("SERPAPI_BASE_URL", SERPAPI_URL)
+SEARCH_TTL_SECONDS = float(os.environ.get("SERPAPI_TTL_SECONDS", 6 * 3600))
+# Cached responses kept per client; the least recently used ones go first
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SERPAPI_CACHE_MAX_ENTRIES", 1024))
+
+# Worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def normalize_query(query):
+    """Cache key form of a query: lower-cased with whitespace collapsed."""
+    return " ".join(str(query).lower().split())
+
+
+class SearchError(Exception):
+    pass
+
+
+class SearchClient:
+    """Concurrent SerpAPI client with pooled connections, retries and a TTL cache.
+
+    `search_many` sends all queries at once on a thread pool sharing one
+    `requests.Session`, so connections are reused across queries and runs.
+    Each request has a bounded (connect, read) timeout and is retried with
+    jittered exponential backoff on connection errors, timeouts and
+    retryable statuses. Successful responses are cached by normalized query
+    for `ttl` seconds, at most `max_entries` of them: expired entries are
+    dropped on every insert, then the least recently used ones.
+    """
+
+    def __init__(self, base_url=SERPAPI_BASE_URL, api_key=None, ttl=SEARCH_TTL_SECONDS,
+                 timeout=(3.05, 10), retries=2, backoff=0.5, max_workers=8,
+                 max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_entries = max_entries
+        self.requests_sent = 0
+        self.cache_hits = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="serpapi")
+
+    def _cache_key(self, query, num):
+        return normalize_query(query), num
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return result
+
+    def _store(self, key, result):
+        now = time.monotonic()
+        with self._lock:
+            for stale in [k for k, (expires, _) in self._cache.items() if expires < now]:
+                del self._cache[stale]
+            self._cache[key] = (now + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, query, num):
+        api_key = self.api_key or os.getenv("SERPAPI_API_KEY")
+        if not api_key and self.base_url == SERPAPI_URL:
+            raise SearchError("SERPAPI_API_KEY is not set")
+        params = {
+            "engine": "google",
+            "q": query,
+            "num": num,
+            "api_key": api_key,
+        }
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                with phase("serpapi", "io", attempt=attempt + 1) as span:
+                    response = self._session.get(self.base_url, params=params, timeout=self.timeout)
+                    span.add(status=response.status_code, bytes=len(response.content))
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                # The exception text carries the request URL, and with it the API key
+                error = SearchError(f"{type(exc).__name__} after {attempt + 1} attempt(s)")
+                continue
+            if response.status_code in RETRY_STATUSES:
+                error = SearchError(f"HTTP {response.status_code}")
+                continue
+            if not response.ok:
+                raise SearchError(f"HTTP {response.status_code}: {response.text[:200]}")
+            result = response.json()
+            if result.get("error"):
+                raise SearchError(result["error"])
+            return result
+        raise error
+
+    def search(self, query, num=5):
+        """SerpAPI result dict for one query, served from the cache when fresh."""
+        key = self._cache_key(query, num)
+        result = self._cached(key)
+        if result is None:
+            result = self._fetch(query, num)
+            self._store(key, result)
+        return result
+
+    def search_many(self, queries, num=5):
+        """Run `queries` concurrently; returns a list of result dicts or SearchError, in order."""
+        # Copies of the caller's context, so the requests show up in its trace
+        futures = [self._pool.submit(contextvars.copy_context().run, self.search, query, num) for query in queries]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                results.append(exc if isinstance(exc, SearchError) else SearchError(str(exc)))
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+@functools.lru_cache(maxsize=1)
+def default_client():
+    return SearchClient()
@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local SerpAPI stand-in for the tests and benchmarks/bench_search_client.py;
+# point SearchClient (or SERPAPI_BASE_URL) at `url(server)`.
+
+
+def stub_server(latency=0.0, fail_every=0, fail_first=0):
+    """Start a SerpAPI stand-in on a free local port; returns `(server, counter)`.
+
+    Every answer takes `latency` seconds. The first `fail_first` requests,
+    and every `fail_every`-th one, get an HTTP 503. `counter` holds the
+    number of requests and the client ports they came from.
+    """
+    counter = {"requests": 0, "ports": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                counter["requests"] += 1
+                counter["ports"].add(self.client_address[1])
+                n = counter["requests"]
+            time.sleep(latency)
+            if n <= fail_first or (fail_every and n % fail_every == 0):
+                status, body = 503, {"error": "stub overloaded"}
+            else:
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                links = [{"link": f"https://example.com/{abs(hash(query)) % 1000}/{i}"} for i in range(5)]
+                status, body = 200, {"organic_results": links}
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/search.json"
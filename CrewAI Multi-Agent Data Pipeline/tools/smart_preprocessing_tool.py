@@ -1,101 +1,196 @@
 import os
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import RobustScaler, OrdinalEncoder, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.impute import SimpleImputer
+from typing import Optional
 from crewai.tools import BaseTool
 
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from tools.compact_output import load_compact, save_compact
+from tools.context import STRATEGY_EDA_BUDGET, insight_facts, pack
+from tools.ingestion import read_frame
+from tools.instrumentation import phase
+from tools.insights import EDA_INSIGHTS_PATH, load_insights
+from tools.lineage import digest, lineage_of, moved_columns, profile_dataset, row_hashes, signatures
+from tools.preprocessing_pipeline import PreprocessingPipeline
+from tools.result_cache import cached_tool_run, file_fingerprint
+from tools.workspace import output_dir, output_path, relative_path
+
+# Bump whenever the preprocessing output changes so stale cache entries are not reused
+CACHE_VERSION = 5
+
 class SmartPreprocessingTool(BaseTool):
     name: str = "Smart Preprocessing Tool"
-    description: str = "Preprocesses dataset: removes duplicates, handles nulls, scales outliers, and encodes categorical data."
-
-    def _run(self, csv_path: str) -> str:
+    description: str = (
+        "Preprocesses dataset: removes duplicates, handles nulls, scales outliers, and encodes categorical data. "
+        "Pass pipeline_path to apply a previously fitted pipeline to a new file instead of refitting."
+    )
+    use_cache: bool = True
+    # Rows per chunk when applying a saved pipeline to a new file
+    chunksize: int = 100_000
+    # "csv" writes one dense table; "npz" keeps the one-hot block sparse and
+    # every other column in its narrowest dtype (NPZ + JSON schema)
+    output_format: str = "csv"
+
+    def _run(self, csv_path: str, pipeline_path: Optional[str] = None) -> str:
         if not os.path.exists(csv_path):
             return f"❌ File not found: {csv_path}"
-
-        df = pd.read_csv(csv_path)
-        original_shape = df.shape
-
-        # Optional: check for EDA file
-        eda_text = ""
-        if os.path.exists("eda_report.txt"):
-            with open("eda_report.txt", "r", encoding="utf-8") as file:
-                eda_text = file.read()[:800] + "..."
+        if pipeline_path:
+            return self._apply_pipeline(csv_path, pipeline_path)
+
+        # The EDA digest is part of the strategy text, so it is part of the key
+        return cached_tool_run(self, CACHE_VERSION, [csv_path, output_path(EDA_INSIGHTS_PATH)], {"output_format": self.output_format},
+                               lambda: self._preprocess(csv_path))
+
+    def _preprocess(self, csv_path: str):
+        # The saved fit is loaded, extended and saved as one step, so
+        # concurrent runs on the same lineage wait for each other
+        with lineage_of(csv_path).lock:
+            return self._preprocess_locked(csv_path)
+
+    def _preprocess_locked(self, csv_path: str):
+        with phase("read") as span:
+            df = read_frame(csv_path)
+            span.add(rows=len(df))
+            original_shape = df.shape
+            hashes = row_hashes(df)
+        # Column drift is judged on the lineage profile shared with EDA/dashboard
+        update = profile_dataset(csv_path)
+        current = signatures(update.profiler)
+        state = update.lineage.load("preprocessing")
+
+        out_dir = output_dir("processed_output")
+        strategy_path = os.path.join(out_dir, "preprocessing_strategy.txt")
+        pipeline_path = os.path.join(out_dir, "preprocessing_pipeline.json")
+        processed_path = os.path.join(out_dir, f"processed_data.{self.output_format}")
+        append = self._appendable(state, hashes, current, processed_path)
+
+        # Optional: the most relevant EDA findings for this file, within a token budget
+        eda_record = load_insights(output_path(EDA_INSIGHTS_PATH))
+        if eda_record is not None and eda_record.source != str(csv_path):
+            eda_record = None
+        eda_text = pack(insight_facts(eda_record), STRATEGY_EDA_BUDGET).text
 
         strategy = ["📊 **PREPROCESSING STRATEGY REPORT** 📊", f"📁 File: {csv_path}"]
         if eda_text:
             strategy.append(f"\n🧠 Based on EDA Insights:\n{eda_text}")
 
         # 1. Remove duplicates
-        duplicates_removed = df.duplicated().sum()
-        df.drop_duplicates(inplace=True)
+        if append:
+            # Same table plus new rows and no column moved: keep the fitted
+            # pipeline and only dedupe/transform the appended rows
+            start = state["input_rows"]
+            delta_hashes = hashes[start:]
+            duplicated = pd.Series(delta_hashes).duplicated().to_numpy() | np.isin(delta_hashes, state["kept_hashes"])
+            df = df.iloc[start:][~duplicated]
+            duplicates_removed = state["duplicates"] + int(duplicated.sum())
+            kept_hashes = np.concatenate([state["kept_hashes"], delta_hashes[~duplicated]])
+            fit_signatures = state["signatures"]
+        else:
+            duplicated = df.duplicated().to_numpy()
+            df = df[~duplicated]
+            duplicates_removed = int(duplicated.sum())
+            kept_hashes = hashes[~duplicated]
+            fit_signatures = current
         strategy.append(f"✅ Removed {duplicates_removed} duplicate rows.")
 
-        # 2. Handle missing values
-        num_cols = df.select_dtypes(include=['float64', 'int64']).columns
-        cat_cols = df.select_dtypes(include='object').columns
-
-        df[num_cols] = df[num_cols].apply(lambda x: x.fillna(x.median()))
-        df[cat_cols] = df[cat_cols].apply(lambda x: x.fillna(x.mode()[0]))
+        # 2-4. Fit imputation, scaling and encoding once, keep the fitted state
+        # as an artifact so new files get exactly the same transform
+        if append:
+            pipeline = PreprocessingPipeline.from_dict(state["pipeline"])
+            strategy.append(f"♻️ {len(hashes) - start} rows were appended since the last run and no column "
+                            f"distribution moved, so the fitted pipeline was reused and only those rows were transformed.")
+        else:
+            pipeline = PreprocessingPipeline.fit(df, fitted_on=os.path.basename(csv_path))
+        ordinal_cols, nominal_cols = pipeline.ordinal_columns, pipeline.nominal_columns
 
         strategy.append(f"🧼 Filled missing values (numerical: median, categorical: mode).")
-
-        # 3. Scale numerical features
-        scaler = RobustScaler()
-        df[num_cols] = scaler.fit_transform(df[num_cols])
         strategy.append("📐 Scaled numerical features using RobustScaler.")
-
-        # 4. Encode categorical features
-        ordinal_features = ['CALC', 'CAEC']
-        ordinal_mapping = {
-            'CALC': ['no', 'Sometimes', 'Frequently', 'Always'],
-            'CAEC': ['no', 'Sometimes', 'Frequently', 'Always']
-        }
-
-        for col in ordinal_features:
-            if col in df.columns:
-                df[col] = pd.Categorical(df[col], categories=ordinal_mapping[col], ordered=True)
-
-        ordinal_cols = [col for col in ordinal_features if col in df.columns]
-        nominal_cols = list(set(cat_cols) - set(ordinal_cols))
-
-        transformers = []
-        if ordinal_cols:
-            transformers.append(('ord', OrdinalEncoder(), ordinal_cols))
-        if nominal_cols:
-            transformers.append(('nom', OneHotEncoder(sparse_output=False, handle_unknown='ignore'), nominal_cols))
-
-        if transformers:
-            preprocessor = ColumnTransformer(transformers, remainder='passthrough')
-            df_processed = preprocessor.fit_transform(df)
-
-            new_columns = []
-            if ordinal_cols:
-                new_columns.extend(ordinal_cols)
-            if nominal_cols:
-                ohe = preprocessor.named_transformers_['nom']
-                new_columns.extend(ohe.get_feature_names_out(nominal_cols))
-            new_columns.extend([col for col in df.columns if col not in ordinal_cols + nominal_cols])
-
-            df = pd.DataFrame(df_processed, columns=new_columns)
-
         strategy.append(f"🔠 Encoded: Ordinal({ordinal_cols}) + OneHot({nominal_cols})")
 
-        os.makedirs("processed_output", exist_ok=True)
-        processed_path = os.path.join("processed_output", "processed_data.csv")
-        strategy_path = os.path.join("processed_output", "preprocessing_strategy.txt")
+        pipeline.save(pipeline_path)
+        strategy.append(f"💾 Fitted pipeline saved to {relative_path(pipeline_path)} "
+                        f"(reuse it with pipeline_path to transform new files).")
+
+        artifacts = [strategy_path, pipeline_path]
+        if self.output_format == "npz":
+            dense, one_hot, one_hot_columns = pipeline.transform_compact(df)
+            if append:
+                old_dense, old_one_hot, _, _ = load_compact(processed_path)
+                dense = pd.concat([old_dense, dense], ignore_index=True)
+                one_hot = sparse.vstack([old_one_hot, one_hot], format="csr")
+            artifacts.append(save_compact(processed_path, dense, one_hot, one_hot_columns, pipeline.output_columns))
+            preview = (f"{dense.head(5).to_string(index=False)}\n"
+                       f"(+ sparse one-hot block: {one_hot.shape[1]} columns, {one_hot.nnz} non-zeros)")
+        else:
+            df = pipeline.transform(df)
+            if append:
+                with phase("write"):
+                    df.to_csv(processed_path, index=False, mode="a", header=False)
+                preview = pd.read_csv(processed_path, nrows=5).to_string(index=False)
+            else:
+                with phase("write"):
+                    df.to_csv(processed_path, index=False)
+                preview = df.head(5).to_string(index=False)
+        artifacts.append(processed_path)
 
-        df.to_csv(processed_path, index=False)
         with open(strategy_path, "w", encoding="utf-8") as f:
             f.write("\n\n".join(strategy))
 
+        update.lineage.save("preprocessing", {
+            "output_format": self.output_format,
+            "input_rows": len(hashes),
+            "input_digest": digest(hashes),
+            "kept_hashes": kept_hashes,
+            "duplicates": duplicates_removed,
+            "signatures": fit_signatures,
+            "pipeline": pipeline.to_dict(),
+            "output_fingerprint": file_fingerprint(processed_path),
+        })
+
         return f"""
 ✅ Preprocessing completed successfully.
-📄 Processed data saved to: {processed_path}
-📝 Strategy explanation saved to: {strategy_path}
+📄 Processed data saved to: {relative_path(processed_path)}
+📝 Strategy explanation saved to: {relative_path(strategy_path)}
+💾 Fitted pipeline saved to: {relative_path(pipeline_path)}
 
 📌 Sample Processed Data Preview:
-{df.head(5).to_string(index=False)}
+{preview}
+""", artifacts
+
+    def _appendable(self, state, hashes, current, processed_path):
+        """True when the last run's fit still applies: the file only gained rows and no column moved.
+
+        Identifier columns are ignored, since appended rows always shift them.
+        """
+        if state is None or state["output_format"] != self.output_format or not os.path.exists(processed_path):
+            return False
+        rows = state["input_rows"]
+        ids = set(state["pipeline"].get("id_columns", []))
+        return (len(hashes) >= rows and digest(hashes[:rows]) == state["input_digest"]
+                and file_fingerprint(processed_path) == state["output_fingerprint"]
+                and not [col for col in moved_columns(state["signatures"], current) if col not in ids])
+
+    def _apply_pipeline(self, csv_path: str, pipeline_path: str) -> str:
+        # Transform-only mode: no refit, bounded memory, so it is not cached
+        if not os.path.exists(pipeline_path):
+            # Reports give the pipeline's path relative to the run's workspace
+            pipeline_path = output_path(pipeline_path)
+        if not os.path.exists(pipeline_path):
+            return f"❌ Pipeline not found: {pipeline_path}"
+        pipeline = PreprocessingPipeline.load(pipeline_path)
+
+        out_dir = output_dir("processed_output")
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        if self.output_format == "npz":
+            transformed_path = os.path.join(out_dir, f"{name}_transformed.npz")
+            rows = pipeline.transform_csv_compact(csv_path, transformed_path, chunksize=self.chunksize)
+        else:
+            transformed_path = os.path.join(out_dir, f"{name}_transformed.csv")
+            rows = pipeline.transform_csv(csv_path, transformed_path, chunksize=self.chunksize)
+
+        return f"""
+✅ Applied fitted pipeline (fitted on {pipeline.fitted_on}, {pipeline.created}) without refitting.
+📄 {rows} rows transformed and saved to: {relative_path(transformed_path)}
 """
 
@@ -0,0 +1,106 @@
+import contextlib
+import contextvars
+import hashlib
+import os
+import re
+import shutil
+import time
+
+# Every file a run writes (EDA report, dashboard, processed data, insight
+# records) is resolved against the current workspace. The default workspace
+# is the working directory, which keeps the original fixed paths for direct
+# tool calls and the benchmarks. Background jobs run in a directory under
+# WORKSPACE_ROOT per user and dataset: the stages a user runs one at a time
+# on an upload see each other's outputs (and the previous run's, for
+# incremental reruns), while other users and other datasets never share files.
+WORKSPACE_ROOT = os.environ.get("PIPELINE_WORKSPACE_ROOT", os.path.join(".cache", "runs"))
+# Uploaded datasets, one directory per user
+UPLOADS_ROOT = os.environ.get("PIPELINE_UPLOADS_ROOT", os.path.join(".cache", "uploads"))
+# Run (and upload) directories are deleted once untouched for this long, or
+# when they fall outside the newest WORKSPACE_MAX_RUNS
+WORKSPACE_RETENTION_SECONDS = int(os.environ.get("PIPELINE_WORKSPACE_RETENTION", 7 * 24 * 3600))
+WORKSPACE_MAX_RUNS = int(os.environ.get("PIPELINE_WORKSPACE_MAX_RUNS", 200))
+
+
+class Workspace:
+    """Directory that a run's relative output paths resolve against."""
+
+    def __init__(self, root=".", run_id=None):
+        self.root = root
+        self.run_id = run_id
+
+    def path(self, *parts):
+        return os.path.normpath(os.path.join(self.root, *parts))
+
+    def relative(self, path):
+        return os.path.relpath(path, self.root)
+
+
+_current = contextvars.ContextVar("workspace", default=Workspace())
+
+
+def current():
+    return _current.get()
+
+
+def output_path(*parts):
+    """`parts` joined under the current run's workspace."""
+    return _current.get().path(*parts)
+
+
+def output_dir(*parts):
+    """Like `output_path`, creating the directory."""
+    path = output_path(*parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def relative_path(path):
+    """`path` relative to the current workspace, as shown in reports and stored in caches."""
+    return _current.get().relative(path)
+
+
+@contextlib.contextmanager
+def use_workspace(workspace):
+    """Resolve output paths against `workspace` inside the block (and in threads started from its context)."""
+    token = _current.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current.reset(token)
+
+
+def create_run(run_id, root=WORKSPACE_ROOT):
+    path = os.path.join(root, run_id)
+    os.makedirs(path, exist_ok=True)
+    return Workspace(path, run_id)
+
+
+def dataset_run_id(user, dataset_path):
+    """Name of the workspace shared by `user`'s jobs on `dataset_path`."""
+    digest = hashlib.sha256(str(dataset_path).encode("utf-8")).hexdigest()[:12]
+    return f"{os.path.basename(uploads_dir(user))}-{digest}"
+
+
+def uploads_dir(user, root=UPLOADS_ROOT):
+    # The user id comes from the URL; keep it to one plain path component
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9_-]", "_", user) or "_")
+
+
+def cleanup(root=WORKSPACE_ROOT, keep=(), retention=WORKSPACE_RETENTION_SECONDS, max_entries=WORKSPACE_MAX_RUNS):
+    """Delete directories under `root` past the retention age or beyond the newest `max_entries`.
+
+    Names in `keep` (runs still queued or running) are never deleted.
+    Returns the deleted names.
+    """
+    try:
+        entries = [(entry.name, entry.stat().st_mtime) for entry in os.scandir(root) if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+    cutoff = time.time() - retention
+    deleted = []
+    for index, (name, mtime) in enumerate(sorted(entries, key=lambda entry: entry[1], reverse=True)):
+        if name not in keep and (mtime < cutoff or index >= max_entries):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            deleted.append(name)
+    return deleted